@@ -0,0 +1,99 @@
+import time
+import datetime
+from typing import Dict, Iterable, List, Optional
+
+from prometheus_client import Counter, Gauge
+
+from app.storage import StorageUtils
+
+POLL_INTERVAL = Gauge('flash_schedule_poll_interval_seconds', 'Current adaptive schedule polling interval')
+POLLS = Counter('flash_schedule_polls_total', 'Schedule polls by outcome', ['result'])
+
+DEFAULT_MIN_INTERVAL = 120
+DEFAULT_MAX_INTERVAL = 1800
+BASE_INTERVAL = 600
+HISTORY_DAYS = 21
+BUCKETS_PER_DAY = 48
+# Half-hour buckets around "now" that count as the same publication window
+ACTIVE_WINDOW_RADIUS = 1
+ACTIVE_MIN_CHANGES = 2
+NIGHT_HOURS = range(1, 6)
+BACKOFF_EVERY = 3
+
+
+class AdaptivePoller:
+    """
+    Decides when `schedule_loop` should sync schedules next.
+
+    Every poll outcome is recorded; change timestamps are kept per source for
+    `HISTORY_DAYS` and bucketed by local half-hour of day. Polls run at `min_interval`
+    during emergencies and historically active windows, back off exponentially after
+    repeated no-change polls and stretch to `max_interval` overnight.
+    """
+
+    def __init__(self, state_path: str, tz, min_interval: int = DEFAULT_MIN_INTERVAL,
+                 max_interval: int = DEFAULT_MAX_INTERVAL):
+        self.state_path = state_path
+        self.tz = tz
+        self.set_bounds(min_interval, max_interval)
+        data = StorageUtils.load_json_sync(state_path, default={}) or {}
+        self.changes: Dict[str, List[float]] = data.get("changes", {})
+        self.idle_streak: int = data.get("idle_streak", 0)
+        self.last_poll: float = data.get("last_poll", 0.0)
+        self.next_poll: float = data.get("next_poll", 0.0)
+
+    def set_bounds(self, min_interval: Optional[int], max_interval: Optional[int]):
+        self.min_interval = max(60, int(min_interval or DEFAULT_MIN_INTERVAL))
+        self.max_interval = max(self.min_interval, int(max_interval or DEFAULT_MAX_INTERVAL))
+
+    def _bucket(self, ts: float) -> int:
+        dt = datetime.datetime.fromtimestamp(ts, self.tz)
+        return dt.hour * 2 + (1 if dt.minute >= 30 else 0)
+
+    def activity(self, now: float) -> int:
+        """Changes seen by any source around the current time of day."""
+        bucket = self._bucket(now)
+        window = {(bucket + d) % BUCKETS_PER_DAY for d in range(-ACTIVE_WINDOW_RADIUS, ACTIVE_WINDOW_RADIUS + 1)}
+        return sum(1 for stamps in self.changes.values() for ts in stamps if self._bucket(ts) in window)
+
+    def interval(self, now: float, emergency: bool = False) -> int:
+        if emergency or self.activity(now) >= ACTIVE_MIN_CHANGES:
+            return self.min_interval
+        hour = datetime.datetime.fromtimestamp(now, self.tz).hour
+        if hour in NIGHT_HOURS:
+            return self.max_interval
+        backoff = BASE_INTERVAL * (2 ** (self.idle_streak // BACKOFF_EVERY))
+        return int(min(max(backoff, self.min_interval), self.max_interval))
+
+    def due(self, now: Optional[float] = None, emergency: bool = False) -> bool:
+        """True once the scheduled poll time passed, or earlier if conditions now call for a shorter interval."""
+        now = now or time.time()
+        return now >= min(self.next_poll, self.last_poll + self.interval(now, emergency))
+
+    def record(self, changed_sources: Iterable[str], now: Optional[float] = None, emergency: bool = False) -> int:
+        """Stores a poll outcome and schedules the next poll. Returns the chosen interval."""
+        now = now or time.time()
+        changed_sources = list(changed_sources)
+        cutoff = now - HISTORY_DAYS * 86400
+        for source in changed_sources:
+            self.changes.setdefault(source, []).append(now)
+        for source in list(self.changes):
+            self.changes[source] = [ts for ts in self.changes[source] if ts >= cutoff]
+
+        if changed_sources:
+            self.idle_streak = 0
+            POLLS.labels(result="changed").inc()
+        else:
+            self.idle_streak += 1
+            POLLS.labels(result="unchanged").inc()
+
+        interval = self.interval(now, emergency)
+        self.last_poll, self.next_poll = now, now + interval
+        POLL_INTERVAL.set(interval)
+        StorageUtils.save_json_sync(self.state_path, {
+            "changes": self.changes,
+            "idle_streak": self.idle_streak,
+            "last_poll": self.last_poll,
+            "next_poll": self.next_poll,
+        })
+        return interval
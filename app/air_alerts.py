@@ -0,0 +1,218 @@
+import os
+import time
+import bisect
+import datetime
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.storage import StorageUtils
+
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+# Legacy event list, migrated into ALERT_INTERVALS_FILE on first use
+ALERT_LOG_FILE = os.path.join(DATA_DIR, "air_raid_log.json")
+ALERT_INTERVALS_FILE = os.path.join(DATA_DIR, "air_raid_intervals.json")
+KYIV_TZ = ZoneInfo("Europe/Kyiv")
+
+# The first region is primary: it drives Telegram notifications and the report overlays
+DEFAULT_REGIONS = ["м. Київ", "Київська область"]
+
+
+def tracked_regions(cfg: Optional[dict] = None) -> List[str]:
+    """Regions from advanced.alerts.regions (config.json when `cfg` is not given)."""
+    if cfg is None:
+        cfg = StorageUtils.load_json_sync(os.path.join(DATA_DIR, "config.json"), default={}) or {}
+    regions = cfg.get("advanced", {}).get("alerts", {}).get("regions") or DEFAULT_REGIONS
+    return [r for r in regions if isinstance(r, str) and r.strip()] or list(DEFAULT_REGIONS)
+
+
+def region_label(region: str) -> str:
+    """"м. Київ" -> "КИЇВ" for notification headlines."""
+    return region.replace("м. ", "").upper()
+
+
+def parse_states(data: dict, regions: List[str]) -> Dict[str, dict]:
+    """Status of every tracked region from one ubilling `states` document."""
+    states = (data or {}).get("states", {})
+    result = {}
+    for region in regions:
+        entry = states.get(region)
+        result[region] = {
+            "alert": bool(entry.get("alertnow", False)) if isinstance(entry, dict) else False,
+            "changed": entry.get("changed") if isinstance(entry, dict) else None,
+            "known": isinstance(entry, dict),
+        }
+    return result
+
+
+def summarize(region_states: Dict[str, dict], regions: List[str]) -> dict:
+    """
+    Dashboard/API view: `city` is the primary region, `region` any other tracked region.
+    Status is "active" for a primary alert, "region" for an alert elsewhere, "clear" otherwise.
+    """
+    primary = regions[0]
+    is_primary = region_states.get(primary, {}).get("alert", False)
+    others = [r for r in regions[1:] if region_states.get(r, {}).get("alert")]
+    status = "active" if is_primary else ("region" if others else "clear")
+    location = primary if is_primary else (others[0] if others else "Тривоги немає")
+    return {
+        "city": is_primary, "region": bool(others), "status": status, "location": location,
+        "primary": primary, "primary_label": primary.replace("м. ", ""), "regions": region_states,
+    }
+
+
+def region_transitions(previous: Dict[str, bool], region_states: Dict[str, dict]) -> Dict[str, bool]:
+    """Regions whose alert flag changed since `previous` ({region: alert})."""
+    return {region: s["alert"] for region, s in region_states.items()
+            if s.get("known") and s["alert"] != previous.get(region, False)}
+
+
+class AlertIntervalStore:
+    """
+    Per-region alert intervals: closed `[start, end]` pairs plus an open-interval marker
+    for alerts still in progress, persisted atomically to one JSON file.
+
+    A region has at most one alert at a time, so its closed intervals are disjoint and
+    sorted by start and by end alike; overlap queries bisect the end times and walk
+    forward, O(log n + k). The file is re-read only when its mtime/size change. The old
+    air_raid_log.json event list is replayed into the store on first use.
+    """
+
+    def __init__(self, path: str, legacy_log: Optional[str] = None):
+        self.path = path
+        self.legacy_log = legacy_log
+        self._version = None
+        self._closed: Dict[str, List[Tuple[float, float]]] = {}
+        self._ends: Dict[str, List[float]] = {}
+        self._open: Dict[str, float] = {}
+
+    def _index(self, closed: Dict[str, list], open_: Dict[str, float]):
+        self._closed, self._ends = {}, {}
+        for region, intervals in closed.items():
+            merged = []
+            for start, end in sorted((float(s), float(e)) for s, e in intervals if e > s):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self._closed[region] = merged
+            self._ends[region] = [end for _, end in merged]
+        self._open = {region: float(ts) for region, ts in open_.items()}
+
+    def _migrate_legacy(self):
+        if not self.legacy_log or not os.path.exists(self.legacy_log) or os.path.exists(self.path):
+            return
+        events = StorageUtils.load_json_sync(self.legacy_log, default=[]) or []
+        primary = tracked_regions()[0]
+        closed, open_ = {}, {}
+        for event in sorted(events, key=lambda e: e.get("timestamp", 0)):
+            region = event.get("region", primary)
+            if event.get("event") == "active":
+                open_.setdefault(region, event["timestamp"])
+            elif event.get("event") == "clear" and region in open_:
+                closed.setdefault(region, []).append((open_.pop(region), event["timestamp"]))
+        self._index(closed, open_)
+        self._save()
+        try:
+            os.replace(self.legacy_log, self.legacy_log + ".migrated")
+        except OSError:
+            pass
+        print(f"Migrated {len(events)} air-raid events into {self.path}")
+
+    def _refresh(self):
+        self._migrate_legacy()
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._index({}, {})
+            self._version = None
+            return
+        version = (st.st_mtime_ns, st.st_size)
+        if version == self._version:
+            return
+        data = StorageUtils.load_json_sync(self.path, default={}) or {}
+        self._index(data.get("closed", {}), data.get("open", {}))
+        self._version = version
+
+    def _save(self):
+        StorageUtils.save_json_sync(self.path, {
+            "closed": {region: [list(iv) for iv in ivs] for region, ivs in self._closed.items()},
+            "open": self._open,
+        })
+        self._version = None
+
+    def record(self, changes: Dict[str, bool], ts: float):
+        """Applies alert transitions: opens a marker on alert, closes the interval on clear."""
+        if not changes: return
+        self._refresh()
+        dirty = False
+        for region, alert in changes.items():
+            if alert:
+                if region not in self._open:
+                    self._open[region] = ts
+                    dirty = True
+                continue
+            start = self._open.pop(region, None)
+            if start is None: continue
+            dirty = True
+            if ts > start:
+                closed = self._closed.setdefault(region, [])
+                bisect.insort(closed, (start, ts))
+                self._ends[region] = [end for _, end in closed]
+        if dirty:
+            self._save()
+
+    def open_since(self, region: str) -> Optional[float]:
+        self._refresh()
+        return self._open.get(region)
+
+    def overlapping(self, region: str, t0: float, t1: float, now: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Intervals of `region` overlapping [t0, t1]; an ongoing alert ends at `now`."""
+        self._refresh()
+        closed, ends = self._closed.get(region, []), self._ends.get(region, [])
+        result = []
+        i = bisect.bisect_right(ends, t0)
+        while i < len(closed) and closed[i][0] < t1:
+            result.append(closed[i])
+            i += 1
+        start = self._open.get(region)
+        if start is not None:
+            end = now if now is not None else time.time()
+            if start < t1 and end > t0:
+                result.append((start, end))
+        return result
+
+    def prune(self, before: float) -> int:
+        """Drops closed intervals that ended before `before`."""
+        self._refresh()
+        removed = 0
+        for region, closed in self._closed.items():
+            keep = bisect.bisect_left(self._ends[region], before)
+            if keep:
+                removed += keep
+                self._closed[region], self._ends[region] = closed[keep:], self._ends[region][keep:]
+        if removed:
+            self._save()
+        return removed
+
+
+alert_store = AlertIntervalStore(ALERT_INTERVALS_FILE, legacy_log=ALERT_LOG_FILE)
+
+
+def get_alert_intervals(target_date, region: Optional[str] = None, store: Optional[AlertIntervalStore] = None, now=None):
+    """
+    Alert intervals of `region` (the primary one by default) clipped to `target_date`,
+    as (start, end, True) tuples.
+    """
+    store = store or alert_store
+    region = region or tracked_regions()[0]
+    day_start = datetime.datetime.combine(target_date, datetime.time.min).replace(tzinfo=KYIV_TZ)
+    day_end = datetime.datetime.combine(target_date, datetime.time.max).replace(tzinfo=KYIV_TZ)
+    now_ts = (now or datetime.datetime.now(tz=KYIV_TZ)).timestamp()
+
+    intervals = []
+    for start_ts, end_ts in store.overlapping(region, day_start.timestamp(), day_end.timestamp(), now_ts):
+        start = max(datetime.datetime.fromtimestamp(start_ts, tz=KYIV_TZ), day_start)
+        end = min(datetime.datetime.fromtimestamp(end_ts, tz=KYIV_TZ), day_end)
+        if start < end:
+            intervals.append((start, end, True))
+    return intervals
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import fcntl
+import threading
+from typing import Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge
+
+BREAKER_STATE = Gauge('flash_circuit_breaker_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', ['breaker'])
+BREAKER_FAILURES = Gauge('flash_circuit_breaker_failures', 'Consecutive failures seen by the breaker', ['breaker'])
+BREAKER_REJECTIONS = Counter('flash_circuit_breaker_rejections_total', 'Calls skipped because the breaker was open', ['breaker'])
+
+CLOSED, HALF_OPEN, OPEN = "CLOSED", "HALF-OPEN", "OPEN"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _default_entry() -> dict:
+    return {"state": CLOSED, "failures": 0, "opens": 0, "open_until": 0.0, "probe_until": 0.0}
+
+
+class BreakerStore:
+    """
+    Breaker entries shared by every process using the same file.
+
+    Reads are served from a copy refreshed when the file's mtime/size change; updates
+    run under an flock so uvicorn workers and the background process agree on state.
+    Without a path the store is process-local.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, dict] = {}
+        self._version = None
+
+    def _load(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._data, self._version = {}, None
+            return
+        version = (st.st_mtime_ns, st.st_size)
+        if version == self._version:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._data = data if isinstance(data, dict) else {}
+        except Exception:
+            self._data = {}
+        self._version = version
+
+    def get(self, name: str) -> dict:
+        with self._lock:
+            if self.path:
+                self._load()
+            return dict(self._data.get(name) or _default_entry())
+
+    def update(self, name: str, mutate: Callable[[dict], object]):
+        """Applies `mutate` to a fresh copy of the entry and persists it if it changed."""
+        with self._lock:
+            if not self.path:
+                entry = dict(self._data.get(name) or _default_entry())
+                result = mutate(entry)
+                self._data[name] = entry
+                return entry, result
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path + ".lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._load()
+                    before = self._data.get(name) or _default_entry()
+                    entry = dict(before)
+                    result = mutate(entry)
+                    if entry != before:
+                        self._data[name] = entry
+                        tmp_path = self.path + ".tmp"
+                        with open(tmp_path, 'w', encoding='utf-8') as f:
+                            json.dump(self._data, f)
+                        os.replace(tmp_path, self.path)
+                        self._version = None
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return entry, result
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker: CLOSED -> OPEN after `failure_threshold` failures, then a single
+    HALF-OPEN probe once the recovery time passed. A failed probe reopens the breaker with
+    the recovery time doubled (capped at `max_recovery`). The probe holds a lease of
+    `probe_lease` seconds, so a caller that never reports back does not block it forever.
+    """
+
+    def __init__(self, name: str, store: BreakerStore, failure_threshold: int = 3, recovery_timeout: float = 60,
+                 max_recovery: float = 1800, probe_lease: float = 30):
+        self.name = name
+        self.store = store
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery = max_recovery
+        self.probe_lease = probe_lease
+        self._publish(store.get(name))
+
+    def _publish(self, entry: dict):
+        BREAKER_STATE.labels(breaker=self.name).set(STATE_VALUES.get(entry["state"], 0))
+        BREAKER_FAILURES.labels(breaker=self.name).set(entry["failures"])
+
+    @property
+    def state(self) -> str:
+        return self.store.get(self.name)["state"]
+
+    def can_execute(self) -> bool:
+        now = time.time()
+        entry = self.store.get(self.name)
+        if entry["state"] == CLOSED:
+            return True
+        if entry["state"] == OPEN and now < entry["open_until"]:
+            BREAKER_REJECTIONS.labels(breaker=self.name).inc()
+            return False
+        if entry["state"] == HALF_OPEN and now < entry["probe_until"]:
+            BREAKER_REJECTIONS.labels(breaker=self.name).inc()
+            return False
+
+        def take_probe(e):
+            # Re-checked under the lock: only one caller across processes gets the probe
+            if e["state"] == CLOSED:
+                return True
+            if (e["state"] == OPEN and now >= e["open_until"]) or (e["state"] == HALF_OPEN and now >= e["probe_until"]):
+                e["state"] = HALF_OPEN
+                e["probe_until"] = now + self.probe_lease
+                return True
+            return False
+
+        entry, allowed = self.store.update(self.name, take_probe)
+        self._publish(entry)
+        if not allowed:
+            BREAKER_REJECTIONS.labels(breaker=self.name).inc()
+        return allowed
+
+    def record_success(self):
+        if self.store.get(self.name) == _default_entry():
+            return
+
+        def reset(e):
+            e.update(_default_entry())
+
+        entry, _ = self.store.update(self.name, reset)
+        self._publish(entry)
+
+    def record_failure(self):
+        now = time.time()
+
+        def fail(e):
+            e["failures"] += 1
+            if e["state"] == HALF_OPEN or e["failures"] >= self.failure_threshold:
+                e["opens"] = e["opens"] + 1 if e["state"] == HALF_OPEN else max(e["opens"], 1)
+                recovery = min(self.recovery_timeout * (2 ** (e["opens"] - 1)), self.max_recovery)
+                e["state"] = OPEN
+                e["open_until"] = now + recovery
+                e["probe_until"] = 0.0
+
+        entry, _ = self.store.update(self.name, fail)
+        self._publish(entry)
+
+    def snapshot(self) -> dict:
+        entry = self.store.get(self.name)
+        return {"state": entry["state"], "failures": entry["failures"],
+                "retry_in": max(0, int(entry["open_until"] - time.time())) if entry["state"] == OPEN else 0}
+
+
+class BreakerRegistry:
+    """Breakers keyed by endpoint name, all backed by one shared store."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.store = BreakerStore(path)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str, **options) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, self.store, **options)
+        return breaker
+
+    def stats(self) -> dict:
+        return {name: b.snapshot() for name, b in self._breakers.items()}
+
+
+breakers = BreakerRegistry(os.path.join(os.environ.get("DATA_DIR", "data"), "circuit_breakers.json"))
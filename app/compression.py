@@ -0,0 +1,158 @@
+import os
+import gzip
+import mimetypes
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import FileResponse
+from prometheus_client import Counter
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSED_RESPONSES = Counter('flash_compressed_responses_total', 'Responses by content encoding', ['encoding'])
+
+# PNG/JPEG are deflate/entropy coded already; compressing them again only costs CPU
+COMPRESSIBLE = {".json", ".js", ".css", ".html", ".svg", ".txt", ".xml", ".webmanifest"}
+# Below this the encoding headers cost about as much as they save
+MIN_SIZE = 256
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# path -> mtime_ns of files that got no sidecar (no encoding shrinks them), not retried until rewritten
+_no_variant: Dict[str, int] = {}
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Encodings we can produce that the client accepts, best first."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0)
+    return [enc for enc in ("br", "gzip")
+            if (enc != "br" or brotli is not None) and accepted.get(enc, wildcard) > 0]
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else 9)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def compress_variants(body: bytes, best: bool = False) -> Dict[str, bytes]:
+    """{encoding: bytes} for every encoding that actually makes `body` smaller."""
+    if len(body) < MIN_SIZE:
+        return {}
+    variants = {}
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None: continue
+        data = compress(body, encoding, best)
+        if len(data) < len(body):
+            variants[encoding] = data
+    return variants
+
+
+def pick(variants: Dict[str, bytes], accept_encoding: Optional[str]) -> Optional[str]:
+    for encoding in accepted_encodings(accept_encoding):
+        if encoding in variants:
+            return encoding
+    return None
+
+
+def encoded_response(body: bytes, variants: Dict[str, bytes], accept_encoding: Optional[str],
+                     media_type: str, headers: Optional[dict] = None, status_code: int = 200) -> Response:
+    """Serves the best precompressed variant of `body` the client accepts."""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = pick(variants, accept_encoding)
+    COMPRESSED_RESPONSES.labels(encoding=encoding or "identity").inc()
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        body = variants[encoding]
+    return Response(content=body, media_type=media_type, headers=headers, status_code=status_code)
+
+
+def _sidecar_fresh(path: str, sidecar: str) -> bool:
+    try:
+        return os.stat(sidecar).st_mtime_ns == os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def precompress_file(path: str) -> List[str]:
+    """
+    Writes `<path>.br`/`<path>.gz` next to a compressible file, stamped with its mtime so a
+    later rewrite of the source makes them stale. Returns the encodings now available.
+    """
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE:
+        return []
+    try:
+        with open(path, "rb") as f:
+            body = f.read()
+        st = os.stat(path)
+    except OSError:
+        return []
+    available = []
+    for encoding, data in compress_variants(body, best=True).items():
+        sidecar = path + SUFFIXES[encoding]
+        tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.replace(tmp_path, sidecar)
+            available.append(encoding)
+        except OSError as e:
+            print(f"Precompress failed for {sidecar}: {e}")
+    return available
+
+
+def precompress_tree(root: str) -> int:
+    count = 0
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if precompress_file(os.path.join(dirpath, name)):
+                count += 1
+    return count
+
+
+def static_variant(path: str, accept_encoding: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(file to send, content encoding) for `path`; stale or missing sidecars are rebuilt once."""
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE:
+        return path, None
+    wanted = accepted_encodings(accept_encoding)
+    if not wanted:
+        return path, None
+    if not any(_sidecar_fresh(path, path + SUFFIXES[enc]) for enc in wanted):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return path, None
+        if st.st_size < MIN_SIZE or _no_variant.get(path) == st.st_mtime_ns:
+            return path, None
+        if not precompress_file(path):
+            _no_variant[path] = st.st_mtime_ns
+    for encoding in wanted:
+        sidecar = path + SUFFIXES[encoding]
+        if _sidecar_fresh(path, sidecar):
+            return sidecar, encoding
+    return path, None
+
+
+def static_response(path: str, accept_encoding: Optional[str], headers: Optional[dict] = None) -> FileResponse:
+    headers = dict(headers or {})
+    send_path, encoding = static_variant(path, accept_encoding)
+    if os.path.splitext(path)[1].lower() in COMPRESSIBLE:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    COMPRESSED_RESPONSES.labels(encoding=encoding or "identity").inc()
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return FileResponse(send_path, media_type=media_type, headers=headers)
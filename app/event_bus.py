@@ -0,0 +1,98 @@
+import os
+import json
+import socket
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Counter
+
+BUS_MESSAGES = Counter('flash_event_bus_messages_total', 'Inter-process bus messages', ['direction'])
+
+# Datagrams above this are not worth relaying; events are tiny notifications
+MAX_DATAGRAM = 8192
+
+
+class _BusProtocol(asyncio.DatagramProtocol):
+    def __init__(self, handler: Callable[[dict], Awaitable[None]]):
+        self.handler = handler
+
+    def datagram_received(self, data, addr):
+        try:
+            event = json.loads(data.decode("utf-8"))
+        except Exception:
+            return
+        BUS_MESSAGES.labels(direction="received").inc()
+        asyncio.ensure_future(self.handler(event))
+
+
+class EventBus:
+    """
+    Local fan-out of state-change events over unix datagram sockets in `path`.
+
+    Each web worker binds `sub-<pid>.sock` there (`start()`); `publish()` sends the event
+    to every socket found, dropping sockets whose owner is gone. Publishing never blocks:
+    a subscriber with a full buffer simply misses the event and catches up on the next one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._sock_path: Optional[str] = None
+
+    @property
+    def listening(self) -> bool:
+        return self._transport is not None
+
+    async def start(self, handler: Callable[[dict], Awaitable[None]]):
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+        self._sock_path = os.path.join(self.path, f"sub-{os.getpid()}.sock")
+        if os.path.exists(self._sock_path):
+            os.remove(self._sock_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(self._sock_path)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _BusProtocol(handler), sock=sock)
+
+    def stop(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._sock_path and os.path.exists(self._sock_path):
+            try:
+                os.remove(self._sock_path)
+            except OSError:
+                pass
+
+    def publish(self, event: dict) -> int:
+        """Sends `event` to every subscriber; returns how many received it."""
+        try:
+            names = [n for n in os.listdir(self.path) if n.endswith(".sock")]
+        except FileNotFoundError:
+            return 0
+        payload = json.dumps(event, ensure_ascii=False).encode("utf-8")
+        if len(payload) > MAX_DATAGRAM:
+            print(f"Event bus: dropping oversized event {event.get('type')}")
+            return 0
+
+        delivered = 0
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            for name in names:
+                target = os.path.join(self.path, name)
+                try:
+                    sock.sendto(payload, target)
+                    delivered += 1
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker exited without cleaning up
+                    try:
+                        os.remove(target)
+                    except OSError:
+                        pass
+                except (BlockingIOError, OSError):
+                    BUS_MESSAGES.labels(direction="dropped").inc()
+        BUS_MESSAGES.labels(direction="published").inc(delivered)
+        return delivered
+
+
+event_bus = EventBus(os.path.join(os.environ.get("DATA_DIR", "data"), "bus"))
@@ -0,0 +1,161 @@
+import os
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+from app.storage import StorageUtils
+
+# Same cap log_event always applied to event_log.json
+MAX_EVENTS = 1000
+
+
+def with_durations(events: List[dict]) -> List[dict]:
+    """Sorts by time and sets `duration_prev`: seconds since the previous event (None for the first)."""
+    events = sorted((e for e in events if isinstance(e, dict) and "timestamp" in e), key=lambda e: e["timestamp"])
+    for i, event in enumerate(events):
+        event["duration_prev"] = event["timestamp"] - events[i - 1]["timestamp"] if i else None
+    return events
+
+
+class EventStore:
+    """
+    Power up/down events in event_log.json, kept sorted with `duration_prev` precomputed
+    when the log is written, so readers never rescan it.
+
+    The file stays a plain JSON list (the reports read it directly). Each process parses it
+    once per mtime/size change and answers range and page queries by bisecting the
+    timestamps: O(log n + limit) however long the history is. Writers must hold the
+    state lock, as log_event always did.
+    """
+
+    def __init__(self, path: str, max_events: int = MAX_EVENTS):
+        self.path = path
+        self.max_events = max_events
+        self._version = None
+        self._events: List[dict] = []
+        self._ts: List[float] = []
+        self._last: Dict[str, int] = {}
+
+    def _index(self, events: List[dict]):
+        self._events = events
+        self._ts = [e["timestamp"] for e in events]
+        self._last = {}
+        for i, event in enumerate(events):
+            self._last[event.get("event")] = i
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._index([])
+            self._version = None
+            return
+        version = (st.st_mtime_ns, st.st_size)
+        if version == self._version:
+            return
+        events = StorageUtils.load_json_sync(self.path, default=[])
+        events = events if isinstance(events, list) else []
+        # Logs written before durations were stored, or edited by hand
+        if not all(isinstance(e, dict) and "timestamp" in e and "duration_prev" in e for e in events) or \
+                any(events[i]["timestamp"] < events[i - 1]["timestamp"] for i in range(1, len(events))):
+            events = with_durations(events)
+        self._index(events)
+        self._version = version
+
+    def _save(self, events: List[dict]) -> bool:
+        ok = StorageUtils.save_json_sync(self.path, events[-self.max_events:])
+        self._version = None
+        return ok
+
+    def __len__(self):
+        self._refresh()
+        return len(self._events)
+
+    def latest(self, limit: int) -> List[dict]:
+        """Newest first."""
+        self._refresh()
+        return [dict(e) for e in reversed(self._events[-limit:])] if limit > 0 else []
+
+    def last_of(self, event_type: str) -> Optional[dict]:
+        self._refresh()
+        i = self._last.get(event_type)
+        return dict(self._events[i]) if i is not None else None
+
+    def first_timestamp(self) -> Optional[float]:
+        self._refresh()
+        return self._ts[0] if self._ts else None
+
+    def between(self, t0: float, t1: float) -> List[dict]:
+        """Events with t0 <= timestamp < t1, oldest first (shared, do not modify)."""
+        self._refresh()
+        return self._events[bisect.bisect_left(self._ts, t0):bisect.bisect_left(self._ts, t1)]
+
+    def before(self, ts: float) -> Optional[dict]:
+        """The last event strictly before `ts`: the state at that moment."""
+        self._refresh()
+        i = bisect.bisect_left(self._ts, ts)
+        return self._events[i - 1] if i else None
+
+    def next_of(self, event_type: str, ts: float) -> Optional[dict]:
+        """The first `event_type` event after `ts`."""
+        self._refresh()
+        for event in self._events[bisect.bisect_right(self._ts, ts):]:
+            if event.get("event") == event_type:
+                return event
+        return None
+
+    def query(self, t_from: Optional[float] = None, t_to: Optional[float] = None, limit: int = 20,
+              cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Events with t_from <= timestamp < t_to, newest first, `limit` per page. The returned
+        cursor (None on the last page) continues below the oldest event of this page.
+
+        A cursor is "<timestamp>:<n>": the page continues with the events older than
+        `timestamp` plus the `n` events at exactly `timestamp` that did not fit, so events
+        sharing a timestamp are never skipped. Positions are not used, pruning shifts them.
+        """
+        self._refresh()
+        lo = bisect.bisect_left(self._ts, t_from) if t_from is not None else 0
+        hi = bisect.bisect_left(self._ts, t_to) if t_to is not None else len(self._ts)
+        if cursor:
+            try:
+                ts, _, pending = cursor.partition(":")
+                ts_start = bisect.bisect_left(self._ts, float(ts))
+                pending = int(pending) if pending else 0
+            except ValueError:
+                raise ValueError("invalid cursor")
+            hi = min(hi, min(ts_start + max(pending, 0), bisect.bisect_right(self._ts, float(ts))))
+        start = max(lo, hi - max(limit, 0))
+        page = [dict(e) for e in reversed(self._events[start:hi])]
+        next_cursor = None
+        if page and start > lo:
+            ts = self._ts[start]
+            next_cursor = f"{ts!r}:{start - bisect.bisect_left(self._ts, ts)}"
+        return page, next_cursor
+
+    def append(self, entry: dict):
+        self._refresh()
+        if not self._events or entry["timestamp"] >= self._ts[-1]:
+            # The common case: only the new entry needs a duration
+            previous = self._ts[-1] if self._ts else None
+            entry = dict(entry, duration_prev=entry["timestamp"] - previous if previous is not None else None)
+            self._save(self._events + [entry])
+        else:
+            # Back-dated entry added from the admin panel: its successor's duration changes too
+            self._save(with_durations([dict(e) for e in self._events] + [dict(entry)]))
+
+    def delete(self, timestamp: float, margin: float = 0.1) -> int:
+        self._refresh()
+        events = [dict(e) for e in self._events if abs(e["timestamp"] - timestamp) > margin]
+        removed = len(self._events) - len(events)
+        if removed:
+            self._save(with_durations(events))
+        return removed
+
+    def prune(self, before: float) -> int:
+        """Drops events at or before `before`."""
+        self._refresh()
+        keep = bisect.bisect_right(self._ts, before)
+        if keep:
+            # The oldest survivor keeps its duration: the event before it did happen
+            self._save(self._events[keep:])
+        return keep
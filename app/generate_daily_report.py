@@ -9,6 +9,10 @@ import sys
 import shutil
 from dotenv import load_dotenv
 
+from app.schedule_timeline import slots_to_runs
+from app.air_alerts import get_alert_intervals
+from app.compression import precompress_file
+
 # Load environment variables
 load_dotenv()
 
@@ -32,7 +36,6 @@ if "PYTEST_CURRENT_TEST" in os.environ:
     CHAT_ID = "6313526220"
 EVENT_LOG_FILE = os.path.join(DATA_DIR, "event_log.json")
 SCHEDULE_FILE = os.path.join(DATA_DIR, "last_schedules.json")
-HISTORY_FILE = os.path.join(DATA_DIR, "schedule_history.json")
 REPORT_ID_FILE = os.path.join(DATA_DIR, "daily_report_id.json")
 def get_timezone():
     try:
@@ -62,47 +65,6 @@ def get_quiet_status():
     return "active"
 
 
-def get_alert_intervals(target_date):
-    log_file = os.path.join(DATA_DIR, "air_raid_log.json")
-    if not os.path.exists(log_file):
-        return []
-    try:
-        with open(log_file, "r") as f:
-            data = json.load(f)
-    except Exception:
-        return []
-    
-    intervals = []
-    current_start = None
-    
-    day_start = datetime.datetime.combine(target_date, datetime.time.min).replace(tzinfo=KYIV_TZ)
-    day_end = datetime.datetime.combine(target_date, datetime.time.max).replace(tzinfo=KYIV_TZ)
-    
-    # Process events
-    for event in data:
-        dt = datetime.datetime.fromtimestamp(event["timestamp"], tz=KYIV_TZ)
-        if event["event"] == "active":
-            if current_start is None:
-                current_start = dt
-        elif event["event"] == "clear":
-            if current_start is not None:
-                start = max(current_start, day_start)
-                end = min(dt, day_end)
-                if start < end:
-                    intervals.append((start, end, True))
-                current_start = None
-                
-    # If alert is still ongoing
-    if current_start is not None:
-        start = max(current_start, day_start)
-        now = datetime.datetime.now(tz=KYIV_TZ)
-        end = min(now, day_end)
-        if start < end:
-            intervals.append((start, end, True))
-            
-    return intervals
-
-
 def load_events():
     if not os.path.exists(EVENT_LOG_FILE):
         return []
@@ -115,68 +77,16 @@ def load_events():
 def load_schedule_slots(target_date):
     """
     Returns the list of 48 boolean slots (True=Light, False=Outage) for the target date.
-    Checks last_schedules.json first, then schedule_history.json.
+    Resolved through the shared schedule timeline (last_schedules.json, then the schedule history store).
     """
-    date_str = target_date.strftime("%Y-%m-%d")
-    
-    # 1. Try last_schedules.json (current/future)
-    if os.path.exists(SCHEDULE_FILE):
-        try:
-            with open(SCHEDULE_FILE, 'r') as f:
-                data = json.load(f)
-            
-            # Get priority order from config
-            from app.light_service import get_config
-            cfg = get_config()
-            user_priority = cfg.get("advanced", {}).get("data_sources", {}).get("priority", "yasno")
-            priority_order = ['yasno', 'github']
-            if user_priority in ['yasno', 'github']:
-                priority_order = [user_priority] + [s for s in priority_order if s != user_priority]
-            
-            # Find the best source with actual slots
-            for s_key in priority_order:
-                source = data.get(s_key)
-                if not source: continue
-                group_key = list(source.keys())[0]
-                schedule_data = source.get(group_key, {})
-                
-                if date_str in schedule_data and schedule_data[date_str].get('slots'):
-                     return list(schedule_data[date_str]['slots'])
-            
-            # Fallback to merging ONLY if no priority source has slots
-            merged_slots = None
-            for s_key in ['github', 'yasno']:
-                source = data.get(s_key)
-                if not source: continue
-                group_key = list(source.keys())[0]
-                schedule_data = source.get(group_key, {})
-                
-                if date_str in schedule_data and schedule_data[date_str].get('slots'):
-                     s = schedule_data[date_str]['slots']
-                     if merged_slots is None:
-                         merged_slots = list(s)
-                     else:
-                         for i in range(min(len(merged_slots), len(s))):
-                             if s[i] is False: merged_slots[i] = False
-            
-            if merged_slots:
-                return merged_slots
-        except Exception as e:
-            print(f"Error loading schedule: {e}")
+    try:
+        from app.light_service import get_schedule_timeline
+        slots = get_schedule_timeline().slots_for_day(target_date)
+        if slots:
+            return slots
+    except Exception as e:
+        print(f"Error loading schedule: {e}")
 
-    # 2. Try schedule_history.json (past)
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, 'r') as f:
-                history = json.load(f)
-                if date_str in history:
-                    res = history[date_str]
-                    if isinstance(res, dict):
-                        return res.get('slots', [True] * 48)
-                    return res
-        except Exception as e:
-            print(f"Error loading history: {e}")
-            
     # If no schedule found, assume Light (True) for the whole day
     return [True] * 48
 
@@ -244,32 +154,11 @@ def get_schedule_intervals(target_date, slots):
     """
     if not slots: return []
     
-    intervals = []
     day_start = datetime.datetime.combine(target_date, datetime.time.min).replace(tzinfo=KYIV_TZ)
-    
-    current_state = slots[0]
-    start_idx = 0
-    
-    for i in range(1, 48):
-        if slots[i] != current_state:
-            # End of block
-            end_idx = i
-            
-            # Create interval
-            start_time = day_start + datetime.timedelta(minutes=start_idx*30)
-            duration = (end_idx - start_idx) * 0.5 # hours
-            intervals.append((start_time, duration, current_state))
-            
-            # Start new block
-            current_state = slots[i]
-            start_idx = i
-            
-    # Final block
-    start_time = day_start + datetime.timedelta(minutes=start_idx*30)
-    duration = (48 - start_idx) * 0.5
-    intervals.append((start_time, duration, current_state))
-    
-    return intervals
+    return [
+        (day_start + datetime.timedelta(minutes=start_idx*30), (end_idx - start_idx) * 0.5, state)
+        for start_idx, end_idx, state in slots_to_runs(slots[:48])
+    ]
 
 def format_duration(seconds):
     total_minutes = round(seconds / 60)
@@ -615,8 +504,10 @@ if __name__ == "__main__":
                 "pct": int(compliance_pct),
                 "updated_at": datetime.datetime.now(KYIV_TZ).strftime("%H:%M")
             }
-            with open(os.path.join(web_dir, "stats.json"), "w") as f:
+            stats_path = os.path.join(web_dir, "stats.json")
+            with open(stats_path, "w") as f:
                 json.dump(stats_data, f)
+            precompress_file(stats_path)
         except Exception as e:
             print(f"Error saving stats json: {e}")
                
@@ -31,6 +31,8 @@ if "PYTEST_CURRENT_TEST" in os.environ:
 CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
 SCHEDULE_FILE = os.path.join(DATA_DIR, "last_schedules.json")
 TEXT_REPORT_ID_FILE = os.path.join(DATA_DIR, "text_report_id.json")
+SCHEDULE_DIFF_FILE = os.path.join(DATA_DIR, "schedule_diff.json")
+SCHEDULE_DIFF_MAX_AGE = 12 * 3600
 
 def get_timezone():
     try:
@@ -43,11 +45,26 @@ def get_timezone():
     return ZoneInfo("Europe/Kyiv")
 
 from app.generate_daily_report import KYIV_TZ, DAYS_UA, get_quiet_status
+from app.schedule_timeline import slots_to_runs
+from app.schedule_diff import ScheduleDiff
 
 def load_config():
     with open(CONFIG_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def get_change_summary(dates, group):
+    """Lines describing the latest schedule change for the shown dates, if it is recent."""
+    try:
+        if not os.path.exists(SCHEDULE_DIFF_FILE): return []
+        with open(SCHEDULE_DIFF_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if datetime.datetime.now().timestamp() - data.get("generated_at", 0) > SCHEDULE_DIFF_MAX_AGE:
+            return []
+        return ScheduleDiff.from_dict(data).summary_lines(dates, group)
+    except Exception as e:
+        print(f"Error loading schedule diff: {e}")
+        return []
+
 def format_slot_time(slot_idx, is_end=False):
     idx = slot_idx % 48
     mins = idx * 30
@@ -56,27 +73,10 @@ def format_slot_time(slot_idx, is_end=False):
     return f"{h:02d}:{m:02d}"
 
 def get_all_intervals(slots):
-    if not slots: return []
-    intervals = []
-    current_state = slots[0]
-    start_idx = 0
-    for i in range(1, len(slots)):
-        if slots[i] != current_state:
-            intervals.append({
-                "state": current_state, 
-                "start_idx": start_idx, 
-                "end_idx": i,
-                "duration": (i - start_idx) * 0.5
-            })
-            start_idx = i
-            current_state = slots[i]
-    intervals.append({
-        "state": current_state, 
-        "start_idx": start_idx, 
-        "end_idx": len(slots),
-        "duration": (len(slots) - start_idx) * 0.5
-    })
-    return intervals
+    return [
+        {"state": state, "start_idx": start_idx, "end_idx": end_idx, "duration": (end_idx - start_idx) * 0.5}
+        for start_idx, end_idx, state in slots_to_runs(slots)
+    ]
 
 def format_duration(hours):
     if hours == int(hours): return str(int(hours))
@@ -359,6 +359,9 @@ def main():
     
     updated_text = cfg.get('ui', {}).get('text', {}).get('updated', 'Оновлено')
     footer = f"🕐 {updated_text}: {now.strftime('%H:%M')}"
+    change_lines = get_change_summary(days_to_process, group)
+    if change_lines:
+        footer += "\n✏️ Зміни: " + "\n".join(change_lines)
     full_text = f"{base_text}\n\n{footer}"
     
     last_id = today_state.get(f"{target_slot}_id") if not force_new else None
@@ -13,6 +13,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import necessary functions from the daily report script to reuse logic
+from app.schedule_timeline import slots_to_runs
+from app.air_alerts import get_alert_intervals
+from app.telegram_client import TELEGRAM_API_BASE
 from app.generate_daily_report import load_events, get_intervals_for_date, format_duration, KYIV_TZ, load_schedule_slots, get_quiet_status
 
 # --- Configuration ---
@@ -37,47 +40,6 @@ EVENT_LOG_FILE = os.path.join(DATA_DIR, "event_log.json")
 HISTORY_FILE = os.path.join(DATA_DIR, "schedule_history.json")
 
 
-def get_alert_intervals(target_date):
-    import os, json, datetime
-    from zoneinfo import ZoneInfo
-    log_file = "data/air_raid_log.json"
-    if not os.path.exists(log_file):
-        return []
-    try:
-        with open(log_file, "r") as f:
-            data = json.load(f)
-    except Exception:
-        return []
-    
-    intervals = []
-    current_start = None
-    KYIV_TZ = ZoneInfo("Europe/Kyiv")
-    day_start = datetime.datetime.combine(target_date, datetime.time.min).replace(tzinfo=KYIV_TZ)
-    day_end = datetime.datetime.combine(target_date, datetime.time.max).replace(tzinfo=KYIV_TZ)
-    
-    for event in data:
-        dt = datetime.datetime.fromtimestamp(event["timestamp"], tz=KYIV_TZ)
-        if event["event"] == "active":
-            if current_start is None:
-                current_start = dt
-        elif event["event"] == "clear":
-            if current_start is not None:
-                start = max(current_start, day_start)
-                end = min(dt, day_end)
-                if start < end:
-                    intervals.append((start, end, True))
-                current_start = None
-                
-    if current_start is not None:
-        start = max(current_start, day_start)
-        now = datetime.datetime.now(tz=KYIV_TZ)
-        end = min(now, day_end)
-        if start < end:
-            intervals.append((start, end, True))
-            
-    return intervals
-
-
 def get_schedule_slots(date_obj):
     """
     Wrapper around load_schedule_slots from daily report to ensure consistent logic.
@@ -89,19 +51,7 @@ def get_schedule_slots(date_obj):
         return [True] * 48
 
 def slots_to_intervals(slots):
-    if not slots: return []
-    intervals = []
-    start_idx = 0
-    current_state = slots[0]
-    for i in range(1, len(slots)):
-        if slots[i] != current_state:
-            duration = (i - start_idx) * 0.5
-            intervals.append((start_idx * 0.5, duration, current_state))
-            current_state = slots[i]
-            start_idx = i
-    duration = (len(slots) - start_idx) * 0.5
-    intervals.append((start_idx * 0.5, duration, current_state))
-    return intervals
+    return [(start_idx * 0.5, (end_idx - start_idx) * 0.5, state) for start_idx, end_idx, state in slots_to_runs(slots)]
 
 def get_weekly_stats(start_date, end_date, events):
     """
@@ -341,7 +291,7 @@ def generate_weekly_chart(end_date, daily_data, theme='dark'):
     return filename
 
 def send_telegram_photo(photo_path, caption):
-    url = f"https://api.telegram.org/bot{TOKEN}/sendPhoto"
+    url = f"{TELEGRAM_API_BASE}/bot{TOKEN}/sendPhoto"
     with open(photo_path, 'rb') as f:
         files = {'photo': f}
         data = {'chat_id': CHAT_ID, 'caption': caption, 'parse_mode': 'HTML', 'disable_notification': True}
@@ -0,0 +1,76 @@
+from typing import Dict, Optional
+
+from prometheus_client import Counter
+
+from app.storage import StorageUtils
+
+CONDITIONAL_REQUESTS = Counter(
+    'flash_upstream_conditional_requests_total',
+    'Upstream fetches by validator outcome (hit = 304 Not Modified, miss = full body)',
+    ['source', 'result']
+)
+
+# Returned by fetchers when the upstream answered 304 Not Modified
+NOT_MODIFIED = object()
+
+
+class ValidatorStore:
+    """
+    Persists ETag / Last-Modified validators per URL in DATA_DIR.
+
+    New validators are only staged by `remember()` and written by `commit()`,
+    which callers do after the fetched body has been stored. A crash between
+    download and save therefore never leaves a validator for data we do not have.
+
+    `scopes` ({source: fingerprint}) describes how the stored data of a source was
+    filtered. Validators saved under another fingerprint are dropped, since a 304 would
+    then hand back data filtered for the old settings.
+    """
+
+    def __init__(self, path: str, scopes: Optional[Dict[str, str]] = None):
+        self.path = path
+        data = StorageUtils.load_json_sync(path, default={})
+        self._data: Dict[str, dict] = data if isinstance(data, dict) else {}
+        self._staged: Dict[str, Optional[dict]] = {}
+        self.scopes = scopes or {}
+        for url, entry in list(self._data.items()):
+            source = entry.get("source") if isinstance(entry, dict) else None
+            if source in self.scopes and entry.get("scope") != self.scopes[source]:
+                del self._data[url]
+                self._staged[url] = None
+
+    def headers(self, url: str) -> dict:
+        entry = self._data.get(url) or {}
+        headers = {}
+        if entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def remember(self, url: str, response, source: str):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._staged[url] = {"etag": etag, "last_modified": last_modified, "source": source}
+            if source in self.scopes:
+                self._staged[url]["scope"] = self.scopes[source]
+        else:
+            self._staged[url] = None
+
+    def forget_source(self, source: str):
+        """Drops validators of a source whose data is no longer cached locally."""
+        for url, entry in list(self._data.items()):
+            if entry.get("source") == source:
+                del self._data[url]
+                self._staged[url] = None
+
+    def commit(self):
+        if not self._staged: return
+        for url, entry in self._staged.items():
+            if entry is None: self._data.pop(url, None)
+            else: self._data[url] = entry
+        self._staged = {}
+        StorageUtils.save_json_sync(self.path, self._data)
+
+
+def record_result(source: str, not_modified: bool):
+    CONDITIONAL_REQUESTS.labels(source=source, result="hit" if not_modified else "miss").inc()
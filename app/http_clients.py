@@ -0,0 +1,115 @@
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+HTTP_CLIENT_REQUESTS = Counter('flash_http_client_requests_total', 'Outgoing requests per shared HTTP client', ['client'])
+HTTP_POOL_CONNECTIONS = Gauge('flash_http_pool_connections', 'Pooled upstream connections per shared HTTP client', ['client', 'state'])
+
+# One client per upstream family, so each gets its own small per-host pool
+CLIENT_PROFILES = {
+    "schedules": {"max_connections": 6, "max_keepalive": 6, "timeout": 20.0},
+    "alerts": {"max_connections": 2, "max_keepalive": 2, "timeout": 5.0},
+    "air_quality": {"max_connections": 4, "max_keepalive": 4, "timeout": 5.0},
+}
+DEFAULT_PROFILE = {"max_connections": 4, "max_keepalive": 4, "timeout": 10.0}
+KEEPALIVE_EXPIRY = 120.0
+CONNECT_TIMEOUT = 5.0
+
+
+def _pool_connections(client: httpx.AsyncClient):
+    # httpcore does not expose pool stats through httpx, read them defensively
+    try:
+        return list(client._transport._pool.connections)
+    except Exception:
+        return []
+
+
+class HttpClientRegistry:
+    """
+    Application-scoped httpx.AsyncClient instances with keep-alive (and HTTP/2 when `h2` is installed).
+
+    `start()` binds the registry to the running event loop (FastAPI lifespan,
+    run_background.main); `aclose()` closes every client on shutdown. Code running
+    on another loop, or before `start()`, gets a short-lived client from `session()`.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    @property
+    def started(self) -> bool:
+        try:
+            return self._loop is not None and self._loop is asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        profile = CLIENT_PROFILES.get(name, DEFAULT_PROFILE)
+
+        async def on_request(request):
+            HTTP_CLIENT_REQUESTS.labels(client=name).inc()
+
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=profile["max_connections"],
+                max_keepalive_connections=profile["max_keepalive"],
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(profile["timeout"], connect=CONNECT_TIMEOUT),
+            follow_redirects=True,
+            event_hooks={"request": [on_request]},
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Warm client for `name`; only valid on the loop the registry was started on."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build(name)
+            self._clients[name] = client
+            HTTP_POOL_CONNECTIONS.labels(client=name, state="active").set_function(
+                lambda: sum(1 for c in _pool_connections(client) if not c.is_idle()))
+            HTTP_POOL_CONNECTIONS.labels(client=name, state="idle").set_function(
+                lambda: sum(1 for c in _pool_connections(client) if c.is_idle()))
+        return client
+
+    @asynccontextmanager
+    async def session(self, name: str):
+        """Shared client when the registry runs on this loop, a throwaway one otherwise."""
+        if self.started:
+            yield self.get(name)
+            return
+        async with self._build(name) as client:
+            yield client
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"Error closing HTTP client: {e}")
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "http2": HTTP2_AVAILABLE,
+                "connections": len(_pool_connections(client)),
+                "idle": sum(1 for c in _pool_connections(client) if c.is_idle()),
+            }
+            for name, client in self._clients.items()
+        }
+
+
+http_clients = HttpClientRegistry()
@@ -0,0 +1,146 @@
+import os
+import time
+import fcntl
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+JOB_RUNS = Counter('flash_job_runs_total', 'Jobs executed by the coalescing queue', ['job'])
+JOB_SKIPS = Counter('flash_job_skips_total', 'Job requests absorbed by an already pending job', ['job'])
+JOB_FAILURES = Counter('flash_job_failures_total', 'Jobs that raised an exception', ['job'])
+JOB_QUEUE_DEPTH = Gauge('flash_job_queue_depth', 'Running plus pending jobs per job type', ['job'])
+
+
+class _JobSlot:
+    def __init__(self, name: str):
+        self.name = name
+        self.pending: Optional[Tuple[Callable, tuple, dict]] = None
+        self.lock: Optional[str] = None
+        self.running = False
+        self.last_submit = 0.0
+        self.debounce: Optional[float] = None
+        self.worker: Optional[threading.Thread] = None
+        self.runs = 0
+        self.skips = 0
+        self.failures = 0
+        self.last_run_at = 0.0
+
+    @property
+    def depth(self) -> int:
+        return int(self.running) + int(self.pending is not None)
+
+
+class CoalescingJobQueue:
+    """
+    Per-job-type queue that keeps at most one running and one pending job.
+
+    A new request for a job type that already has a pending job replaces it,
+    so a burst of triggers collapses into a single run that sees the final state.
+    The pending job only starts once no newer request arrived for `debounce` seconds.
+    When `lock_dir` is set, runs hold an flock on `<lock_dir>/<job>.lock`, which
+    serialises the same job across processes without leaving stale cooldown files;
+    job types that must not overlap (they edit the same output) share a `lock` name.
+    """
+
+    def __init__(self, debounce: float = 0.0, lock_dir: Optional[str] = None):
+        self.debounce = debounce
+        self.lock_dir = lock_dir
+        self._cond = threading.Condition()
+        self._slots: Dict[str, _JobSlot] = {}
+
+    def submit(self, name: str, func: Callable, *args, debounce: Optional[float] = None,
+               sticky: Iterable[str] = (), lock: Optional[str] = None, **kwargs) -> bool:
+        """
+        Queues `func` under `name`. Returns False if it replaced an already pending job.
+        Boolean kwargs named in `sticky` stay set when a later request replaces the job.
+        """
+        with self._cond:
+            slot = self._slots.setdefault(name, _JobSlot(name))
+            replaced = slot.pending is not None
+            if replaced:
+                for key in sticky:
+                    kwargs[key] = bool(kwargs.get(key)) or bool(slot.pending[2].get(key))
+            slot.pending = (func, args, kwargs)
+            slot.lock = lock
+            slot.last_submit = time.monotonic()
+            if debounce is not None:
+                slot.debounce = debounce
+            if replaced:
+                slot.skips += 1
+                JOB_SKIPS.labels(job=name).inc()
+            JOB_QUEUE_DEPTH.labels(job=name).set(slot.depth)
+            if slot.worker is None:
+                slot.worker = threading.Thread(target=self._worker, args=(slot,), name=f"job-{name}", daemon=True)
+                slot.worker.start()
+            self._cond.notify_all()
+        return not replaced
+
+    def _worker(self, slot: _JobSlot):
+        while True:
+            with self._cond:
+                if slot.pending is None:
+                    slot.worker = None
+                    JOB_QUEUE_DEPTH.labels(job=slot.name).set(slot.depth)
+                    return
+                debounce = self.debounce if slot.debounce is None else slot.debounce
+                wait = slot.last_submit + debounce - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                (func, args, kwargs), slot.pending = slot.pending, None
+                job = lambda: func(*args, **kwargs)
+                lock = slot.lock or slot.name
+                slot.running = True
+                JOB_QUEUE_DEPTH.labels(job=slot.name).set(slot.depth)
+
+            try:
+                self._run_locked(lock, job)
+            except Exception as e:
+                slot.failures += 1
+                JOB_FAILURES.labels(job=slot.name).inc()
+                print(f"Job {slot.name} failed: {e}")
+            finally:
+                with self._cond:
+                    slot.running = False
+                    slot.runs += 1
+                    slot.last_run_at = time.time()
+                    JOB_RUNS.labels(job=slot.name).inc()
+                    JOB_QUEUE_DEPTH.labels(job=slot.name).set(slot.depth)
+                    self._cond.notify_all()
+
+    def _run_locked(self, name: str, job: Callable[[], None]):
+        if not self.lock_dir:
+            job()
+            return
+        os.makedirs(self.lock_dir, exist_ok=True)
+        with open(os.path.join(self.lock_dir, f"{name}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                job()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until no job is running or pending. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(s.depth for s in self._slots.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                name: {
+                    "runs": s.runs,
+                    "skips": s.skips,
+                    "failures": s.failures,
+                    "queue_depth": s.depth,
+                    "last_run_at": s.last_run_at,
+                }
+                for name, s in self._slots.items()
+            }
@@ -11,16 +11,27 @@ import secrets
 import datetime
 from zoneinfo import ZoneInfo
 import requests
-from app.telegram_client import TelegramClient
+from app.telegram_client import TelegramClient, TELEGRAM_API_BASE
 import subprocess
 from urllib.parse import urlparse, parse_qs
 import sys
 import re
 import fcntl
-import hashlib
 from dotenv import load_dotenv
 
 from app.parser_service import update_local_schedules
+from app.schedule_timeline import load_timeline, load_group_timelines
+from app.schedule_diff import ScheduleDiff, diff_schedules
+from app.schedule_history import HistoryStore
+from app.event_store import EventStore
+from app.stats import DailyStats
+from app.http_cache import ValidatorStore, record_result
+from app.http_clients import http_clients
+from app.adaptive_poller import AdaptivePoller
+from app.circuit_breaker import breakers
+from app.event_bus import event_bus
+from app.air_alerts import (tracked_regions, parse_states, summarize, region_transitions, region_label, alert_store,
+                            ALERT_INTERVALS_FILE)
 
 # Load environment variables
 load_dotenv()
@@ -139,24 +150,26 @@ def prune_old_data():
         sched_days = retention.get("schedule_history_days", 14)
         
         now = time.time()
+
+        # 0. Aggregate days into stats_daily.json before their raw data goes
+        daily_stats.update(now)
         
         # 1. Prune event_log.json
-        logs = StorageUtils.load_json_sync(EVENT_LOG_FILE, default=None)
-        if logs:
-            cutoff = now - (log_days * 86400)
-            new_logs = [l for l in logs if l.get('timestamp', 0) > cutoff]
-            if len(new_logs) < len(logs):
-                StorageUtils.save_json_sync(EVENT_LOG_FILE, new_logs)
-                print(f"Pruned {len(logs) - len(new_logs)} old events.")
-
-        # 2. Prune schedule_history.json
-        history = StorageUtils.load_json_sync(HISTORY_FILE, default=None)
-        if history:
-            cutoff_date = (datetime.datetime.now(KYIV_TZ) - datetime.timedelta(days=sched_days)).strftime("%Y-%m-%d")
-            new_history = {d: v for d, v in history.items() if d >= cutoff_date}
-            if len(new_history) < len(history):
-                StorageUtils.save_json_sync(HISTORY_FILE, new_history)
-                print(f"Pruned {len(history) - len(new_history)} old schedule records.")
+        pruned = event_store.prune(now - (log_days * 86400))
+        if pruned:
+            print(f"Pruned {pruned} old events.")
+
+        # 2. Prune schedule history (one file per date)
+        cutoff_date = (datetime.datetime.now(KYIV_TZ) - datetime.timedelta(days=sched_days)).strftime("%Y-%m-%d")
+        pruned = history_store.prune(cutoff_date)
+        if pruned:
+            print(f"Pruned {pruned} old schedule records.")
+
+        # 3. Prune closed air-raid intervals
+        alert_days = retention.get("alert_history_days", 30)
+        pruned = alert_store.prune(now - alert_days * 86400)
+        if pruned:
+            print(f"Pruned {pruned} old air-raid intervals.")
     except Exception as e:
         print(f"Error during data pruning: {e}")
 
@@ -188,13 +201,20 @@ STATE_FILE = os.path.join(DATA_DIR, "power_monitor_state.json")
 STATE_LOCK_FILE = os.path.join(DATA_DIR, "power_monitor_state.lock")
 SCHEDULE_FILE = os.path.join(DATA_DIR, "last_schedules.json")
 
-from app.storage import SafeStateContextAsync, StorageUtils
+from app.storage import SafeStateContextAsync, StorageUtils, file_version
+from app.job_queue import CoalescingJobQueue
 state_mgr = SafeStateContextAsync(STATE_LOCK_FILE)
 
 HISTORY_FILE = os.path.join(DATA_DIR, "schedule_history.json")
+HISTORY_DIR = os.path.join(DATA_DIR, "schedule_history")
+history_store = HistoryStore(HISTORY_DIR, legacy_file=HISTORY_FILE)
 EVENT_LOG_FILE = os.path.join(DATA_DIR, "event_log.json")
+event_store = EventStore(EVENT_LOG_FILE)
+SCHEDULE_DIFF_FILE = os.path.join(DATA_DIR, "schedule_diff.json")
+HTTP_VALIDATORS_FILE = os.path.join(DATA_DIR, "http_validators.json")
+POLLER_STATE_FILE = os.path.join(DATA_DIR, "schedule_poller.json")
 SCHEDULE_API_URL = os.environ.get("SCHEDULE_API_URL", "")
-ALERTS_API_URL = "https://ubilling.net.ua/aerialalerts/"
+ALERTS_API_URL = os.environ.get("ALERTS_API_URL", "https://ubilling.net.ua/aerialalerts/")
 
 def get_timezone():
     try:
@@ -233,111 +253,51 @@ state = {
     "last_schedule_hash": None
 }
 
+# --- Report Jobs ---
+# Bursts of triggers (several pushes, a schedule change and the 10-minute tick)
+# collapse into one pending run per report that renders the latest state.
+REPORT_DEBOUNCE_SEC = 2.0
+report_jobs = CoalescingJobQueue(debounce=REPORT_DEBOUNCE_SEC, lock_dir=DATA_DIR)
+
+def _run_report_module(module, *args, check=True):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "-m", module, *args], check=check, cwd=os.path.dirname(base_dir))
+
 def trigger_daily_report_update(is_final=False):
     """
-    Triggers the generation and update of the daily report chart.
-    Runs asynchronously to not block the main thread.
-    Uses a lock file to prevent concurrent executions and excessive triggering.
+    Queues the generation and update of the daily report chart.
+    Runs in a background thread; concurrent triggers are coalesced by report_jobs.
     """
     def run_script():
-        lock_file = os.path.join(DATA_DIR, "daily_report.lock")
-        try:
-            # 1. Check for cooldown/lock
-            now = time.time()
-            try:
-                # Atomic creation of lock file to prevent race conditions
-                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-                with os.fdopen(fd, 'w') as f:
-                    f.write(str(os.getpid()))
-            except FileExistsError:
-                # If file exists, check if it's stale
-                try:
-                    mtime = os.path.getmtime(lock_file)
-                    if (now - mtime) < 15: return
-                    os.utime(lock_file, (now, now))
-                except: pass
-            
-            print(f"Triggering daily report update (is_final={is_final})...")
-            # Use absolute paths
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            python_exec = sys.executable
-            script_path = "-m"; script_name = "app.generate_daily_report"
-            
-            # Run with --final if requested
-            args = [python_exec, script_path]
-            if is_final:
-                args.append("--final")
-            
-            args[1] = "-m"; args.insert(2, "app.generate_daily_report"); subprocess.run(args, check=True, cwd=os.path.dirname(base_dir))
-            
-        except Exception as e:
-            print(f"Failed to trigger daily report: {e}")
-        finally:
-            # Note: We don't necessarily delete the lock file to keep it as a cooldown marker
-            pass
+        print(f"Triggering daily report update (is_final={is_final})...")
+        _run_report_module("app.generate_daily_report", *(["--final"] if is_final else []))
 
-    threading.Thread(target=run_script).start()
+    # The end-of-day final report must not be replaced by a regular refresh, but both edit
+    # the same Telegram message, so they never run at the same time
+    report_jobs.submit("daily_report_final" if is_final else "daily_report", run_script, lock="daily_report")
 
-def trigger_text_report_update():
+def trigger_text_report_update(force_new=False):
     """
-    Triggers the generation and update of the text schedule report in Telegram.
+    Queues the generation and update of the text schedule report in Telegram.
     """
-    def run_script():
-        lock_file = os.path.join(DATA_DIR, "text_report.lock")
-        try:
-            now = time.time()
-            try:
-                # Atomic creation
-                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-                with os.fdopen(fd, 'w') as f: f.write(str(os.getpid()))
-            except FileExistsError:
-                try:
-                    if (now - os.path.getmtime(lock_file)) < 15: return
-                    os.utime(lock_file, (now, now))
-                except: pass
-            
-            print("Triggering text report update...")
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            python_exec = sys.executable
-            
-            subprocess.run([python_exec, "-m", "app.generate_text_report"], check=True, cwd=os.path.dirname(base_dir))
-        except Exception as e:
-            print(f"Failed to trigger text report: {e}")
+    def run_script(force_new=False):
+        print("Triggering text report update...")
+        _run_report_module("app.generate_text_report", *(["--force-new"] if force_new else []))
 
-    threading.Thread(target=run_script).start()
+    # A pending new-message request (leaving quiet mode) survives later plain refreshes
+    report_jobs.submit("text_report", run_script, force_new=force_new, sticky=("force_new",))
 
 def trigger_weekly_report_update():
     """
-    Triggers the generation of the weekly report chart for the web.
+    Queues the generation of the weekly report chart for the web.
     """
     def run_script():
-        lock_file = os.path.join(DATA_DIR, "weekly_report.lock")
-        try:
-            now = time.time()
-            try:
-                # Atomic creation
-                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-                with os.fdopen(fd, 'w') as f: f.write(str(os.getpid()))
-            except FileExistsError:
-                try:
-                    if (now - os.path.getmtime(lock_file)) < 15: return
-                    os.utime(lock_file, (now, now))
-                except: pass
-            
-            print("Triggering weekly report update...")
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            python_exec = sys.executable
-            
-            output_path = os.path.join(DATA_DIR, "static", "weekly.png")
-            
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            subprocess.run([python_exec, "-m", "app.generate_weekly_report", "--output", output_path], check=True, cwd=os.path.dirname(base_dir))
-        except Exception as e:
-            print(f"Failed to trigger weekly report: {e}")
+        print("Triggering weekly report update...")
+        output_path = os.path.join(DATA_DIR, "static", "weekly.png")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        _run_report_module("app.generate_weekly_report", "--output", output_path)
 
-    threading.Thread(target=run_script).start()
+    report_jobs.submit("weekly_report", run_script)
 
 async def log_event(event_type, timestamp):
     """
@@ -351,14 +311,8 @@ async def log_event(event_type, timestamp):
         }
         
         async with state_mgr:
-            logs = await StorageUtils.load_json_async(EVENT_LOG_FILE, default=[])
-            if not isinstance(logs, list): logs = []
-            
-            logs.append(entry)
-            if len(logs) > 1000: 
-                logs = logs[-1000:]
-                
-            await StorageUtils.save_json_async(EVENT_LOG_FILE, logs)
+            # Stores duration_prev with the entry, so readers never rescan the log
+            await asyncio.to_thread(event_store.append, entry)
             
     except Exception as e:
         print(f"Failed to log event: {e}")
@@ -412,41 +366,34 @@ def format_duration(seconds):
     if m > 0: parts.append(f"{m} хв")
     return " ".join(parts) if parts else "0 хв"
 
-def get_best_source_internal(data, date_str):
-    """Internal helper to find source with slots or fallback to emergency."""
+def get_configured_groups():
+    return get_config().get("settings", {}).get("groups", []) or []
+
+def get_schedule_timeline(group=None):
+    """Compiled ScheduleTimeline of `group` (the primary configured group by default)."""
     cfg = get_config()
-    priority_order = ['yasno', 'github']
     user_priority = cfg.get("advanced", {}).get("data_sources", {}).get("priority", "yasno")
-    
-    if user_priority in ['yasno', 'github']:
-        priority_order = [user_priority] + [s for s in priority_order if s != user_priority]
-    elif user_priority == 'custom':
-        priority_order = ['custom', 'yasno', 'github']
-
-    # 1. First Pass: Try to find any source with actual slots (following priority)
-    for s_name in priority_order:
-        src = data.get(s_name)
-        if not src: continue
-        group_keys = list(src.keys())
-        if not group_keys: continue
-        group_key = group_keys[0]
-        day_data = src[group_key].get(date_str)
-        if day_data and day_data.get('slots'):
-            # Use this source. is_emergency is True ONLY if THIS source says so.
-            return src, (day_data.get('status') == 'emergency')
-
-    # 2. Second Pass: If no slots found, find any source with emergency status
-    for s_name in priority_order:
-        src = data.get(s_name)
-        if not src: continue
-        group_keys = list(src.keys())
-        if not group_keys: continue
-        group_key = group_keys[0]
-        day_data = src[group_key].get(date_str)
-        if day_data and day_data.get('status') == 'emergency':
-            return src, True
-            
-    return None, False
+    groups = cfg.get("settings", {}).get("groups", []) or []
+    if group is None and groups:
+        group = groups[0]
+    return load_timeline(SCHEDULE_FILE, history_store, user_priority, KYIV_TZ, group)
+
+def get_group_timelines():
+    """Timelines of every group present in the schedule data, sharing one compiled cache."""
+    cfg = get_config()
+    user_priority = cfg.get("advanced", {}).get("data_sources", {}).get("priority", "yasno")
+    groups = cfg.get("settings", {}).get("groups", []) or []
+    return load_group_timelines(SCHEDULE_FILE, history_store, user_priority, KYIV_TZ, groups[0] if groups else None)
+
+STATS_FILE = os.path.join(DATA_DIR, "stats_daily.json")
+daily_stats = DailyStats(
+    STATS_FILE, event_store, alert_store,
+    slots_for_day=lambda day: get_schedule_timeline().slots_for_day(day),
+    primary_region=lambda: tracked_regions(get_config())[0],
+    inputs=lambda: (file_version(EVENT_LOG_FILE), file_version(SCHEDULE_FILE), history_store.version(),
+                    file_version(ALERT_INTERVALS_FILE)),
+    tz=KYIV_TZ,
+)
 
 def get_next_scheduled_event(event_time, look_for_light):
     """
@@ -454,78 +401,37 @@ def get_next_scheduled_event(event_time, look_for_light):
     look_for_light: True if looking for next ON, False for next OFF.
     """
     try:
-        if not os.path.exists(SCHEDULE_FILE): return None
-        with open(SCHEDULE_FILE, 'r') as f: data = json.load(f)
-        
+        timeline = get_schedule_timeline()
         now_dt = datetime.datetime.fromtimestamp(event_time, KYIV_TZ)
-        today_str = now_dt.strftime("%Y-%m-%d")
-        tomorrow_str = (now_dt + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-        
-        source, is_emergency = get_best_source_internal(data, today_str)
-        if not source: return None
-        
-        group_key = list(source.keys())[0]
-        schedule_data = source[group_key]
-        
-        if today_str not in schedule_data or not schedule_data[today_str].get('slots'):
+        if not (timeline.day(now_dt.date()) and timeline.day(now_dt.date()).slots):
             return None
-        
-        # Build 48-hour slot list
-        slots = list(schedule_data[today_str]['slots'])
-        tomorrow_data = schedule_data.get(tomorrow_str)
-        if tomorrow_data and isinstance(tomorrow_data, dict) and tomorrow_data.get('slots'):
-            slots.extend(tomorrow_data['slots'])
-        else:
-            slots.extend([slots[-1]] * 48)
-            
-        current_slot_idx = (now_dt.hour * 2) + (1 if now_dt.minute >= 30 else 0)
-        
-        target_idx = -1
-        
-        # Search for transition (prefer point where it *starts* being look_for_light)
-        for i in range(current_slot_idx + 1, len(slots)):
-            if slots[i] == look_for_light:
-                # If we are currently in that state according to schedule, we look for NEXT block
-                if i > 0 and slots[i-1] != look_for_light:
-                    target_idx = i
-                    break
-        
-        # Fallback search
-        if target_idx == -1:
-            if slots[current_slot_idx] != look_for_light:
-                for i in range(current_slot_idx + 1, len(slots)):
-                    if slots[i] == look_for_light:
-                        target_idx = i
-                        break
-                    
-        if target_idx == -1: return None
-        
-        # Find end of that block
-        end_idx = len(slots)
-        for i in range(target_idx + 1, len(slots)):
-            if slots[i] != look_for_light:
-                end_idx = i
-                break
-                
+
+        # Look ahead over today and tomorrow only
+        day_start = timeline.day_start_index(now_dt.date())
+        horizon = day_start + 96
+        current_idx = timeline.slot_index(now_dt)
+
+        target_idx = timeline.next_transition(current_idx, look_for_light)
+        if target_idx is None or target_idx >= horizon: return None
+
+        # End of that block
+        end_idx = timeline.next_change(target_idx)
+        if end_idx is None or end_idx > horizon: end_idx = horizon
+
         def idx_to_hm(idx):
             rem = idx % 48
             h = rem // 2
             m = 30 if rem % 2 else 0
             return f"{h:02d}:{m:02d}"
-            
+
         start_t = idx_to_hm(target_idx)
         end_t = idx_to_hm(end_idx)
-        
+
         # Calculate time until start_t
-        days_offset = target_idx // 48
-        rem_idx = target_idx % 48
-        
-        target_dt = now_dt.replace(hour=rem_idx // 2, minute=(30 if rem_idx % 2 else 0), second=0, microsecond=0)
-        if days_offset > 0: target_dt += datetime.timedelta(days=days_offset)
-        
+        target_dt = timeline.slot_datetime(target_idx)
         diff_sec = (target_dt - now_dt).total_seconds()
         if diff_sec < 0: diff_sec = 0
-        
+
         return {
             "time_left_sec": diff_sec,
             "interval": f"{start_t}-{end_t}"
@@ -601,41 +507,35 @@ def format_event_message(is_up, event_time, prev_event_time):
 
 def get_schedule_context():
     try:
-        with open(SCHEDULE_FILE, 'r') as f:
-            data = json.load(f)
-        
+        timeline = get_schedule_timeline()
         now = datetime.datetime.now(KYIV_TZ)
-        today_str = now.strftime("%Y-%m-%d")
-        tomorrow_str = (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-        
-        source, is_emergency = get_best_source_internal(data, today_str)
-        if not source: return (None, None, "Невідомо", None, False)
-        
-        group_key = list(source.keys())[0]
-        schedule_data = source[group_key]
-        
-        if today_str not in schedule_data or not schedule_data[today_str].get('slots'):
+        today_plan = timeline.day(now.date())
+        tomorrow_plan = timeline.day((now + datetime.timedelta(days=1)).date())
+
+        if not today_plan: return (None, None, "Невідомо", None, False)
+        is_emergency = today_plan.is_emergency or bool(today_plan.emergency_sources)
+
+        if not today_plan.slots:
             if is_emergency:
                 return (None, None, "⚠️ Екстрені відключення", None, True)
             return (None, None, "Графік відсутній", None, False)
-            
-        slots = list(schedule_data[today_str]['slots'])
-        has_tomorrow = False
-        if tomorrow_str in schedule_data and schedule_data[tomorrow_str].get('slots'):
-            slots.extend(schedule_data[tomorrow_str]['slots'])
-            has_tomorrow = True
-        else:
-            slots.extend([slots[-1]] * 48)
-            
-        current_slot_idx = (now.hour * 2) + (1 if now.minute >= 30 else 0)
-        is_light_now = slots[current_slot_idx]
-        
-        end_idx = len(slots)
-        for i in range(current_slot_idx + 1, len(slots)):
-            if slots[i] != is_light_now:
-                end_idx = i
-                break
-        
+
+        has_tomorrow = bool(tomorrow_plan and tomorrow_plan.slots)
+        day_start = timeline.day_start_index(now.date())
+        horizon = day_start + 96
+        known_until = horizon if has_tomorrow else day_start + 48
+
+        def change_after(idx):
+            # Without tomorrow's plan the last known state is assumed to persist
+            nxt = timeline.next_change(idx)
+            if nxt is None or nxt >= known_until or timeline.state_at(nxt) is None:
+                return horizon
+            return nxt
+
+        current_idx = timeline.slot_index(now)
+        is_light_now = timeline.state_at(current_idx)
+        end_idx = change_after(current_idx) - day_start
+
         def format_idx_to_time(idx):
             if idx >= 96:
                 return "відключення не плануються 🔆" if has_tomorrow else "невідомий час 🤷‍♂️"
@@ -652,34 +552,46 @@ def get_schedule_context():
         t_end = format_idx_to_time(end_idx)
         next_start_idx = end_idx
         next_duration = None
-        
-        if next_start_idx < len(slots):
+
+        if next_start_idx < 96:
             if next_start_idx >= 48 and not has_tomorrow:
                 next_range = "невідомий час 🤷‍♂️"
             else:
-                next_end_idx = len(slots)
-                for i in range(next_start_idx + 1, len(slots)):
-                    if slots[i] == is_light_now:
-                        next_end_idx = i
-                        break
+                next_end_idx = change_after(day_start + next_start_idx) - day_start
                 ns_t = format_idx_to_time(next_start_idx)
                 ne_t = format_idx_to_time(next_end_idx)
-                
+
                 if next_start_idx >= 96 or (next_start_idx >= 48 and next_end_idx >= 96 and is_light_now):
                      next_range = "відключення не плануються 🔆" if has_tomorrow else "невідомий час 🤷‍♂️"
                 else:
                      next_range = f"{ns_t} - {ne_t}"
-                     
+
                 dur_h = (next_end_idx - next_start_idx) * 0.5
                 next_duration = f"{dur_h:g}".replace('.', ',')
         else:
             next_range = "відключення не плануються 🔆" if has_tomorrow else "невідомий час 🤷‍♂️"
-            
+
         return (is_light_now, t_end, next_range, next_duration, is_emergency)
     except Exception as e:
         print(f"Schedule error: {e}")
         return (None, None, "Помилка", None, False)
 
+def telegram_post(url, payload, timeout=5):
+    """POST to the Bot API behind the shared "telegram" breaker. Returns the response or None."""
+    cb = breakers.get("telegram")
+    if not cb.can_execute():
+        print(f"Telegram Circuit Breaker is {cb.state}. Skipping request.")
+        return None
+    try:
+        r = requests.post(url, json=payload, timeout=timeout)
+    except Exception:
+        cb.record_failure()
+        raise
+    # 4xx are request problems (bad chat id, message not modified), not an outage
+    if r.status_code == 429 or r.status_code >= 500: cb.record_failure()
+    else: cb.record_success()
+    return r
+
 def send_telegram(message):
     token = get_telegram_token()
     chat_id = get_admin_chat_id() if "PYTEST_CURRENT_TEST" in os.environ else get_telegram_channel_id_cfg()
@@ -688,11 +600,11 @@ def send_telegram(message):
         return
     token_masked = token[:5] + "..." + token[-5:]
     print(f"DEBUG: Sending telegram message to {chat_id} via bot {token_masked}")
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{TELEGRAM_API_BASE}/bot{token}/sendMessage"
     payload = {"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
     try:
-        r = requests.post(url, json=payload, timeout=5)
-        if r.status_code != 200:
+        r = telegram_post(url, payload)
+        if r is not None and r.status_code != 200:
             err_msg = r.text.replace(token, "[REDACTED_TOKEN]")
             print(f"Telegram API Error (Status {r.status_code}): {err_msg}")
     except Exception as e:
@@ -702,7 +614,7 @@ def send_telegram(message):
 def send_admin_confirmation(timestamp):
     token = get_telegram_token()
     msg = "⚠️ Зафіксовано втрату зв'язку! Режим 'Інформаційний спокій' активний. Це вимкнення світла чи збій обладнання?"
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{TELEGRAM_API_BASE}/bot{token}/sendMessage"
     payload = {
         "chat_id": get_admin_chat_id(),
         "text": msg,
@@ -713,14 +625,14 @@ def send_admin_confirmation(timestamp):
         }
     }
     try:
-        r = requests.post(url, json=payload, timeout=5)
+        telegram_post(url, payload)
     except Exception as e:
         print(f"Failed to send admin confirmation: {e}")
 
 def send_safety_net_admin(timestamp):
     token = get_telegram_token()
     msg = "🚨 <b>SAFETY NET: ВТРАТА ПУША!</b>\n\nВже 35 сек немає зв'язку. Що сталося?"
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{TELEGRAM_API_BASE}/bot{token}/sendMessage"
     payload = {
         "chat_id": get_admin_chat_id(),
         "text": msg,
@@ -734,35 +646,19 @@ def send_safety_net_admin(timestamp):
         }
     }
     try:
-        r = requests.post(url, json=payload, timeout=5)
+        telegram_post(url, payload)
     except Exception as e:
         print(f"Failed to send safety net admin: {e}")
 
 def get_deviation_info(event_time, is_up):
     try:
-        if not os.path.exists(SCHEDULE_FILE): return ""
-        with open(SCHEDULE_FILE, 'r') as f: data = json.load(f)
+        timeline = get_schedule_timeline()
         dt = datetime.datetime.fromtimestamp(event_time, KYIV_TZ)
-        date_str = dt.strftime("%Y-%m-%d")
-        source, is_emergency = get_best_source_internal(data, date_str)
-        if not source: return ""
-        group_key = list(source.keys())[0]
-        schedule_data = source[group_key]
-        if date_str not in schedule_data or not schedule_data[date_str].get('slots'):
-            return ""
-        slots = schedule_data[date_str]['slots']
-        best_diff = 9999
-        for i in range(49):
-            state_before = slots[i-1] if i > 0 else (not slots[0])
-            state_after = slots[i] if i < 48 else slots[47] 
-            if state_before != state_after:
-                transition_type = 'up' if (not state_before and state_after) else 'down'
-                expected_type = 'up' if is_up else 'down'
-                if transition_type == expected_type:
-                    trans_h, trans_m = i // 2, (30 if i % 2 else 0)
-                    trans_dt = dt.replace(hour=trans_h, minute=trans_m, second=0, microsecond=0)
-                    diff = (dt - trans_dt).total_seconds() / 60
-                    if abs(diff) < abs(best_diff): best_diff = int(diff)
+        plan = timeline.day(dt.date())
+        if not (plan and plan.slots): return ""
+        trans_dt = timeline.nearest_transition(dt, is_up)
+        if trans_dt is None: return ""
+        best_diff = int((dt - trans_dt).total_seconds() / 60)
         if abs(best_diff) > 180: return ""
         abs_diff = abs(best_diff)
         h, m = abs_diff // 60, abs_diff % 60
@@ -780,50 +676,60 @@ def get_deviation_info(event_time, is_up):
 
 def get_nearest_schedule_switch(event_time, target_is_up):
     try:
-        if not os.path.exists(SCHEDULE_FILE): return None
-        with open(SCHEDULE_FILE, 'r') as f: data = json.load(f)
+        timeline = get_schedule_timeline()
         dt = datetime.datetime.fromtimestamp(event_time, KYIV_TZ)
-        date_str = dt.strftime("%Y-%m-%d")
-        source, is_emergency = get_best_source_internal(data, date_str)
-        if not source: return None
-        group_key = list(source.keys())[0]
-        schedule_data = source[group_key]
-        if date_str not in schedule_data or not schedule_data[date_str].get('slots'):
-            return None
-        slots = schedule_data[date_str]['slots']
-        best_diff = 9999
-        best_time_str = None
-        for i in range(49):
-            state_before = slots[i-1] if i > 0 else slots[0]
-            state_after = slots[i] if i < 48 else slots[47]
-            if i == 0: state_before = not state_after
-            if state_before != state_after:
-                if state_after == target_is_up:
-                    trans_h, trans_m = i // 2, (30 if i % 2 else 0)
-                    trans_dt = dt.replace(hour=trans_h, minute=trans_m, second=0, microsecond=0)
-                    diff = abs((dt - trans_dt).total_seconds())
-                    if diff < best_diff:
-                        best_diff = diff
-                        best_time_str = f"{trans_h:02d}:{trans_m:02d}"
-        if best_diff > 10800: return None
-        return best_time_str
+        plan = timeline.day(dt.date())
+        if not (plan and plan.slots): return None
+        trans_dt = timeline.nearest_transition(dt, target_is_up, max_seconds=10800)
+        if trans_dt is None: return None
+        return trans_dt.strftime("%H:%M")
     except:
         return None
 
+ALERT_SNAPSHOT_FILE = os.path.join(DATA_DIR, "alert_snapshot.json")
+# alerts_loop publishes every minute; older snapshots are flagged as stale
+ALERT_STALE_AFTER = 180
+_alert_snapshot_cache = {"version": None, "data": None}
+
+def parse_air_raid_alert(data, regions=None):
+    """One ubilling document covers every tracked region (advanced.alerts.regions)."""
+    regions = regions or tracked_regions(get_config())
+    return summarize(parse_states(data, regions), regions)
+
 def get_air_raid_alert():
+    cb = breakers.get("alerts")
+    if cb.can_execute():
+        try:
+            r = requests.get(ALERTS_API_URL, timeout=5)
+            r.raise_for_status()
+            cb.record_success()
+            return parse_air_raid_alert(r.json())
+        except Exception as e:
+            cb.record_failure()
+            print(f"Error fetching alerts: {e}")
+    return {"status": "unknown", "location": "Невідомо"}
+
+async def fetch_air_raid_alert():
+    """Async variant of get_air_raid_alert on the shared keep-alive client."""
+    cb = breakers.get("alerts")
+    if cb.can_execute():
+        try:
+            async with http_clients.session("alerts") as client:
+                r = await client.get(ALERTS_API_URL)
+            r.raise_for_status()
+            cb.record_success()
+            return parse_air_raid_alert(r.json())
+        except Exception as e:
+            cb.record_failure()
+            print(f"Error fetching alerts: {e}")
+    return {"status": "unknown", "location": "Невідомо"}
+
+def notify_state_change(kind, **data):
+    """Asks every web worker to push a fresh status to its SSE clients."""
     try:
-        r = requests.get(ALERTS_API_URL, timeout=5)
-        if r.status_code == 200:
-            data = r.json()
-            alerts = data.get("states", {})
-            is_alert_city = "м. Київ" in alerts and alerts["м. Київ"].get("alertnow", False)
-            is_alert_region = "Київська область" in alerts and alerts["Київська область"].get("alertnow", False)
-            status_text = "active" if is_alert_city else ("region" if is_alert_region else "clear")
-            location = "м. Київ" if is_alert_city else ("Київська область" if is_alert_region else "Тривоги немає")
-            return {"city": is_alert_city, "region": is_alert_region, "status": status_text, "location": location}
+        event_bus.publish(dict(data, type=kind, ts=time.time()))
     except Exception as e:
-        print(f"Error fetching alerts: {e}")
-    return {"status": "unknown", "location": "Невідомо"}
+        print(f"Event bus publish error: {e}")
 
 async def update_quiet_status():
     async with state_mgr:
@@ -838,25 +744,13 @@ async def update_quiet_status():
                 # CLEANUP: When entering quiet mode, remove active reports from channel
                 print("Entering Quiet Mode. Cleaning up active reports...")
                 def run_cleanup():
-                    try:
-                        base_dir = os.path.dirname(os.path.abspath(__file__))
-                        python_exec = sys.executable
-                        subprocess.run([python_exec, "-m", "app.generate_daily_report", "--cleanup"], cwd=os.path.dirname(base_dir))
-                        subprocess.run([python_exec, "-m", "app.generate_text_report", "--cleanup"], cwd=os.path.dirname(base_dir))
-                    except Exception: pass
-                threading.Thread(target=run_cleanup).start()
+                    _run_report_module("app.generate_daily_report", "--cleanup", check=False)
+                    _run_report_module("app.generate_text_report", "--cleanup", check=False)
+                report_jobs.submit("report_cleanup", run_cleanup)
             else:
-                def trigger_report():
-                    try:
-                        base_dir = os.path.dirname(os.path.abspath(__file__))
-                        python_exec = sys.executable
-                        
-                        time.sleep(2)
-                        subprocess.run([python_exec, "-m", "app.generate_text_report", "--force-new"], check=True, cwd=os.path.dirname(base_dir))
-                    except Exception as e:
-                        print(f"Failed to trigger text report: {e}")
-                threading.Thread(target=trigger_report).start()
+                trigger_text_report_update(force_new=True)
             await save_state()
+            notify_state_change("quiet", status=new_status)
             print(f"Quiet mode status updated to: {new_status}")
 
 async def _check_safety_net_trigger(current_time, last_seen):
@@ -927,6 +821,10 @@ async def _check_auto_confirmation(current_time):
         
         await save_state()
 
+def _dashboard_fingerprint():
+    """State fields shown on the dashboard that the monitor loop may change."""
+    return (state.get("status"), state.get("pending_confirmation"), state.get("quiet_status"))
+
 async def monitor_loop():
     print("Monitor loop started...")
     while True:
@@ -939,31 +837,77 @@ async def monitor_loop():
                 
                 if state.get("muted_until", 0) > current_time: 
                     continue
-                    
+
+                before = _dashboard_fingerprint()
                 if state["status"] == "up":
                     await _check_safety_net_trigger(current_time, last_seen)
                     await _check_safety_net_timeout(current_time)
                     await _check_outage_detection(current_time, last_seen)
 
                 await _check_auto_confirmation(current_time)
+                if _dashboard_fingerprint() != before:
+                    notify_state_change("power", status=state["status"])
                 
         except Exception as e:
             print(f"Critical error in monitor_loop: {e}")
             await asyncio.sleep(5)
 
 
+def _load_alert_snapshot():
+    """Snapshot file parsed once per change; web workers call this on every status request."""
+    try:
+        st = os.stat(ALERT_SNAPSHOT_FILE)
+    except OSError:
+        return None
+    version = (st.st_mtime_ns, st.st_size)
+    if _alert_snapshot_cache["version"] != version:
+        data = StorageUtils.load_json_sync(ALERT_SNAPSHOT_FILE, default=None)
+        _alert_snapshot_cache.update(version=version, data=data if isinstance(data, dict) else None)
+    return _alert_snapshot_cache["data"]
+
+def publish_alert_snapshot(alert, now=None):
+    """Stores the latest alert for all workers; a failed fetch keeps the last good status."""
+    now = now or time.time()
+    if alert.get("status") == "unknown":
+        snapshot = dict(_load_alert_snapshot() or {"status": "unknown", "location": "Невідомо", "fetched_at": None})
+        snapshot["error"] = True
+    else:
+        snapshot = dict(alert, fetched_at=now, error=False)
+    snapshot["checked_at"] = now
+    StorageUtils.save_json_sync(ALERT_SNAPSHOT_FILE, snapshot)
+    return snapshot
+
+def read_alert_snapshot(now=None):
+    """Latest alert published by alerts_loop, with a staleness flag. Never touches the network."""
+    now = now or time.time()
+    snapshot = dict(_load_alert_snapshot() or {"status": "unknown", "location": "Невідомо", "fetched_at": None})
+    fetched_at = snapshot.get("fetched_at")
+    snapshot["stale"] = not fetched_at or now - fetched_at > ALERT_STALE_AFTER
+    return snapshot
+
 async def alerts_loop():
     print("Alerts loop started...")
     while True:
         try:
-            current_alert = get_air_raid_alert()
+            current_alert = await fetch_air_raid_alert()
+            publish_alert_snapshot(current_alert)
             new_status = current_alert.get("status")
             if new_status != "unknown":
                 await load_state()
                 async with state_mgr:
+                    now_dt = datetime.datetime.now(KYIV_TZ)
+                    primary = current_alert["primary"]
+                    previous = state.get("alert_regions")
+                    if previous is None:
+                        # Before per-region tracking only the primary region was followed
+                        previous = {primary: state.get("alert_status") == "active"}
+                    changes = region_transitions(previous, current_alert["regions"])
+                    if changes:
+                        alert_store.record(changes, now_dt.timestamp())
+                        state["alert_regions"] = {r: s["alert"] for r, s in current_alert["regions"].items()}
+
                     old_status = state.get("alert_status", "clear")
                     if new_status != old_status:
-                        now_dt = datetime.datetime.now(KYIV_TZ)
                         time_str = now_dt.strftime("%H:%M")
                         
                         # Check config for air raid notifications
@@ -976,26 +920,10 @@ async def alerts_loop():
 
                         if new_status == "active":
                             state["alert_start_time"] = now_dt.timestamp()
-
-                            try:
-                                log_path = os.path.join(DATA_DIR, "air_raid_log.json")
-                                l_data = json.load(open(log_path)) if os.path.exists(log_path) else []
-                                # Only add if not already active or log is empty
-                                if not l_data or l_data[-1].get("event") != "active":
-                                    l_data.append({"timestamp": now_dt.timestamp(), "event": "active"})
-                                    json.dump(l_data, open(log_path, "w"), indent=2)
-                            except: pass
-
                             if can_notify:
-                                msg = f"⚠️ <b>{time_str} ПОВІТРЯНА ТРИВОГА! КИЇВ</b>"
+                                msg = f"⚠️ <b>{time_str} ПОВІТРЯНА ТРИВОГА! {region_label(primary)}</b>"
                                 threading.Thread(target=send_telegram, args=(msg,)).start()
                         elif old_status == "active" and new_status != "active":
-                            try:
-                                log_path = os.path.join(DATA_DIR, "air_raid_log.json")
-                                l_data = json.load(open(log_path)) if os.path.exists(log_path) else []
-                                l_data.append({"timestamp": now_dt.timestamp(), "event": "clear"})
-                                json.dump(l_data, open(log_path, "w"), indent=2)
-                            except: pass
                             start_ts = state.get("alert_start_time")
                             duration_str = ""
                             if start_ts:
@@ -1007,39 +935,83 @@ async def alerts_loop():
                                 msg = f"✅ <b>{time_str} ВІДБІЙ ТРИВОГИ</b>{duration_str}"
                                 threading.Thread(target=send_telegram, args=(msg,)).start()
                         state["alert_status"] = new_status
+                    if changes or new_status != old_status:
                         await save_state()
+                        notify_state_change("alert", status=new_status, regions=sorted(changes))
         except Exception as e: print(f"Error in alerts loop: {e}")
         await asyncio.sleep(60)
 
+def trigger_reports_for_diff(diff: ScheduleDiff, now=None):
+    """Re-renders only the reports whose dates are touched by the schedule diff."""
+    now = now or datetime.datetime.now(KYIV_TZ)
+    today = now.date()
+    today_str = today.strftime("%Y-%m-%d")
+    tomorrow_str = (today + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    monday = today - datetime.timedelta(days=today.weekday())
+    week = {(monday + datetime.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)}
+
+    triggered = []
+    if diff.affects(today_str):
+        trigger_daily_report_update()
+        triggered.append("daily")
+    if diff.dates() & week:
+        trigger_weekly_report_update()
+        triggered.append("weekly")
+    if diff.affects(today_str, outage_only=True) or diff.affects(tomorrow_str, outage_only=True):
+        triggered.append("text")
+    return triggered
+
 async def sync_schedules():
     """
     Syncs schedules from API or local parsing.
-    Returns True if the schedule data has actually changed.
+    Returns the ScheduleDiff of the schedule data (falsy when nothing changed).
     """
     sync_success = False
-    has_changed = False
-    
-    # Helper to get file hash
-    def get_file_hash(filepath):
-        if not os.path.exists(filepath): return None
-        with open(filepath, "rb") as f: return hashlib.md5(f.read()).hexdigest()
+    diff = ScheduleDiff()
 
     if SCHEDULE_API_URL:
         try:
             print(f"Syncing schedules from {SCHEDULE_API_URL}...")
             urls = {SCHEDULE_FILE: f"{SCHEDULE_API_URL}/last_schedules.json", HISTORY_FILE: f"{SCHEDULE_API_URL}/schedule_history.json"}
             
-            old_hashes = {f: get_file_hash(f) for f in urls.keys()}
+            old_data = StorageUtils.load_json_sync(SCHEDULE_FILE, default={}) or {}
+            validators = ValidatorStore(HTTP_VALIDATORS_FILE)
             
-            for local_file, url in urls.items():
-                r = requests.get(url, timeout=10)
-                if r.status_code == 200:
-                    with open(local_file, "wb") as f: f.write(r.content)
+            modified = False
+            cb = breakers.get("replica")
+            if not cb.can_execute():
+                raise RuntimeError(f"replica circuit breaker is {cb.state}")
+            async with http_clients.session("schedules") as client:
+                for local_file, url in urls.items():
+                    source = f"replica:{os.path.basename(local_file)}"
+                    have_local = os.path.exists(HISTORY_DIR if local_file == HISTORY_FILE else local_file)
+                    if not have_local:
+                        validators.forget_source(source)
+                    try:
+                        r = await client.get(url, headers=validators.headers(url) if have_local else {}, timeout=10)
+                        if r.status_code == 429 or r.status_code >= 500: r.raise_for_status()
+                    except Exception:
+                        cb.record_failure()
+                        raise
+                    cb.record_success()
+                    if r.status_code == 304:
+                        record_result(source, True)
+                    elif r.status_code == 200:
+                        record_result(source, False)
+                        if local_file == HISTORY_FILE:
+                            # The primary publishes one document; only changed dates are rewritten here
+                            await asyncio.to_thread(history_store.replace_all, r.json())
+                        else:
+                            with open(local_file, "wb") as f: f.write(r.content)
+                        validators.remember(url, r, source)
+                        modified = modified or local_file == SCHEDULE_FILE
+            validators.commit()
             
-            new_hashes = {f: get_file_hash(f) for f in urls.keys()}
-            if old_hashes[SCHEDULE_FILE] != new_hashes[SCHEDULE_FILE]:
-                has_changed = True
-                print("API Sync: Schedule changed.")
+            if modified:
+                new_data = StorageUtils.load_json_sync(SCHEDULE_FILE, default={}) or {}
+                diff = diff_schedules(old_data, new_data)
+            if diff:
+                print(f"API Sync: Schedule changed: {diff!r}")
             
             sync_success = True
         except Exception as e: print(f"Failed to sync schedules via API: {e}")
@@ -1055,45 +1027,34 @@ async def sync_schedules():
             PARSING_DURATION.observe(time.time() - start_time)
         except ImportError: pass
             
-        has_changed = result[1] if isinstance(result, tuple) and len(result) == 2 else False
-        if has_changed:
+        diff = result[1] if isinstance(result, tuple) and len(result) == 2 else ScheduleDiff()
+        if diff:
             print("Local Parsing: Schedule changed.")
 
-    if has_changed:
-        # Trigger updates since data changed
-        trigger_daily_report_update()
-        trigger_weekly_report_update()
-        
-        # Check for specific outage slots to trigger immediate text alerts if needed
-        try:
-            if os.path.exists(SCHEDULE_FILE):
-                with open(SCHEDULE_FILE, 'r') as f: data = json.load(f)
-                should_alert = False
-                for s_key in ['github', 'yasno']:
-                    sources = data.get(s_key, {})
-                    for group_name, days in sources.items():
-                        for d, day_data in days.items():
-                            if day_data.get('slots') and any(s is False for s in day_data['slots']):
-                                should_alert = True; break
-                        if should_alert: break
-                    if should_alert: break
-                
-                if should_alert:
-                    # Double check hash to avoid duplicate text alerts
-                    slots_structure = {s_key: {gn: {d: day_data['slots'] for d, day_data in days.items() if day_data.get('slots') and any(s is False for s in day_data['slots'])} for gn, days in data.get(s_key, {}).items()} for s_key in ['github', 'yasno']}
-                    current_hash = hashlib.md5(json.dumps(slots_structure, sort_keys=True).encode()).hexdigest()
-                    
-                    async with state_mgr:
-                        if current_hash != state.get("last_schedule_hash"):
-                            state["last_schedule_hash"] = current_hash
-                            state["quiet_status"] = "active" # Disable quiet mode if schedule appears
-                            await save_state()
-                            print("Triggering text report alert due to schedule change...")
-                            trigger_text_report_update()
-        except Exception as e:
-            print(f"Error in schedule change alert logic: {e}")
+    # Other groups are kept for /api/schedule/groups but never drive our reports
+    diff = diff.for_groups(get_configured_groups())
+
+    if diff:
+        # Persisted for the text report, which shows what changed
+        data = diff.to_dict()
+        data["generated_at"] = time.time()
+        StorageUtils.save_json_sync(SCHEDULE_DIFF_FILE, data)
+
+        triggered = trigger_reports_for_diff(diff)
+        print(f"Schedule diff triggered reports: {', '.join(triggered) or 'none'}")
+        notify_state_change("schedule", dates=sorted(diff.dates()))
+
+        if "text" in triggered:
+            try:
+                async with state_mgr:
+                    state["quiet_status"] = "active" # Disable quiet mode if schedule appears
+                    await save_state()
+                print("Triggering text report alert due to schedule change...")
+                trigger_text_report_update()
+            except Exception as e:
+                print(f"Error in schedule change alert logic: {e}")
             
-    return has_changed
+    return diff
 
 def check_quiet_mode_eligibility():
     now = time.time()
@@ -1110,18 +1071,38 @@ def check_quiet_mode_eligibility():
             now_dt = datetime.datetime.fromtimestamp(now, KYIV_TZ)
             today_str, tomorrow_str = now_dt.strftime("%Y-%m-%d"), (now_dt + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
             current_slot_idx = (now_dt.hour * 2) + (1 if now_dt.minute >= 30 else 0)
+            # Only the configured groups matter; older caches without them are checked as a whole
+            groups = set(get_configured_groups())
+            if not any(gn in groups for s_key in ['github', 'yasno'] for gn in data.get(s_key, {})):
+                groups = None
             for s_key in ['github', 'yasno']:
                 for gn, days in data.get(s_key, {}).items():
+                    if groups and gn not in groups: continue
                     all_slots = (days.get(today_str, {}).get('slots') or ([True]*48)) + (days.get(tomorrow_str, {}).get('slots') or ([True]*48))
                     if any(all_slots[i] is False for i in range(current_slot_idx, min(current_slot_idx + 48, len(all_slots)))): return False
         else: return False
     except: return False
     return True
 
+def is_schedule_emergency():
+    """True when the resolved plan for today or tomorrow is an emergency shutdown."""
+    try:
+        timeline = get_schedule_timeline()
+        today = datetime.datetime.now(KYIV_TZ).date()
+        return any(p and p.is_emergency for p in (timeline.day(today), timeline.day(today + datetime.timedelta(days=1))))
+    except Exception:
+        return False
+
 async def schedule_loop():
     print("Schedule loop started...")
     weekly_sent_date = None
     last_prune_date = None
+    poller = AdaptivePoller(POLLER_STATE_FILE, KYIV_TZ)
+    # /api/stats only reads stats_daily.json; catch up on days completed while we were down
+    try:
+        await asyncio.to_thread(daily_stats.update)
+    except Exception as e:
+        print(f"Daily stats update failed: {e}")
     
     while True:
         try:
@@ -1148,17 +1129,24 @@ async def schedule_loop():
                 await asyncio.sleep(65)
                 continue
 
-            # 3. Regular sync and status updates every 10 mins
-            if now.minute % 10 == 0:
+            # 3. Adaptive schedule sync: faster in publication windows and emergencies
+            ds_cfg = cfg.get("advanced", {}).get("data_sources", {})
+            poller.set_bounds(ds_cfg.get("poll_min_sec"), ds_cfg.get("poll_max_sec"))
+            emergency = is_schedule_emergency()
+            if poller.due(time.time(), emergency):
                 # sync_schedules checks for plan changes
-                await sync_schedules()
+                diff = await sync_schedules()
+                interval = poller.record({d.source for d in diff.days}, time.time(), is_schedule_emergency())
+                print(f"Next schedule poll in {interval}s")
 
+            # 4. Regular status updates every 10 mins
+            if now.minute % 10 == 0:
                 # Always update reports to advance the "now" actual line
                 trigger_daily_report_update()
                 trigger_weekly_report_update()
                 trigger_text_report_update()
                 await update_quiet_status()                
-            # 4. Weekly report (Monday morning)
+            # 5. Weekly report (Monday morning)
             if now.weekday() == 0 and now.hour == 0 and 15 <= now.minute < 25:
                 if weekly_sent_date != today_date:
                     try:
@@ -1,4 +1,3 @@
-import requests
 import httpx
 import json
 from datetime import datetime, timedelta
@@ -13,11 +12,12 @@ import cachetools
 from fastapi import BackgroundTasks
 import subprocess
 import secrets
+import random
 import structlog
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Response, Header, Body, Query, HTTPException
-from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, HTMLResponse
+from fastapi import FastAPI, Request, Response, Header, Body, Query, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
 from prometheus_client import make_asgi_app, Gauge, Histogram
 
@@ -34,13 +34,25 @@ from app.light_service import (
     get_deviation_info, get_nearest_schedule_switch,
     format_event_message, get_next_scheduled_event,
     trigger_daily_report_update, trigger_weekly_report_update,
-    get_air_raid_alert, get_push_interval, get_advanced_setting,
+    read_alert_snapshot, telegram_post, get_push_interval, get_advanced_setting,
     update_quiet_status, sync_schedules,
     create_backup, list_backups, restore_backup,
     get_telegram_token, get_telegram_channel_id_cfg,
-    ADMIN_CHAT_ID,
-    KYIV_TZ, STATE_LOCK_FILE, DATA_DIR, EVENT_LOG_FILE
+    report_jobs, get_schedule_timeline, get_group_timelines, get_configured_groups, ADMIN_CHAT_ID,
+    KYIV_TZ, STATE_LOCK_FILE, DATA_DIR, EVENT_LOG_FILE, SCHEDULE_FILE,
+    STATE_FILE, ALERT_SNAPSHOT_FILE, history_store, event_store, daily_stats
 )
+from app.schedule_timeline import slots_to_runs, SOURCE_LABELS
+from app.http_clients import http_clients
+from app.circuit_breaker import breakers
+from app.event_bus import event_bus
+from app.air_alerts import tracked_regions, get_alert_intervals, alert_store
+from app.status_snapshot import StatusSnapshot, SnapshotView, STREAM_RESUMES, etag_matches
+from app.storage import file_version
+from app import status_frames
+from app import compression
+from app.pages import PageShells
+from app.telegram_client import TELEGRAM_API_BASE
 
 # Structlog configuration
 structlog.configure(
@@ -57,13 +69,32 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("application_startup")
     await load_state()
+    http_clients.start()
+    try:
+        # Transitions detected by run_background reach our SSE clients through the bus
+        await event_bus.start(broadcast_local_update)
+    except Exception as e:
+        logger.error("event_bus_start_error", error=str(e))
+    snapshot_task = asyncio.create_task(status_snapshot.run())
+    page_shells.warm(PAGES)
+    templates_task = asyncio.create_task(page_shells.watch("templates")) if TEMPLATES_RELOAD else None
     yield
     # Shutdown
     logger.info("application_shutdown")
+    snapshot_task.cancel()
+    if templates_task:
+        templates_task.cancel()
+    event_bus.stop()
+    await http_clients.aclose()
 
 app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
-templates.env.cache = None  # Disable cache to bypass unhashable key bug
+# Dev only: re-render pages when a template file changes (needs watchfiles)
+TEMPLATES_RELOAD = os.environ.get("TEMPLATES_RELOAD", "").lower() in ("1", "true", "yes")
+# Compiled once; without reload mode Jinja need not stat the file on every lookup
+templates.env.auto_reload = TEMPLATES_RELOAD
+PAGES = ("index.html", "admin.html")
+page_shells = PageShells(templates.env)
 
 # Prometheus Metrics
 metrics_app = make_asgi_app()
@@ -71,6 +102,9 @@ app.mount("/metrics", metrics_app)
 
 ACTIVE_SSE_CONNECTIONS = Gauge('flash_active_sse_connections', 'Number of active SSE connections')
 PARSING_DURATION = Histogram('flash_parsing_duration_seconds', 'Time spent parsing schedules')
+SSE_WORKER_CONNECTIONS = Gauge('flash_sse_worker_connections', 'Active SSE connections per web worker', ['worker'])
+SSE_FANOUT_LATENCY = Histogram('flash_sse_fanout_seconds', 'From status snapshot build to SSE delivery in this worker',
+                               buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
 
 # --- SSE Logic ---
 class ConnectionManager:
@@ -80,24 +114,54 @@ class ConnectionManager:
     async def connect(self, q: asyncio.Queue):
         self.active_connections.append(q)
         ACTIVE_SSE_CONNECTIONS.inc()
+        SSE_WORKER_CONNECTIONS.labels(worker=str(os.getpid())).set(len(self.active_connections))
 
     def disconnect(self, q: asyncio.Queue):
         if q in self.active_connections:
             self.active_connections.remove(q)
             ACTIVE_SSE_CONNECTIONS.dec()
+            SSE_WORKER_CONNECTIONS.labels(worker=str(os.getpid())).set(len(self.active_connections))
 
-    async def broadcast(self, message: dict):
+    async def broadcast(self, message):
+        """Queues an already serialised message; a client that fell behind is told to resync."""
         for connection in self.active_connections:
             try:
                 connection.put_nowait(message)
             except asyncio.QueueFull:
-                pass
+                while not connection.empty():
+                    connection.get_nowait()
+                connection.put_nowait(None)
 
 manager = ConnectionManager()
 
+async def broadcast_status_patch(snapshot):
+    # The leader wakes the other workers, which adopt the snapshot it just wrote
+    if snapshot.leader:
+        event_bus.publish({"type": "status", "version": snapshot.version})
+    # No patch means the follower skipped a version: its clients need a fresh snapshot
+    await manager.broadcast((snapshot.version, snapshot.patch_json) if snapshot.patch_json else None)
+    SSE_FANOUT_LATENCY.observe(max(0.0, time.time() - snapshot.built_at))
+    # We run under the snapshot lock: displays are sent to from a background task
+    if frame_hub.clients:
+        frame_hub.request_refresh()
+
+async def broadcast_local_update(event=None):
+    # The event means some input changed; rebuild now instead of on the next refresh tick.
+    # Changes reach SSE clients through status_snapshot.on_change. A "status" event only
+    # announces a snapshot the leader already built.
+    await status_snapshot.refresh(force=event is not None and event.get("type") != "status")
+    if event is not None and event.get("type") == "schedule" and frame_hub.clients:
+        # Tomorrow's plan is not part of /api/status, so it may change without a patch
+        frame_hub.request_refresh()
+
 async def broadcast_state_update():
-    status_data = await api_status()
-    await manager.broadcast({"type": "update", "data": status_data})
+    """Every worker's SSE clients get the update via the event bus; only ours when the bus is down."""
+    if event_bus.listening and event_bus.publish({"type": "web", "ts": time.time()}):
+        return
+    await broadcast_local_update({"type": "web"})
+
+OPEN_METEO_AQ_BASE = os.environ.get("OPEN_METEO_AQ_BASE", "https://air-quality-api.open-meteo.com")
+OPEN_METEO_BASE = os.environ.get("OPEN_METEO_BASE", "https://api.open-meteo.com")
 
 # --- Caching ---
 CACHE = cachetools.TTLCache(maxsize=100, ttl=60)
@@ -123,15 +187,15 @@ async def cached_fetch(key, func):
 # --- PWA Routes ---
 
 @app.get('/manifest.json')
-def manifest():
-    return FileResponse('static/manifest.json')
+def manifest(accept_encoding: str = Header(None, alias="Accept-Encoding")):
+    return compression.static_response('static/manifest.json', accept_encoding)
 
 @app.get('/service-worker.js')
-def service_worker():
-    return FileResponse('static/service-worker.js')
+def service_worker(accept_encoding: str = Header(None, alias="Accept-Encoding")):
+    return compression.static_response('static/service-worker.js', accept_encoding)
 
 @app.get('/static/{filename:path}')
-def serve_static(filename: str):
+def serve_static(filename: str, accept_encoding: str = Header(None, alias="Accept-Encoding")):
     # Secure paths
     data_static_base = os.path.abspath(os.path.join(DATA_DIR, 'static'))
     code_static_base = os.path.abspath('static')
@@ -155,16 +219,16 @@ def serve_static(filename: str):
         headers['Pragma'] = 'no-cache'
         headers['Expires'] = '0'
     
-    return FileResponse(file_path, headers=headers)
+    # JSON/JS/SVG come from .br/.gz sidecars built at image build or report render time
+    return compression.static_response(file_path, accept_encoding, headers)
 
 @app.get('/health')
 def health_check():
     return {"status": "ok"}
 
 def get_radiation():
-    # Return stable background value
-    import random
-    val = round(0.10 + random.uniform(0, 0.02), 2)
+    # Return stable background value; fixed per day so it does not change the status ETag
+    val = round(0.10 + random.Random(datetime.now(KYIV_TZ).date().toordinal()).uniform(0, 0.02), 2)
     return {
         "level": val,
         "unit": "мкЗв/год",
@@ -182,106 +246,88 @@ async def get_power_events_data(limit=5):
         latest_event_text = f"• Наступне планове: {next_range}"
     
     try:
-        if os.path.exists(EVENT_LOG_FILE):
-            with open(EVENT_LOG_FILE, "r") as f:
-                logs = json.load(f)
+        # Newest first, durations stored at write time
+        last_logs = event_store.latest(limit)
+        if last_logs:
+            for log in last_logs:
+                ts = log.get('timestamp', 0)
+                evt = log.get('event', 'unknown')
+                dur_sec = log.get('duration_prev')
                 
-                if len(logs) >= 1:
-                    # Calculate durations
-                    for i in range(len(logs)):
-                        if i > 0:
-                            logs[i]['duration_prev'] = logs[i]['timestamp'] - logs[i-1]['timestamp']
-                        else:
-                            logs[i]['duration_prev'] = None
-                            
-                    last_logs = logs[-limit:][::-1]
-                    
-                    for log in last_logs:
-                        ts = log.get('timestamp', 0)
-                        evt = log.get('event', 'unknown')
-                        dur_sec = log.get('duration_prev')
-                        
-                        dt_str = datetime.fromtimestamp(ts).strftime("%d.%m %H:%M")
-                        icon = "🟢" if evt == "up" else "🔴"
-                        text = "Світло з'явилося" if evt == "up" else "Світло зникло"
-                        pre_text = "не було" if evt == "up" else "було"
-                        
-                        dur_str = format_duration(dur_sec) if dur_sec else ""
-                        
-                        recent_events.append({
-                            "time": dt_str,
-                            "icon": icon,
-                            "text": text,
-                            "desc": f"({pre_text} {dur_str})" if dur_str else ""
-                        })
-                    
-                    # Construct current status text
-                    await load_state()
-                    status = state.get("status", "unknown")
-
-                    target_evt = "up" if status == "up" else "down"
-                    
-                    # Find the latest log entry that matches current status
-                    last_match = None
-                    for log in reversed(logs):
-                        if log.get('event') == target_evt:
-                            last_match = log
-                            break
-                    
-                    if not last_match:
-                        last_match = logs[-1]
-                        
-                    ts = last_match['timestamp']
-                    evt = last_match['event']
-                    
-                    # --- NEW TEXT LOGIC ---
-                    dev_msg = get_deviation_info(ts, evt == "up")
-                    dev_line = ""
-                    if dev_msg:
-                        # Expected: "На 10 хв пізніше графіка"
-                        # get_deviation_info format: "• Увімкнули пізніше на 10 хв"
-                        m = re.search(r"(?:Увімкнули|Вимкнули)\s+(раніше|пізніше)\s+на\s+(.+)$", dev_msg)
-                        
-                        if status == "up":
-                            if m:
-                                timing = m.group(1)
-                                value = m.group(2)
-                                dev_line = f"• З'явилося на {value} {timing}"
-                            elif "точно за графіком" in dev_msg:
-                                dev_line = "• З'явилося Точно за графіком"
-                        else:
-                            if m:
-                                timing = m.group(1)
-                                value = m.group(2)
-                                dev_line = f"• на {value} {timing}"
-                            elif "точно за графіком" in dev_msg:
-                                dev_line = "• Точно за графіком"
-                    
-                    # Next event prediction
-                    current_ts = time.time()
-                    look_for_light = (status != "up") # If currently UP, look for OFF (False)
-                    next_info = get_next_scheduled_event(current_ts, look_for_light)
-                    wait_line = ""
-                    if next_info:
-                        if status == "up":
-                            next_time = next_info["interval"].split('-')[0]
-                            wait_line = f"• Вимкнення о {next_time}"
-                        else:
-                            wait_line = f"• Очікуємо о {next_info['interval']}"
-                    
-                    if is_emergency:
-                        latest_event_text = "• можливі аварійні відключення ⚠️"
-                    elif dev_line and wait_line:
-                        latest_event_text = f"{dev_line}<br>{wait_line}"
-                    elif dev_line:
-                        latest_event_text = f"{dev_line}"
-                    elif wait_line:
-                        latest_event_text = f"{wait_line}"
-                    elif sched_light_now and (next_range == "відключення не плануються 🔆" or next_range == "відключення не плануються ✅" or next_range == "час невідомий 🤷‍♂️" or next_range == "час очікується"):
-                        latest_event_text = "• відключення не плануються 🔆"
-                    else:
-                        latest_event_text = f"• Наступне планове: {next_range}"
-                    
+                dt_str = datetime.fromtimestamp(ts).strftime("%d.%m %H:%M")
+                icon = "🟢" if evt == "up" else "🔴"
+                text = "Світло з'явилося" if evt == "up" else "Світло зникло"
+                pre_text = "не було" if evt == "up" else "було"
+                
+                dur_str = format_duration(dur_sec) if dur_sec else ""
+                
+                recent_events.append({
+                    "time": dt_str,
+                    "icon": icon,
+                    "text": text,
+                    "desc": f"({pre_text} {dur_str})" if dur_str else ""
+                })
+            
+            # Construct current status text
+            await load_state()
+            status = state.get("status", "unknown")
+
+            target_evt = "up" if status == "up" else "down"
+            
+            # Latest log entry that matches current status
+            last_match = event_store.last_of(target_evt) or last_logs[0]
+                
+            ts = last_match['timestamp']
+            evt = last_match['event']
+            
+            # --- NEW TEXT LOGIC ---
+            dev_msg = get_deviation_info(ts, evt == "up")
+            dev_line = ""
+            if dev_msg:
+                # Expected: "На 10 хв пізніше графіка"
+                # get_deviation_info format: "• Увімкнули пізніше на 10 хв"
+                m = re.search(r"(?:Увімкнули|Вимкнули)\s+(раніше|пізніше)\s+на\s+(.+)$", dev_msg)
+                
+                if status == "up":
+                    if m:
+                        timing = m.group(1)
+                        value = m.group(2)
+                        dev_line = f"• З'явилося на {value} {timing}"
+                    elif "точно за графіком" in dev_msg:
+                        dev_line = "• З'явилося Точно за графіком"
+                else:
+                    if m:
+                        timing = m.group(1)
+                        value = m.group(2)
+                        dev_line = f"• на {value} {timing}"
+                    elif "точно за графіком" in dev_msg:
+                        dev_line = "• Точно за графіком"
+            
+            # Next event prediction
+            current_ts = time.time()
+            look_for_light = (status != "up") # If currently UP, look for OFF (False)
+            next_info = get_next_scheduled_event(current_ts, look_for_light)
+            wait_line = ""
+            if next_info:
+                if status == "up":
+                    next_time = next_info["interval"].split('-')[0]
+                    wait_line = f"• Вимкнення о {next_time}"
+                else:
+                    wait_line = f"• Очікуємо о {next_info['interval']}"
+            
+            if is_emergency:
+                latest_event_text = "• можливі аварійні відключення ⚠️"
+            elif dev_line and wait_line:
+                latest_event_text = f"{dev_line}<br>{wait_line}"
+            elif dev_line:
+                latest_event_text = f"{dev_line}"
+            elif wait_line:
+                latest_event_text = f"{wait_line}"
+            elif sched_light_now and (next_range == "відключення не плануються 🔆" or next_range == "відключення не плануються ✅" or next_range == "час невідомий 🤷‍♂️" or next_range == "час очікується"):
+                latest_event_text = "• відключення не плануються 🔆"
+            else:
+                latest_event_text = f"• Наступне планове: {next_range}"
+            
     except Exception as e:
         logger.error("error_reading_events", error=str(e))
         pass
@@ -295,26 +341,16 @@ def render_day_schedule_html(slots, date_obj):
     
     intervals_on = []
     intervals_off = []
-    current_state = slots[0]
-    start_idx = 0
     
     def format_slot_time(idx):
         mins = idx * 30
         h, m = mins // 60, mins % 60
         return f"{h:02d}:{m:02d}"
         
-    for i in range(1, 48):
-        if slots[i] != current_state:
-            inv = {"state": current_state, "start": format_slot_time(start_idx), "end": format_slot_time(i), "duration": (i - start_idx) * 0.5}
-            if current_state: intervals_on.append(inv)
-            else: intervals_off.append(inv)
-            start_idx = i
-            current_state = slots[i]
-    
-    # Last interval
-    inv = {"state": current_state, "start": format_slot_time(start_idx), "end": "24:00", "duration": (48 - start_idx) * 0.5}
-    if current_state: intervals_on.append(inv)
-    else: intervals_off.append(inv)
+    for start_idx, end_idx, current_state in slots_to_runs(slots[:48]):
+        inv = {"state": current_state, "start": format_slot_time(start_idx), "end": format_slot_time(end_idx) if end_idx < 48 else "24:00", "duration": (end_idx - start_idx) * 0.5}
+        if current_state: intervals_on.append(inv)
+        else: intervals_off.append(inv)
 
     total_on = sum(1 for s in slots if s) * 0.5
     total_off = 24.0 - total_on
@@ -347,65 +383,17 @@ def render_day_schedule_html(slots, date_obj):
 
 def get_today_schedule_text():
     try:
-        config_path = os.path.join(DATA_DIR, "config.json")
-        if not os.path.exists(config_path):
-            config_path = "config.json"
-        data_dir = os.environ.get("DATA_DIR", ".")
-        schedule_file = os.path.join(data_dir, "last_schedules.json")
-        if not os.path.exists(schedule_file):
+        if not os.path.exists(SCHEDULE_FILE):
             return "Графік відсутній"
 
-        with open(schedule_file, 'r') as f:
-            data = json.load(f)
-
+        timeline = get_schedule_timeline()
         now = datetime.now(KYIV_TZ)
-        today_str = now.strftime("%Y-%m-%d")
-        tomorrow_str = (now + timedelta(days=1)).strftime("%Y-%m-%d")
-
-        # --- SMART SOURCE MERGE (Priority-Aware) ---
-        cfg = {}
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f: cfg = json.load(f)
-        user_priority = cfg.get("advanced", {}).get("data_sources", {}).get("priority", "yasno")
-        priority_order = ['yasno', 'github']
-        if user_priority in ['yasno', 'github']:
-            priority_order = [user_priority] + [s for s in priority_order if s != user_priority]
-
-        today_slots = None
-        tomorrow_slots = None
-        emergency_sources = []
-        
-        # 1. First Pass: Try to find any source with actual slots (following priority)
-        found_source = None
-        for s_name in priority_order:
-            src = data.get(s_name)
-            if not src: continue
-            grp = list(src.keys())[0]
-            day_data = src[grp].get(today_str)
-            if day_data and day_data.get('slots'):
-                today_slots = list(day_data['slots'])
-                # Also get tomorrow if available from SAME source
-                tm_data = src[grp].get(tomorrow_str)
-                if tm_data and tm_data.get('slots'):
-                    tomorrow_slots = list(tm_data['slots'])
-                
-                if day_data.get('status') == 'emergency':
-                    name = "YASNO" if s_name == 'yasno' else "ДТЕК"
-                    emergency_sources.append(name)
-                
-                found_source = s_name
-                break
-        
-        # 2. Second Pass: If no slots found, check for emergency in any source
-        if today_slots is None:
-            for s_name in priority_order:
-                src = data.get(s_name)
-                if not src: continue
-                grp = list(src.keys())[0]
-                day_data = src[grp].get(today_str)
-                if day_data and day_data.get('status') == 'emergency':
-                    name = "YASNO" if s_name == 'yasno' else "ДТЕК"
-                    if name not in emergency_sources: emergency_sources.append(name)
+        today_plan = timeline.day(now.date())
+        tomorrow_plan = timeline.day((now + timedelta(days=1)).date())
+
+        today_slots = today_plan.slots if today_plan else None
+        tomorrow_slots = tomorrow_plan.slots if tomorrow_plan else None
+        emergency_sources = today_plan.emergency_sources if today_plan else []
 
         if today_slots is None and not emergency_sources: 
             return "🟢 <b>Графік відсутній</b><br><br>Відключень не передбачається (або дані ще не оновлено)."
@@ -429,15 +417,13 @@ def get_today_schedule_text():
                 output.append("<div class='schedule-divider'></div>")
                 output.append(render_day_schedule_html(tomorrow_slots, now + timedelta(days=1)))
 
-        file_mtime = os.path.getmtime(schedule_file)
+        file_mtime = os.path.getmtime(SCHEDULE_FILE)
         dt_mtime = datetime.fromtimestamp(file_mtime, KYIV_TZ)
 
         # Only display the source that was actually used for the schedule
         active_sources = []
-        if found_source:
-            if found_source == 'yasno': active_sources.append("YASNO")
-            elif found_source == 'github': active_sources.append("ДТЕК")
-            elif found_source == 'custom': active_sources.append("Свій URL")
+        if today_plan and today_plan.source:
+            active_sources.append(SOURCE_LABELS.get(today_plan.source, today_plan.source))
 
         sources_str = f" [{', '.join(active_sources)}]" if active_sources else ""
 
@@ -466,18 +452,29 @@ async def get_air_quality():
         # OpenMeteo for PM2.5/PM10
         lat = aq_cfg.get("lat", "50.45")
         lon = aq_cfg.get("lon", "30.52")
-        om_url = f"https://air-quality-api.open-meteo.com/v1/air-quality?latitude={lat}&longitude={lon}&current=pm10,pm2_5&hourly=pm2_5&past_days=1"
+        om_url = f"{OPEN_METEO_AQ_BASE}/v1/air-quality?latitude={lat}&longitude={lon}&current=pm10,pm2_5&hourly=pm2_5&past_days=1"
         
         # SaveEcoBot for Station-specific (Station 17095)
         seb_id = aq_cfg.get("seb_station", "17095")
         seb_url = f"https://www.saveecobot.com/platform/api/v1/stations/{seb_id}"
         
         # Weather for Temp/Hum
-        w_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m&hourly=temperature_2m,relative_humidity_2m&past_days=1"
+        w_url = f"{OPEN_METEO_BASE}/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m&hourly=temperature_2m,relative_humidity_2m&past_days=1"
 
-        def fetch_all():
-            pm_data = requests.get(om_url, timeout=5).json()
-            w_data = requests.get(w_url, timeout=5).json()
+        async def fetch_all():
+            cb = breakers.get("open-meteo")
+            if not cb.can_execute():
+                raise RuntimeError(f"open-meteo circuit breaker is {cb.state}")
+            try:
+                async with http_clients.session("air_quality") as client:
+                    pm_resp, w_resp = await asyncio.gather(client.get(om_url), client.get(w_url))
+                pm_resp.raise_for_status()
+                w_resp.raise_for_status()
+            except Exception:
+                cb.record_failure()
+                raise
+            cb.record_success()
+            pm_data, w_data = pm_resp.json(), w_resp.json()
 
             pm25 = pm_data.get('current', {}).get('pm2_5', 0)
             pm10 = pm_data.get('current', {}).get('pm10', 0)
@@ -576,16 +573,29 @@ def get_wind_label(deg):
     labels = ["Пн", "ПнСх", "Сх", "ПдСх", "Пд", "ПдЗх", "Зх", "ПнЗх"]
     return labels[int((deg + 22.5) % 360 / 45)]
 
+def render_page(request: Request, name: str, headers: dict = None) -> Response:
+    """Pre-rendered page shell: 304 on a matching ETag, else the best precompressed variant."""
+    return page_shells.response(name, request.headers.get("if-none-match"),
+                                request.headers.get("accept-encoding"), headers)
+
 @app.get('/')
 def index(request: Request):
     # Force dark theme preference for the dashboard
-    return templates.TemplateResponse(request=request, name="index.html")
+    return render_page(request, "index.html")
 
 @app.get('/robots.txt')
 def robots_txt():
     content = "User-agent: *\nDisallow: /admin\nDisallow: /api/\nAllow: /\n\nSitemap: https://flash.srvrs.top/sitemap.xml"
     return PlainTextResponse(content)
 
+@app.get('/schedule_history.json')
+def schedule_history_document(if_none_match: str = Header(None, alias="If-None-Match")):
+    """Combined schedule history for replicas (SCHEDULE_API_URL), assembled from the per-date store."""
+    body, etag = history_store.document()
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @app.get('/sitemap.xml')
 def sitemap_xml():
     content = '''<?xml version="1.0" encoding="UTF-8"?>
@@ -602,11 +612,40 @@ def sitemap_xml():
 def admin_panel(request: Request, t: str = Query(None), x_admin_token: str = Header(None, alias="X-Admin-Token")):
     token = t or x_admin_token
     if token and token == state.get('admin_token'):
-        return templates.TemplateResponse(request=request, name="admin.html")
+        # Never keep the admin page in shared caches
+        return render_page(request, "admin.html", {"Cache-Control": "private, no-cache"})
     return PlainTextResponse("Access Denied", status_code=403)
 
-@app.get('/api/status')
-async def api_status():
+VERSION_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "VERSION")
+# Built by the leader worker, adopted by the others (see StatusSnapshot)
+STATUS_SHARED_FILE = os.path.join(DATA_DIR, "status_snapshot.json")
+
+# The only state fields build_status reads. Heartbeats rewrite the state file (last_seen)
+# every few seconds; they must not count as a change of the payload.
+STATUS_STATE_FIELDS = ("status", "came_up_at", "went_down_at", "pending_confirmation")
+_status_state_key = (None, None)
+
+def status_state_key():
+    """STATUS_STATE_FIELDS of the state file, re-read only when the file changed."""
+    global _status_state_key
+    version = file_version(STATE_FILE)
+    if version != _status_state_key[0]:
+        try:
+            with open(STATE_FILE, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        saved = saved if isinstance(saved, dict) else {}
+        _status_state_key = (version, tuple(saved.get(k) for k in STATUS_STATE_FIELDS))
+    return _status_state_key[1]
+
+def status_inputs():
+    """Versions of everything /api/status is built from."""
+    paths = (EVENT_LOG_FILE, SCHEDULE_FILE, os.path.join(DATA_DIR, "config.json"),
+             ALERT_SNAPSHOT_FILE, VERSION_FILE)
+    return (status_state_key(),) + tuple(file_version(p) for p in paths) + (history_store.version(),)
+
+async def build_status():
     await load_state()
     current_status = state.get("status", "unknown")
     # Ensure we return strictly "on" or "off" for UI icons
@@ -623,7 +662,7 @@ async def api_status():
     
     aq_data = await get_air_quality() if show_aq else None
     rad_data = get_radiation() if show_rad else None
-    alert_data = get_air_raid_alert()
+    alert_data = read_alert_snapshot()
     
     # Extract group name
     config_path = os.path.join(DATA_DIR, "config.json")
@@ -638,37 +677,27 @@ async def api_status():
                 group_name = groups[0].replace('GPV', '')
 
     # Extra: get raw slots for graph bar
-    now = datetime.now(KYIV_TZ)
-    date_str = now.strftime("%Y-%m-%d")
     slots = [True] * 48
-    data_dir = os.environ.get("DATA_DIR", "data")
-    sched_file = os.path.join(data_dir, "last_schedules.json")
-    if os.path.exists(sched_file):
-        try:
-            with open(sched_file, 'r') as f:
-                s_data = json.load(f)
-                merged = None
-                for src in ['github', 'yasno']:
-                    s = s_data.get(src)
-                    if not s: continue
-                    g_key = list(s.keys())[0]
-                    day_data = s.get(g_key, {}).get(date_str, {}).get('slots')
-                    if day_data:
-                        if merged is None: merged = list(day_data)
-                        else:
-                            for i in range(min(len(merged), len(day_data))):
-                                if day_data[i] is False: merged[i] = False
-                if merged: slots = merged
-        except: pass
+    try:
+        today_slots = get_schedule_timeline().slots_for_day(datetime.now(KYIV_TZ).date())
+        if today_slots: slots = today_slots
+    except Exception as e:
+        logger.error("schedule_slots_error", error=str(e))
+
+    # Next planned switch away from the current state, for widgets and /api/status/lite
+    now_ts = time.time()
+    next_info = get_next_scheduled_event(now_ts, ui_light_state == "off")
+    light_next = int(round(now_ts + next_info["time_left_sec"])) if next_info else None
 
     version = "v3.3.8"
-    version_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "VERSION")
-    if os.path.exists(version_path):
-        with open(version_path, 'r') as f:
+    if os.path.exists(VERSION_FILE):
+        with open(VERSION_FILE, 'r') as f:
             version = f.read().strip()
 
     return {
         "light": ui_light_state,
+        "light_since": state.get("came_up_at" if current_status == "up" else "went_down_at") or None,
+        "light_next": light_next,
         "light_event": latest_event_text,
         "recent_events": recent_events,
         "schedule_text": schedule_text,
@@ -680,10 +709,164 @@ async def api_status():
         "show_graphs": show_graphs,
         "show_charts": show_charts,
         "pending_confirmation": state.get("pending_confirmation", False),
-        "timestamp": datetime.now(KYIV_TZ).strftime("%H:%M:%S"),
+        # Minute resolution, like the snapshot tick: a per-second clock would change every build
+        "timestamp": datetime.now(KYIV_TZ).strftime("%H:%M"),
         "version": version
     }
 
+status_snapshot = StatusSnapshot(build_status, status_inputs, shared_path=STATUS_SHARED_FILE)
+status_snapshot.on_change = broadcast_status_patch
+
+async def api_status():
+    return await status_snapshot.current()
+
+def lite_status(data: dict) -> dict:
+    since = data.get("light_since")
+    return {
+        "light": data.get("light"),
+        "since": int(since) if since else None,
+        "next": data.get("light_next"),
+        "alert": (data.get("alert") or {}).get("status"),
+    }
+
+status_lite = SnapshotView(status_snapshot, lite_status)
+# Below the usual 60s proxy read timeout
+LITE_MAX_WAIT = 55
+
+@app.get('/api/status/lite')
+async def api_status_lite(wait: float = Query(0), if_none_match: str = Header(None, alias="If-None-Match")):
+    """
+    A few dozen bytes for widgets and microcontrollers: light, since, next planned switch,
+    alert status (unix seconds). With `wait=N` and the last ETag in If-None-Match the request
+    blocks until one of these changes, or answers 304 after N seconds.
+    """
+    return await status_lite.response(if_none_match, min(max(wait, 0), LITE_MAX_WAIT))
+
+async def status_frame_source():
+    """Binary frames for /ws/status, from the shared status snapshot and the compiled timeline."""
+    # Reads the snapshot as it is; refreshing here could wait on the rebuild that asked for frames
+    data = (status_snapshot.data if status_snapshot.body else await status_snapshot.current()) or {}
+    alert = data.get("alert") or {}
+    primary = alert.get("primary") or tracked_regions()[0]
+    today = datetime.now(KYIV_TZ).date()
+    timeline = get_schedule_timeline()
+    days = []
+    for day in (today, today + timedelta(days=1)):
+        slots = timeline.slots_for_day(day)
+        if slots: days.append((day, slots))
+    return {
+        status_frames.POWER: status_frames.encode_power(data.get("light"), data.get("light_since") or 0,
+                                                        data.get("pending_confirmation", False)),
+        status_frames.ALERT: status_frames.encode_alert(alert.get("status"), alert_store.open_since(primary) or 0,
+                                                        alert.get("stale", False), alert.get("error", False)),
+        status_frames.SCHEDULE: status_frames.encode_schedule(days),
+    }
+
+frame_hub = status_frames.FrameHub(status_frame_source)
+
+@app.websocket('/ws/status')
+async def ws_status(websocket: WebSocket, topics: str = Query(None)):
+    """
+    Compact binary frames for wall displays (layout in app.status_frames): the current
+    frame of each subscribed topic on connect, then only frames that changed. `?topics=`
+    or a text message like "power,alerts" selects topics; all by default.
+    """
+    await websocket.accept()
+    await frame_hub.connect(websocket, status_frames.parse_topics(topics))
+    try:
+        while True:
+            message = await websocket.receive_text()
+            await frame_hub.subscribe(websocket, status_frames.parse_topics(message))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        frame_hub.disconnect(websocket)
+
+@app.get('/api/status')
+async def api_status_endpoint(if_none_match: str = Header(None, alias="If-None-Match"),
+                              accept_encoding: str = Header(None, alias="Accept-Encoding")):
+    """Served from the in-memory snapshot, precompressed; unchanged payloads get a 304."""
+    return await status_snapshot.response(if_none_match, accept_encoding)
+
+# Keeps a single request bounded; clients page with the cursor
+EVENTS_MAX_LIMIT = 200
+
+@app.get('/api/events')
+async def api_events(t_from: float = Query(None, alias="from"), t_to: float = Query(None, alias="to"),
+                     limit: int = Query(20, ge=1), cursor: str = Query(None)):
+    """
+    Power events, newest first, with `duration_prev` (seconds since the previous event).
+    `from`/`to` are unix seconds (to exclusive); pass `next_cursor` back as `cursor` for
+    the next page.
+    """
+    try:
+        events, next_cursor = event_store.query(t_from, t_to, min(limit, EVENTS_MAX_LIMIT), cursor)
+    except ValueError as e:
+        return JSONResponse({"status": "error", "msg": str(e)}, status_code=400)
+    return {"events": events, "next_cursor": next_cursor}
+
+# Ten years of days; keeps a single request bounded
+STATS_MAX_DAYS = 3660
+
+@app.get('/api/stats')
+def api_stats(d_from: str = Query(None, alias="from"), d_to: str = Query(None, alias="to"),
+              granularity: str = Query("day")):
+    """
+    Up/down hours, plan compliance, outage count and P50/P95 duration, alert overlap per
+    day/week/month between `from` and `to` (YYYY-MM-DD, inclusive; last 30 days by default).
+    """
+    try:
+        end = datetime.strptime(d_to, "%Y-%m-%d").date() if d_to else datetime.now(KYIV_TZ).date()
+        start = datetime.strptime(d_from, "%Y-%m-%d").date() if d_from else end - timedelta(days=29)
+        if (end - start).days >= STATS_MAX_DAYS:
+            raise ValueError(f"range is limited to {STATS_MAX_DAYS} days")
+        # Read-only here (run_background stores the aggregates); plain def, so a cold
+        # range is walked in the threadpool instead of on the event loop
+        return daily_stats.query(start, end, granularity)
+    except ValueError as e:
+        return JSONResponse({"status": "error", "msg": str(e)}, status_code=400)
+
+@app.get('/api/schedule/groups')
+async def api_schedule_groups():
+    """Resolved today/tomorrow plan of every group, served from the shared compiled timelines."""
+    today = datetime.now(KYIV_TZ).date()
+    dates = [today, today + timedelta(days=1)]
+    try:
+        timelines = get_group_timelines()
+    except Exception as e:
+        logger.error("schedule_groups_error", error=str(e))
+        timelines = {}
+
+    groups = {}
+    for group in sorted(timelines):
+        timeline = timelines[group]
+        groups[group] = {d.strftime("%Y-%m-%d"): timeline.day_summary(d) for d in dates}
+    return {
+        "configured": get_configured_groups(),
+        "dates": [d.strftime("%Y-%m-%d") for d in dates],
+        "groups": groups,
+    }
+
+@app.get('/api/alerts')
+async def api_alerts():
+    """Per-region alert status from the shared snapshot plus today's alert intervals."""
+    snapshot = read_alert_snapshot()
+    today = datetime.now(KYIV_TZ).date()
+    tracked = tracked_regions()
+    regions = {}
+    for region in tracked:
+        intervals = await asyncio.to_thread(get_alert_intervals, today, region)
+        regions[region] = dict(snapshot.get("regions", {}).get(region, {"alert": False, "known": False}),
+                               intervals=[[s.strftime("%H:%M"), e.strftime("%H:%M")] for s, e, _ in intervals])
+    return {
+        "status": snapshot.get("status"),
+        "primary": tracked[0],
+        "fetched_at": snapshot.get("fetched_at"),
+        "stale": snapshot.get("stale"),
+        "date": today.strftime("%Y-%m-%d"),
+        "regions": regions,
+    }
+
 @app.get('/api/push/{key}')
 async def push_api(key: str, background_tasks: BackgroundTasks, x_secret_key: str = Header(None, alias="X-Secret-Key")):
     secret_key = x_secret_key or key
@@ -870,12 +1053,12 @@ async def tg_webhook(data: dict = Body(None), background_tasks: BackgroundTasks
                 state['safety_net_pending'] = False
                 await save_state()
 
-            requests.post(f"https://api.telegram.org/bot{get_telegram_token()}/answerCallbackQuery", json={
+            telegram_post(f"{TELEGRAM_API_BASE}/bot{get_telegram_token()}/answerCallbackQuery", {
                 "callback_query_id": cb['id'],
                 "text": f"🛠 Моніторинг вимкнено на {minutes} хв"
             })
 
-            requests.post(f"https://api.telegram.org/bot{get_telegram_token()}/editMessageText", json={
+            telegram_post(f"{TELEGRAM_API_BASE}/bot{get_telegram_token()}/editMessageText", {
                 "chat_id": chat_id,
                 "message_id": msg_id,
                 "text": f"🛠 Технічний збій. Моніторинг призупинено до {datetime.fromtimestamp(state['muted_until'], KYIV_TZ).strftime('%H:%M')}"
@@ -959,11 +1142,6 @@ async def admin_data(request: Request):
             
     await load_state()
     
-    logs = []
-    if os.path.exists(EVENT_LOG_FILE):
-        with open(EVENT_LOG_FILE, 'r') as f:
-            logs = json.load(f)
-            
     # Get version
     version = "v3.3.8"
     version_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "VERSION")
@@ -974,8 +1152,11 @@ async def admin_data(request: Request):
     return {
         "config": config,
         "state": state,
-        "logs": logs[-20:][::-1], # Last 20, newest first
+        "logs": event_store.latest(20),  # Newest first; the admin UI pages further via /api/events
         "version": version,
+        "jobs": report_jobs.stats(),
+        "http_clients": http_clients.stats(),
+        "circuit_breakers": breakers.stats(),
         "env": {
             "telegram_bot_token": get_telegram_token(),
             "telegram_channel_id": get_telegram_channel_id_cfg()
@@ -1111,16 +1292,9 @@ async def admin_logs_delete(request: Request, timestamp: float):
         return JSONResponse({"status": "error", "msg": "Access Denied"}, status_code=403)
 
     try:
-        if os.path.exists(EVENT_LOG_FILE):
-            with open(EVENT_LOG_FILE, 'r') as f:
-                logs = json.load(f)
-
-            # Filter out the log with given timestamp (within small margin for float)
-            new_logs = [log for log in logs if abs(log.get('timestamp', 0) - timestamp) > 0.1]
-
-            with open(EVENT_LOG_FILE, 'w') as f:
-                json.dump(new_logs, f, indent=2)
-
+        # Within a small margin for float timestamps; neighbouring durations are recomputed
+        async with state_mgr:
+            await asyncio.to_thread(event_store.delete, timestamp)
         return {"status": "ok"}
     except Exception as e:
         return JSONResponse({"status": "error", "msg": str(e)}, status_code=500)
@@ -1207,27 +1381,51 @@ async def admin_regen_token(request: Request):
 
 @app.get('/api/status/stream')
 async def status_stream(request: Request):
-    
+    """
+    One `snapshot` event with the full versioned document, then `patch` events carrying
+    JSON-Patch ops from `base` to `version`. A client that sees a gap reconnects to resync.
+
+    Every event carries an ID, so a browser reconnecting with `Last-Event-ID` is replayed
+    only the patches it missed from this worker's buffer; it gets a snapshot only when
+    the ID is from another worker or older than the buffer.
+    """
+    last_event_id = request.headers.get("last-event-id")
+
+    def snapshot_event():
+        # Spread reconnects out so a whole neighbourhood coming back online does not arrive at once
+        return {"event": "snapshot", "id": status_snapshot.event_id(), "data": status_snapshot.snapshot_json(),
+                "retry": random.randint(2000, 8000)}
+
     async def event_generator():
         q = asyncio.Queue(maxsize=100)
         await manager.connect(q)
         try:
-            # Initial burst
-            initial_data = await api_status()
-            yield {
-                "event": "update",
-                "data": json.dumps({"type": "update", "data": initial_data})
-            }
-            
+            await status_snapshot.current()
+            sent = status_snapshot.version
+            missed = status_snapshot.replay_since(last_event_id)
+            if missed is None:
+                STREAM_RESUMES.labels(result="snapshot").inc()
+                yield snapshot_event()
+            else:
+                STREAM_RESUMES.labels(result="replay").inc()
+                for version, patch in missed:
+                    yield {"event": "patch", "id": status_snapshot.event_id(version), "data": patch}
+
             while True:
                 if await request.is_disconnected():
                     break
                 try:
                     message = await asyncio.wait_for(q.get(), timeout=15.0)
-                    yield {
-                        "event": "update",
-                        "data": json.dumps(message)
-                    }
+                    if message is None:
+                        sent = status_snapshot.version
+                        yield snapshot_event()
+                        continue
+                    version, patch = message
+                    # Queued while the snapshot/replay above was prepared: already covered
+                    if version <= sent:
+                        continue
+                    sent = version
+                    yield {"event": "patch", "id": status_snapshot.event_id(version), "data": patch}
                 except asyncio.TimeoutError:
                     yield {
                         "event": "ping",
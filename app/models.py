@@ -32,11 +32,12 @@ class SourcesConfig(BaseModel):
 class AdvancedSettings(BaseModel):
     model_config = ConfigDict(extra='ignore')
     notifications: Notifications = Notifications()
-    retention: Dict[str, int] = {"event_log_days": 7, "schedule_history_days": 7}
-    data_sources: Dict[str, Any] = {"priority": "github", "custom_url": "", "smart_deduplication": True, "rollover_hour": 1}
+    retention: Dict[str, int] = {"event_log_days": 7, "schedule_history_days": 7, "alert_history_days": 30}
+    data_sources: Dict[str, Any] = {"priority": "github", "custom_url": "", "smart_deduplication": True, "rollover_hour": 1, "poll_min_sec": 120, "poll_max_sec": 1800, "city_view": True}
     dashboard: Dict[str, bool] = {"show_aq": True, "show_radiation": True, "show_temp_graph": True, "show_charts": True}
     monitoring: Dict[str, Any] = {"push_timeout": 35, "push_interval_min": 20, "push_interval_max": 65, "safety_net_delay": 5}
     quiet_mode: Dict[str, Any] = {"stability_threshold_h": 24, "auto_confirm": True}
+    alerts: Dict[str, Any] = {"regions": ["м. Київ", "Київська область"]}
 
 class AppConfig(BaseModel):
     model_config = ConfigDict(extra='ignore')
@@ -64,6 +65,7 @@ class AppState(BaseModel):
     admin_token: Optional[str] = None
     last_schedule_hash: Optional[str] = None
     alert_start_time: Optional[float] = None
+    alert_regions: Optional[Dict[str, bool]] = None
 
 class ScheduleDay(BaseModel):
     model_config = ConfigDict(extra='ignore')
@@ -0,0 +1,83 @@
+import hashlib
+from typing import Dict, Iterable, Optional
+
+import jinja2
+from fastapi import Response
+from prometheus_client import Counter
+
+from app.compression import compress_variants, encoded_response, pick
+from app.status_snapshot import etag_matches
+
+try:
+    import watchfiles
+except ImportError:  # optional: templates are then only reloaded on restart
+    watchfiles = None
+
+PAGE_RENDERS = Counter('flash_page_renders_total', 'Template renders into page shells', ['template'])
+PAGE_RESPONSES = Counter('flash_page_responses_total', 'Page shell responses by outcome', ['result'])
+
+
+class PageShell:
+    __slots__ = ("body", "variants", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.variants = compress_variants(body)
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+
+
+class PageShells:
+    """
+    Pages rendered once into bytes, with compressed variants and an ETag.
+
+    The dashboard and admin templates take no per-request context (everything live comes
+    from the API), so each is compiled and rendered once; requests only pick a variant or
+    answer 304. The old `env.cache = None` workaround is gone: Jinja's template cache is
+    keyed by the name, which broke only when a context dict was passed in its place, so
+    names are checked here. `watch()` drops the shells when a template file changes.
+    """
+
+    def __init__(self, env: jinja2.Environment):
+        self.env = env
+        self._shells: Dict[str, PageShell] = {}
+
+    def get(self, name: str) -> PageShell:
+        shell = self._shells.get(name)
+        if shell is None:
+            if not isinstance(name, str):
+                raise TypeError(f"template name must be a string, got {type(name).__name__}")
+            shell = PageShell(self.env.get_template(name).render().encode("utf-8"))
+            PAGE_RENDERS.labels(template=name).inc()
+            self._shells[name] = shell
+        return shell
+
+    def warm(self, names: Iterable[str]):
+        for name in names:
+            self.get(name)
+
+    def clear(self):
+        self._shells.clear()
+        if self.env.cache is not None:
+            self.env.cache.clear()
+
+    def response(self, name: str, if_none_match: Optional[str], accept_encoding: Optional[str],
+                 headers: Optional[dict] = None) -> Response:
+        shell = self.get(name)
+        encoding = pick(shell.variants, accept_encoding)
+        etag = f'{shell.etag[:-1]}-{encoding}"' if encoding else shell.etag
+        headers = dict(headers or {}, ETag=etag, Vary="Accept-Encoding")
+        headers.setdefault("Cache-Control", "no-cache")
+        if etag_matches(if_none_match, shell.etag):
+            PAGE_RESPONSES.labels(result="not_modified").inc()
+            return Response(status_code=304, headers=headers)
+        PAGE_RESPONSES.labels(result="full").inc()
+        return encoded_response(shell.body, shell.variants, accept_encoding, "text/html; charset=utf-8", headers)
+
+    async def watch(self, directory: str):
+        """Dev mode: re-render on template edits. Needs the optional watchfiles package."""
+        if watchfiles is None:
+            print("Template reload requested but watchfiles is not installed")
+            return
+        async for changes in watchfiles.awatch(directory):
+            print(f"Templates changed ({len(changes)} files), reloading page shells")
+            self.clear()
@@ -8,6 +8,12 @@ from zoneinfo import ZoneInfo
 from typing import Optional
 import aiofiles
 
+from app.schedule_diff import ScheduleDiff, diff_schedules, SOURCES
+from app.schedule_history import HistoryStore
+from app.http_cache import ValidatorStore, NOT_MODIFIED, record_result
+from app.http_clients import http_clients
+from app.circuit_breaker import breakers
+
 def get_timezone():
     try:
         data_dir = os.environ.get("DATA_DIR", ".")
@@ -21,63 +27,80 @@ def get_timezone():
     return ZoneInfo("Europe/Kyiv")
 
 KYIV_TZ = get_timezone()
-GITHUB_URL = "https://raw.githubusercontent.com/Baskerville42/outage-data-ua/main/data/{region}.json"
-YASNO_URL = "https://app.yasno.ua/api/blackout-service/public/shutdowns/regions/{region_id}/dsos/{dso_id}/planned-outages"
-
-# --- Circuit Breaker Pattern for Yasno API ---
-class CircuitBreaker:
-    def __init__(self, failure_threshold=3, recovery_timeout=60):
-        self.failure_threshold = failure_threshold
-        self.recovery_timeout = recovery_timeout
-        self.failure_count = 0
-        self.state = "CLOSED" # CLOSED, OPEN, HALF-OPEN
-        self.last_failure_time = 0
+# Overridable so scripts/replay_server.py can stand in for the upstreams
+GITHUB_URL = os.environ.get("GITHUB_URL", "https://raw.githubusercontent.com/Baskerville42/outage-data-ua/main/data/{region}.json")
+# Days of `fact.data` used from the GitHub document (the earliest ones)
+GITHUB_FACT_DAYS = 3
+YASNO_URL = os.environ.get("YASNO_URL", "https://app.yasno.ua/api/blackout-service/public/shutdowns/regions/{region_id}/dsos/{dso_id}/planned-outages")
 
-    def can_execute(self):
-        if self.state == "CLOSED":
-            return True
-        if self.state == "OPEN":
-            if time.time() - self.last_failure_time > self.recovery_timeout:
-                self.state = "HALF-OPEN"
-                return True
-            return False
-        if self.state == "HALF-OPEN":
-            return False # Only one request should try when HALF-OPEN
-        return True
+# --- Circuit breakers (shared across workers, see app.circuit_breaker) ---
+yasno_cb = breakers.get("yasno")
 
-    def record_success(self):
-        self.failure_count = 0
-        self.state = "CLOSED"
+async def _get_json(client: httpx.AsyncClient, url: str, source: str, validators: Optional[ValidatorStore] = None,
+                    headers: Optional[dict] = None, timeout: float = 20):
+    """GET with stored validators; returns NOT_MODIFIED on 304 instead of a payload."""
+    req_headers = dict(headers or {})
+    if validators is not None:
+        req_headers.update(validators.headers(url))
+    r = await client.get(url, headers=req_headers, timeout=timeout)
+    if r.status_code == 304:
+        record_result(source, True)
+        return NOT_MODIFIED
+    r.raise_for_status()
+    record_result(source, False)
+    if validators is not None:
+        validators.remember(url, r, source)
+    return r.json()
 
-    def record_failure(self):
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-        if self.failure_count >= self.failure_threshold:
-            self.state = "OPEN"
-        else:
-            self.state = "CLOSED"
+def groups_filter(cfg: dict) -> Optional[set]:
+    """Groups to keep from upstream documents, None for all (the whole-city view)."""
+    if cfg.get('advanced', {}).get('data_sources', {}).get('city_view', True):
+        return None
+    return set(cfg['settings'].get('groups', []))
 
-yasno_cb = CircuitBreaker()
+def trim_github(data, groups: Optional[set]) -> dict:
+    """
+    Keeps only what extract_github reads: the first GITHUB_FACT_DAYS `fact.data` days,
+    limited to `groups` (None for all). The presets and older days are dropped.
+    """
+    if not isinstance(data, dict):
+        return {}
+    fact = (data.get("fact") or {}).get("data") or {}
+    if not isinstance(fact, dict):
+        return {"fact": {"data": {}}}
+    kept = {}
+    for ts in sorted((k for k in fact if str(k).isdigit()), key=int)[:GITHUB_FACT_DAYS]:
+        day_groups = fact.get(ts)
+        if isinstance(day_groups, dict):
+            kept[ts] = {g: d for g, d in day_groups.items() if groups is None or g in groups}
+    return {"fact": {"data": kept}}
 
-async def fetch_github(client: httpx.AsyncClient, cfg: dict) -> Optional[dict]:
+async def fetch_github(client: httpx.AsyncClient, cfg: dict, validators: Optional[ValidatorStore] = None):
     if not cfg.get('sources', {}).get('github', {}).get('enabled', False):
         return None
+    cb = breakers.get("github")
+    if not cb.can_execute():
+        print(f"GitHub Circuit Breaker is {cb.state}. Skipping request.")
+        return None
     try:
         url = GITHUB_URL.format(region=cfg['settings'].get('region', 'kyiv'))
-        r = await client.get(url, timeout=20)
-        r.raise_for_status()
-        return r.json()
+        data = await _get_json(client, url, "github", validators)
+        cb.record_success()
+        # json.loads of the whole document beats incremental parsing here; trim it right after
+        return data if data is NOT_MODIFIED else trim_github(data, groups_filter(cfg))
     except Exception as e:
         print(f"GitHub fetch error: {e}")
+        cb.record_failure()
         return None
 
-async def fetch_yasno(client: httpx.AsyncClient, cfg: dict, source_id: str = "yasno") -> Optional[dict]:
+async def fetch_yasno(client: httpx.AsyncClient, cfg: dict, source_id: str = "yasno", validators: Optional[ValidatorStore] = None):
     yasno_cfg = cfg.get('sources', {}).get(source_id, {})
     if not yasno_cfg.get('enabled', False):
         return None
         
-    if not yasno_cb.can_execute():
-        print(f"Yasno API Circuit Breaker is {yasno_cb.state}. Skipping request.")
+    cb = breakers.get(source_id)
+    if not cb.can_execute():
+        print(f"Yasno API Circuit Breaker is {cb.state}. Skipping request.")
         return None
         
     try:
@@ -95,19 +118,18 @@ async def fetch_yasno(client: httpx.AsyncClient, cfg: dict, source_id: str = "ya
             dso_id=dso_id
         )
             
-        r = await client.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=20)
-        r.raise_for_status()
+        data = await _get_json(client, url, source_id, validators, headers={"User-Agent": "Mozilla/5.0"})
         
-        yasno_cb.record_success()
-        return r.json()
+        cb.record_success()
+        return data
     except Exception as e:
         print(f"Yasno fetch error ({source_id}): {e}")
-        yasno_cb.record_failure()
+        cb.record_failure()
         return None
 
 from urllib.parse import urlparse
 
-async def fetch_custom(client: httpx.AsyncClient, cfg: dict) -> Optional[dict]:
+async def fetch_custom(client: httpx.AsyncClient, cfg: dict, validators: Optional[ValidatorStore] = None):
     custom_url = cfg.get('advanced', {}).get('data_sources', {}).get('custom_url')
     if not custom_url:
         return None
@@ -116,12 +138,17 @@ async def fetch_custom(client: httpx.AsyncClient, cfg: dict) -> Optional[dict]:
         return None
     if parsed.hostname in ['localhost', '127.0.0.1'] or (parsed.hostname and parsed.hostname.startswith('192.168.')):
         return None
+    cb = breakers.get("custom")
+    if not cb.can_execute():
+        print(f"Custom URL Circuit Breaker is {cb.state}. Skipping request.")
+        return None
     try:
-        r = await client.get(custom_url, headers={"User-Agent": "Flash-Monitor/2.7"}, timeout=20)
-        r.raise_for_status()
-        return r.json()
+        data = await _get_json(client, custom_url, "custom", validators, headers={"User-Agent": "Flash-Monitor/2.7"})
+        cb.record_success()
+        return data
     except Exception as e:
         print(f"Custom URL fetch error: {e}")
+        cb.record_failure()
         return None
 
 def parse_github_day(day_data: dict) -> list[bool]:
@@ -136,33 +163,37 @@ def parse_github_day(day_data: dict) -> list[bool]:
     return slots
 
 def extract_github(data: dict, cfg: dict) -> dict:
-    res = {}
-    if not data: return res
+    """Every group of the region file in one pass: {group: {date: {slots, status}}}."""
+    res = {grp: {} for grp in cfg['settings'].get('groups', [])}
+    if not data: return {}
+    wanted = groups_filter(cfg)
     fact = data.get("fact", {}).get("data", {})
     if isinstance(fact, list):
         fact = {}
-    for grp in cfg['settings'].get('groups', []):
-        res[grp] = {}
-        for ts in sorted(fact.keys(), key=int)[:3]:
-            d = fact.get(ts, {}).get(grp)
-            if not d: continue
-            dt = datetime.fromtimestamp(int(ts), tz=KYIV_TZ)
-            d_str = dt.strftime("%Y-%m-%d")
+    for ts in sorted(fact.keys(), key=int)[:GITHUB_FACT_DAYS]:
+        day_groups = fact.get(ts) or {}
+        d_str = datetime.fromtimestamp(int(ts), tz=KYIV_TZ).strftime("%Y-%m-%d")
+        for grp, d in day_groups.items():
+            if not d or not isinstance(d, dict) or (wanted is not None and grp not in wanted): continue
             if all(d.get(str(h), "yes") == "yes" for h in range(1, 25)):
-                res[grp][d_str] = {"slots": [True] * 48, "status": "normal"}
+                slots = [True] * 48
             else:
-                res[grp][d_str] = {"slots": parse_github_day(d), "status": "normal"}
+                slots = parse_github_day(d)
+            res.setdefault(grp, {})[d_str] = {"slots": slots, "status": "normal"}
     return res
 
 def extract_yasno(data: dict, cfg: dict) -> dict:
+    """Every group YASNO returned for the DSO in one pass: {group: {date: {slots, status}}}."""
     res = {}
     if not data: return res
-    for grp in cfg['settings'].get('groups', []):
-        key = grp.replace("GPV", "")
-        if key not in data: continue
+    wanted = groups_filter(cfg)
+    for key, group_data in data.items():
+        if not isinstance(group_data, dict) or not ("today" in group_data or "tomorrow" in group_data): continue
+        grp = f"GPV{key}"
+        if wanted is not None and grp not in wanted: continue
         res[grp] = {}
         for day in ["today", "tomorrow"]:
-            d = data[key].get(day)
+            d = group_data.get(day)
             if not d or "date" not in d: continue
             dt = datetime.fromisoformat(d["date"])
             d_str = dt.strftime("%Y-%m-%d")
@@ -183,27 +214,14 @@ def extract_yasno(data: dict, cfg: dict) -> dict:
                 res[grp][d_str] = {"slots": slots, "status": "normal"}
     return res
 
-def has_schedule_changed(old_cache: dict, new_cache: dict) -> bool:
+def schedule_diff(old_cache: dict, new_cache: dict) -> ScheduleDiff:
+    """Structured changes against the previous cache; sources without a baseline are not reported."""
     if not old_cache:
-        return False
-        
-    for source in ['yasno', 'github', 'custom']:
-        if source not in new_cache:
-            continue
-            
-        old_src = old_cache.get(source, {})
-        new_src = new_cache[source]
-        
-        if not old_src:
-            continue
-            
-        for group, new_dates in new_src.items():
-            old_dates = old_src.get(group, {})
-            for date_str, new_data in new_dates.items():
-                old_data = old_dates.get(date_str)
-                if not old_data or old_data.get('slots') != new_data.get('slots'):
-                    return True
-    return False
+        return ScheduleDiff()
+    return diff_schedules(old_cache, new_cache, [s for s in SOURCES if old_cache.get(s)])
+
+def has_schedule_changed(old_cache: dict, new_cache: dict) -> bool:
+    return bool(schedule_diff(old_cache, new_cache))
 
 async def update_local_schedules(config_path: str, output_path: str):
     try:
@@ -211,23 +229,6 @@ async def update_local_schedules(config_path: str, output_path: str):
             content = await f.read()
             cfg = json.loads(content)
 
-        async with httpx.AsyncClient() as client:
-            gh_task = fetch_github(client, cfg)
-            ys_task = fetch_yasno(client, cfg)
-            cu_task = fetch_custom(client, cfg)
-            
-            gh_data, ys_data, cu_data = await asyncio.gather(gh_task, ys_task, cu_task)
-
-        github_cache = extract_github(gh_data, cfg)
-        yasno_cache = extract_yasno(ys_data, cfg)
-        
-        # Simple extraction for custom source: assume it's already in {group: {date: {slots, status}}} format
-        custom_cache = {}
-        if cu_data:
-            for grp in cfg['settings'].get('groups', []):
-                if grp in cu_data:
-                    custom_cache[grp] = cu_data[grp]
-
         old_cache = {}
         if os.path.exists(output_path):
             try:
@@ -237,6 +238,39 @@ async def update_local_schedules(config_path: str, output_path: str):
             except Exception:
                 pass
 
+        # Validators are only useful while we still hold the data they describe, filtered
+        # for the groups we keep now
+        wanted = groups_filter(cfg)
+        scope = ",".join(sorted(wanted)) if wanted is not None else "*"
+        validators = ValidatorStore(os.path.join(os.path.dirname(output_path) or ".", "http_validators.json"),
+                                    scopes={"github": scope, "yasno": scope})
+        for source in SOURCES:
+            if not old_cache.get(source):
+                validators.forget_source(source)
+
+        async with http_clients.session("schedules") as client:
+            gh_task = fetch_github(client, cfg, validators)
+            ys_task = fetch_yasno(client, cfg, validators=validators)
+            cu_task = fetch_custom(client, cfg, validators)
+            
+            gh_data, ys_data, cu_data = await asyncio.gather(gh_task, ys_task, cu_task)
+
+        fetched = (gh_data, ys_data, cu_data)
+        if NOT_MODIFIED in fetched and all(d is None or d is NOT_MODIFIED for d in fetched):
+            print("Upstream schedules not modified (304). Skipping parse.")
+            validators.commit()
+            return True, ScheduleDiff()
+
+        github_cache = old_cache.get("github", {}) if gh_data is NOT_MODIFIED else extract_github(gh_data, cfg)
+        yasno_cache = old_cache.get("yasno", {}) if ys_data is NOT_MODIFIED else extract_yasno(ys_data, cfg)
+        
+        # Simple extraction for custom source: assume it's already in {group: {date: {slots, status}}} format
+        custom_cache = {}
+        if cu_data is NOT_MODIFIED:
+            custom_cache = old_cache.get("custom", {})
+        elif isinstance(cu_data, dict):
+            custom_cache = {grp: days for grp, days in cu_data.items() if isinstance(days, dict)}
+
         new_cache = {}
         if github_cache:
             new_cache["github"] = github_cache
@@ -248,26 +282,19 @@ async def update_local_schedules(config_path: str, output_path: str):
         # Graceful degradation: if all are empty but we have old data, return stale data
         if not new_cache and old_cache:
             print("All schedule sources failed. Degrading gracefully to cached data.")
-            return True, False
+            return True, ScheduleDiff()
             
-        has_changed = has_schedule_changed(old_cache, new_cache)
+        diff = schedule_diff(old_cache, new_cache)
             
         new_cache["last_update"] = datetime.now(KYIV_TZ).strftime("%Y-%m-%d %H:%M:%S")
 
         async with aiofiles.open(output_path, "w") as f:
             await f.write(json.dumps(new_cache, indent=2))
+        validators.commit()
 
-        # Update schedule_history.json to preserve historical plans
+        # Preserve historical plans; only dates whose merged slots changed are rewritten
         data_dir = os.environ.get("DATA_DIR", ".")
-        history_path = os.path.join(data_dir, "schedule_history.json")
-        history = {}
-        if os.path.exists(history_path):
-            try:
-                async with aiofiles.open(history_path, "r") as f:
-                    content = await f.read()
-                    history = json.loads(content)
-            except Exception:
-                pass
+        history = HistoryStore(os.path.join(data_dir, "schedule_history"), os.path.join(data_dir, "schedule_history.json"))
 
         # Collect all dates from all available caches
         all_dates = set()
@@ -276,16 +303,18 @@ async def update_local_schedules(config_path: str, output_path: str):
                 for grp in cache:
                     all_dates.update(cache[grp].keys())
 
-        history_updated = False
+        # History only tracks the configured (primary) group
+        groups = cfg['settings'].get('groups', [])
+        history_group = groups[0] if groups else None
+
+        merged = {}
         for date_str in all_dates:
             # Find merged slots for this date across all sources (False wins)
             merged_new_slots = None
             for cache in [custom_cache, yasno_cache, github_cache]: # Priority: Custom > Yasno > GitHub
                 if not cache: continue
-                # We assume all groups in a cache for the same region have similar behavior or we pick the first
-                group_keys = list(cache.keys())
-                if not group_keys: continue
-                grp = group_keys[0]
+                grp = history_group if history_group in cache else next(iter(cache), None)
+                if grp is None: continue
                 day_data = cache[grp].get(date_str)
                 if day_data and day_data.get("slots"):
                     s = day_data["slots"]
@@ -294,27 +323,14 @@ async def update_local_schedules(config_path: str, output_path: str):
                     else:
                         for i in range(min(len(merged_new_slots), len(s))):
                             if s[i] is False: merged_new_slots[i] = False
-            
             if merged_new_slots:
-                # Protective Merge: If day exists in history, preserve ALL existing False (outage) slots.
-                # Never allow a Light slot (True) to overwrite an Outage slot (False) in history.
-                if date_str in history:
-                    old_slots = history[date_str].get("slots", [True] * 48)
-                    final_slots = [
-                        (old_slots[i] if old_slots[i] is False else merged_new_slots[i])
-                        for i in range(min(len(old_slots), len(merged_new_slots)))
-                    ]
-                    history[date_str] = {"slots": final_slots}
-                else:
-                    history[date_str] = {"slots": merged_new_slots}
-                history_updated = True
+                merged[date_str] = merged_new_slots
 
-        if history_updated:
-            async with aiofiles.open(history_path, "w") as f:
-                await f.write(json.dumps(history, indent=2))
+        # Protective merge: an existing outage slot (False) in history is never overwritten by light
+        await asyncio.to_thread(history.merge, merged)
 
-        print(f"Local schedules updated successfully at {new_cache['last_update']}. Changed: {has_changed}")
-        return True, has_changed
+        print(f"Local schedules updated successfully at {new_cache['last_update']}. Changed: {diff!r}")
+        return True, diff
     except Exception as e:
         print(f"Failed to update local schedules: {e}")
-        return False, False
+        return False, ScheduleDiff()
@@ -6,21 +6,27 @@ from scripts import bootstrap
 bootstrap.perform_cold_start_if_needed()
 
 from app.light_service import monitor_loop, schedule_loop, alerts_loop, load_state
+from app.http_clients import http_clients
 
 async def main():
     print("Starting Flash Monitor Background Services (Async)...", flush=True)
     await load_state()
+    http_clients.start()
     
     # Run all loops concurrently
-    from app.light_service import get_air_raid_alert, state
-    current_alert = get_air_raid_alert()
+    from app.light_service import fetch_air_raid_alert, publish_alert_snapshot, state
+    current_alert = await fetch_air_raid_alert()
+    publish_alert_snapshot(current_alert)
     print(f"Startup check: Status={state.get('status')}, Air Raid={current_alert.get('status')} ({current_alert.get('location')})", flush=True)
     
-    await asyncio.gather(
-        monitor_loop(),
-        alerts_loop(),
-        schedule_loop()
-    )
+    try:
+        await asyncio.gather(
+            monitor_loop(),
+            alerts_loop(),
+            schedule_loop()
+        )
+    finally:
+        await http_clients.aclose()
 
 if __name__ == "__main__":
     try:
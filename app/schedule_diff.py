@@ -0,0 +1,196 @@
+import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.schedule_timeline import slots_to_runs, SOURCE_LABELS
+
+SOURCES = ('yasno', 'github', 'custom')
+
+
+def outage_intervals(slots) -> List[Tuple[int, int]]:
+    """(start_slot, end_slot) outage runs, end exclusive."""
+    return [(start, end) for start, end, state in slots_to_runs(slots or []) if state is False]
+
+
+def slot_to_hm(idx: int) -> str:
+    return f"{idx // 2:02d}:{30 if idx % 2 else 0:02d}" if idx < 48 else "24:00"
+
+
+class DayDiff:
+    """Changes of one (source, group, date) schedule between two fetches."""
+    __slots__ = ("source", "group", "date", "is_new", "status_change", "slots_changed",
+                 "added_outage", "removed_outage", "shifted", "new_outages", "cancelled_outages")
+
+    def __init__(self, source, group, date, is_new=False, status_change=None):
+        self.source = source
+        self.group = group
+        self.date = date
+        self.is_new = is_new
+        self.status_change = status_change
+        self.slots_changed = is_new
+        self.added_outage: List[int] = []
+        self.removed_outage: List[int] = []
+        self.shifted: List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+        self.new_outages: List[Tuple[int, int]] = []
+        self.cancelled_outages: List[Tuple[int, int]] = []
+
+    @property
+    def outage_changed(self) -> bool:
+        return bool(self.added_outage or self.removed_outage)
+
+    def __bool__(self):
+        return bool(self.is_new or self.status_change or self.slots_changed)
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "group": self.group,
+            "date": self.date,
+            "is_new": self.is_new,
+            "status_change": list(self.status_change) if self.status_change else None,
+            "slots_changed": self.slots_changed,
+            "added_outage": self.added_outage,
+            "removed_outage": self.removed_outage,
+            "shifted": [[list(a), list(b)] for a, b in self.shifted],
+            "new_outages": [list(i) for i in self.new_outages],
+            "cancelled_outages": [list(i) for i in self.cancelled_outages],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DayDiff":
+        day = cls(d["source"], d["group"], d["date"], d.get("is_new", False),
+                  tuple(d["status_change"]) if d.get("status_change") else None)
+        day.slots_changed = d.get("slots_changed", day.is_new)
+        day.added_outage = list(d.get("added_outage", []))
+        day.removed_outage = list(d.get("removed_outage", []))
+        day.shifted = [(tuple(a), tuple(b)) for a, b in d.get("shifted", [])]
+        day.new_outages = [tuple(i) for i in d.get("new_outages", [])]
+        day.cancelled_outages = [tuple(i) for i in d.get("cancelled_outages", [])]
+        return day
+
+    def describe(self) -> List[str]:
+        """Human readable lines (Ukrainian, as shown in Telegram)."""
+        if self.is_new:
+            return []
+        lines = []
+        for (os_, oe), (ns, ne) in self.shifted:
+            lines.append(f"{slot_to_hm(os_)}–{slot_to_hm(oe)} → {slot_to_hm(ns)}–{slot_to_hm(ne)}")
+        for s, e in self.new_outages:
+            lines.append(f"+ відключення {slot_to_hm(s)}–{slot_to_hm(e)}")
+        for s, e in self.cancelled_outages:
+            lines.append(f"− скасовано {slot_to_hm(s)}–{slot_to_hm(e)}")
+        return lines
+
+
+def diff_day(source: str, group: str, date_str: str, old_day: Optional[dict], new_day: dict) -> DayDiff:
+    if not old_day:
+        day = DayDiff(source, group, date_str, is_new=True)
+        day.added_outage = [i for i, s in enumerate(new_day.get('slots') or []) if s is False]
+        day.new_outages = outage_intervals(new_day.get('slots'))
+        return day
+
+    old_status, new_status = old_day.get('status'), new_day.get('status')
+    day = DayDiff(source, group, date_str,
+                  status_change=(old_status, new_status) if old_status != new_status else None)
+    old_slots, new_slots = old_day.get('slots') or [], new_day.get('slots') or []
+    if old_slots == new_slots:
+        return day
+    day.slots_changed = True
+
+    for i in range(max(len(old_slots), len(new_slots))):
+        was_off = i < len(old_slots) and old_slots[i] is False
+        is_off = i < len(new_slots) and new_slots[i] is False
+        if is_off and not was_off: day.added_outage.append(i)
+        elif was_off and not is_off: day.removed_outage.append(i)
+
+    # Pair old and new outage intervals that overlap one-to-one as shifts,
+    # the rest are brand new or cancelled outages
+    old_iv, new_iv = outage_intervals(old_slots), outage_intervals(new_slots)
+    overlaps = lambda a, b: a[0] < b[1] and b[0] < a[1]
+    matched_new = set()
+    for o in old_iv:
+        hits = [n for n in new_iv if overlaps(o, n)]
+        if not hits:
+            day.cancelled_outages.append(o)
+            continue
+        matched_new.update(hits)
+        if len(hits) == 1 and hits[0] != o and sum(1 for x in old_iv if overlaps(x, hits[0])) == 1:
+            day.shifted.append((o, hits[0]))
+    day.new_outages = [n for n in new_iv if n not in matched_new]
+    return day
+
+
+class ScheduleDiff:
+    """All per (source, group, date) changes between two `last_schedules.json` snapshots."""
+
+    def __init__(self, days: Optional[List[DayDiff]] = None):
+        self.days = days or []
+
+    def __bool__(self):
+        return bool(self.days)
+
+    def dates(self) -> set:
+        return {d.date for d in self.days}
+
+    def affects(self, date_str: str, outage_only: bool = False) -> bool:
+        return any(d.date == date_str and (not outage_only or d.outage_changed) for d in self.days)
+
+    @property
+    def outage_changed(self) -> bool:
+        return any(d.outage_changed for d in self.days)
+
+    def for_groups(self, groups: Optional[Iterable[str]]) -> "ScheduleDiff":
+        """Only the changes of `groups`; everything when no groups are given."""
+        if not groups: return self
+        groups = set(groups)
+        return ScheduleDiff([d for d in self.days if d.group in groups])
+
+    def summary_lines(self, dates: Optional[Iterable[str]] = None, group: Optional[str] = None) -> List[str]:
+        """Per-date change lines, identical changes reported by several sources merged."""
+        wanted = set(dates) if dates is not None else None
+        by_date: Dict[str, List[str]] = {}
+        for d in self.days:
+            if (wanted is not None and d.date not in wanted) or (group and d.group != group):
+                continue
+            seen = by_date.setdefault(d.date, [])
+            for line in d.describe():
+                if line not in seen: seen.append(line)
+        res = []
+        for date_str in sorted(by_date):
+            if not by_date[date_str]: continue
+            try:
+                label = datetime.date.fromisoformat(date_str).strftime("%d.%m")
+            except ValueError:
+                label = date_str
+            res.append(f"{label}: " + "; ".join(by_date[date_str]))
+        return res
+
+    def to_dict(self) -> dict:
+        return {"changes": [d.to_dict() for d in self.days]}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "ScheduleDiff":
+        if not data: return cls()
+        return cls([DayDiff.from_dict(d) for d in data.get("changes", [])])
+
+    def __repr__(self):
+        labels = [f"{SOURCE_LABELS.get(d.source, d.source)}/{d.group}/{d.date}" for d in self.days]
+        return f"ScheduleDiff({', '.join(labels)})"
+
+
+def diff_schedules(old_cache: dict, new_cache: dict, sources: Iterable[str] = SOURCES) -> ScheduleDiff:
+    """
+    Compares two schedule caches ({source: {group: {date: {slots, status}}}}).
+    Dates that disappeared from the new cache are not reported, they simply rolled off.
+    """
+    days = []
+    for source in sources:
+        new_src = new_cache.get(source)
+        if not isinstance(new_src, dict): continue
+        old_src = old_cache.get(source) or {}
+        for group, new_dates in new_src.items():
+            if not isinstance(new_dates, dict): continue
+            old_dates = old_src.get(group) or {}
+            for date_str, new_day in new_dates.items():
+                day = diff_day(source, group, date_str, old_dates.get(date_str), new_day or {})
+                if day: days.append(day)
+    return ScheduleDiff(days)
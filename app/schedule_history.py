@@ -0,0 +1,143 @@
+import os
+import re
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from app.storage import StorageUtils
+
+DATE_FILE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.json$")
+
+
+def protective_merge(old_slots: Optional[list], new_slots: list) -> list:
+    """History never lets a light slot (True) overwrite a recorded outage (False)."""
+    if not old_slots:
+        return list(new_slots)
+    return [old_slots[i] if old_slots[i] is False else new_slots[i]
+            for i in range(min(len(old_slots), len(new_slots)))]
+
+
+class HistoryStore:
+    """
+    Planned schedule history kept as one `{"slots": [...]}` file per date.
+
+    Merges and prunes only touch the dates they change, each written atomically, so the
+    cost of a sync does not grow with retention. `load()` re-reads only the files whose
+    mtime changed since the previous call. A legacy single-file `schedule_history.json`
+    is split into the store on first use. `document()` assembles the combined form that
+    replicas mirror, on request and once per version, so writes never pay for it.
+    """
+
+    def __init__(self, path: str, legacy_file: Optional[str] = None):
+        self.path = path
+        self.legacy_file = legacy_file
+        self._cache: Dict[str, tuple] = {}
+        self._document: tuple = (None, b"", "")
+
+    def _file(self, date_str: str) -> Optional[str]:
+        name = f"{date_str}.json"
+        return os.path.join(self.path, name) if DATE_FILE_RE.match(name) else None
+
+    def migrate_legacy(self):
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        legacy = StorageUtils.load_json_sync(self.legacy_file, default={})
+        if isinstance(legacy, dict):
+            self.merge({d: e.get("slots") for d, e in legacy.items() if isinstance(e, dict)})
+        try:
+            os.replace(self.legacy_file, self.legacy_file + ".migrated")
+            print(f"Migrated {len(legacy or {})} schedule history days into {self.path}")
+        except OSError:
+            pass
+
+    def version(self):
+        """Changes whenever a date file is added, replaced or removed."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return ("missing",) if not (self.legacy_file and os.path.exists(self.legacy_file)) else None
+        except OSError:
+            return None
+        return (st.st_mtime_ns,)
+
+    def get(self, date_str: str) -> Optional[dict]:
+        path = self._file(date_str)
+        if not path or not os.path.exists(path):
+            return None
+        entry = StorageUtils.load_json_sync(path, default=None)
+        return entry if isinstance(entry, dict) else None
+
+    def load(self) -> Dict[str, dict]:
+        self.migrate_legacy()
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return {}
+
+        cache = {}
+        for name in names:
+            m = DATE_FILE_RE.match(name)
+            if not m: continue
+            path = os.path.join(self.path, name)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._cache.get(m.group(1))
+            if cached and cached[0] == mtime:
+                cache[m.group(1)] = cached
+                continue
+            entry = StorageUtils.load_json_sync(path, default=None)
+            if isinstance(entry, dict):
+                cache[m.group(1)] = (mtime, entry)
+        self._cache = cache
+        return {d: cache[d][1] for d in sorted(cache)}
+
+    def document(self) -> Tuple[bytes, str]:
+        """All dates as one `{date: {"slots": [...]}}` JSON document, with its ETag."""
+        version = self.version()
+        if version is None or version != self._document[0]:
+            body = json.dumps(self.load(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._document = (version, body, '"%s"' % hashlib.sha1(body).hexdigest()[:20])
+        return self._document[1], self._document[2]
+
+    def _write(self, date_str: str, slots: list) -> bool:
+        path = self._file(date_str)
+        return bool(path) and StorageUtils.save_json_sync(path, {"slots": slots})
+
+    def merge(self, updates: Dict[str, list]) -> List[str]:
+        """Protective merge of new slots per date; returns the dates that were rewritten."""
+        changed = []
+        for date_str, new_slots in sorted(updates.items()):
+            if not new_slots: continue
+            old_slots = (self.get(date_str) or {}).get("slots")
+            final = protective_merge(old_slots, new_slots)
+            if final != old_slots and self._write(date_str, final):
+                changed.append(date_str)
+        return changed
+
+    def replace_all(self, history: dict) -> List[str]:
+        """Mirrors a full history document (replica mode); unchanged dates are left alone."""
+        changed = []
+        for date_str, entry in history.items():
+            slots = entry.get("slots") if isinstance(entry, dict) else None
+            if not slots or (self.get(date_str) or {}).get("slots") == slots: continue
+            if self._write(date_str, slots):
+                changed.append(date_str)
+        for date_str in set(self.load()) - set(history):
+            self._remove(date_str)
+            changed.append(date_str)
+        return changed
+
+    def _remove(self, date_str: str):
+        try:
+            os.remove(self._file(date_str))
+        except OSError:
+            pass
+
+    def prune(self, cutoff_date: str) -> int:
+        """Removes dates older than `cutoff_date` (YYYY-MM-DD)."""
+        old = [d for d in self.load() if d < cutoff_date]
+        for date_str in old:
+            self._remove(date_str)
+        return len(old)
@@ -0,0 +1,330 @@
+import os
+import json
+import bisect
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.storage import file_version
+
+SLOTS_PER_DAY = 48
+SOURCE_LABELS = {"yasno": "YASNO", "github": "ДТЕК", "custom": "Свій URL"}
+
+
+def priority_order(user_priority: Optional[str]) -> List[str]:
+    """Source lookup order for the configured `advanced.data_sources.priority`."""
+    order = ['yasno', 'github']
+    if user_priority in order:
+        return [user_priority] + [s for s in order if s != user_priority]
+    if user_priority == 'custom':
+        return ['custom', 'yasno', 'github']
+    return order
+
+
+def slots_to_runs(slots) -> List[Tuple[int, int, Optional[bool]]]:
+    """Collapses a slot list into (start_idx, end_idx, state) runs, end exclusive."""
+    if not slots: return []
+    runs = []
+    start_idx = 0
+    current_state = slots[0]
+    for i in range(1, len(slots)):
+        if slots[i] != current_state:
+            runs.append((start_idx, i, current_state))
+            start_idx = i
+            current_state = slots[i]
+    runs.append((start_idx, len(slots), current_state))
+    return runs
+
+
+def _normalize_slots(slots) -> Optional[list]:
+    if not slots or not isinstance(slots, list): return None
+    slots = list(slots[:SLOTS_PER_DAY])
+    if len(slots) < SLOTS_PER_DAY:
+        slots.extend([slots[-1]] * (SLOTS_PER_DAY - len(slots)))
+    return slots
+
+
+def _parse_date(date_str) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+
+
+class DayPlan:
+    """Resolved plan for one date: the slots of the winning source plus status flags."""
+    __slots__ = ("date", "slots", "status", "source", "emergency_sources")
+
+    def __init__(self, date, slots=None, status="unknown", source=None, emergency_sources=None):
+        self.date = date
+        self.slots = slots
+        self.status = status
+        self.source = source
+        self.emergency_sources = emergency_sources or []
+
+    @property
+    def is_emergency(self) -> bool:
+        return self.status == "emergency"
+
+
+def index_by_group(data: dict, order: List[str]) -> Dict[str, Dict[str, Dict[str, dict]]]:
+    """One pass over the cache into {group: {date: {source: day_data}}}."""
+    index: Dict[str, Dict[str, Dict[str, dict]]] = {}
+    for s_name in order:
+        src = data.get(s_name)
+        if not isinstance(src, dict): continue
+        for grp, dates in src.items():
+            if not isinstance(dates, dict): continue
+            grp_index = index.setdefault(grp, {})
+            for date_str, day_data in dates.items():
+                if day_data: grp_index.setdefault(date_str, {})[s_name] = day_data
+    return index
+
+
+def resolve_sources(by_source: Dict[str, dict], date_str: str, order: List[str]) -> Optional[DayPlan]:
+    """Picks the first source (by priority) with slots, falling back to an emergency marker."""
+    found = [(s_name, by_source[s_name]) for s_name in order if s_name in by_source]
+    date = _parse_date(date_str)
+    for s_name, day_data in found:
+        slots = _normalize_slots(day_data.get('slots'))
+        if slots:
+            is_emergency = day_data.get('status') == 'emergency'
+            return DayPlan(date, slots, day_data.get('status', 'normal'), s_name,
+                           [SOURCE_LABELS.get(s_name, s_name)] if is_emergency else [])
+    emergency = [SOURCE_LABELS.get(s, s) for s, d in found if d.get('status') == 'emergency']
+    if emergency:
+        return DayPlan(date, None, "emergency", None, emergency)
+    if found:
+        return DayPlan(date, None, found[0][1].get('status', 'pending'), None)
+    return None
+
+
+class ScheduleTimeline:
+    """
+    Precompiled view of the resolved schedule across history, today and tomorrow.
+
+    Time is addressed by a global half-hour slot index (date ordinal * 48 + slot),
+    which keeps the wall-clock semantics of the 48-slot schedules across DST shifts.
+    Transitions are stored as sorted slot indices, so lookups are bisects.
+    """
+
+    def __init__(self, days: Dict[datetime.date, DayPlan], tz, history: Optional[Dict[datetime.date, list]] = None):
+        self.tz = tz
+        self._days = days
+        self._history = history or {}
+        self._points: List[int] = []
+        self._states: List[Optional[bool]] = []
+        self._into: Dict[bool, List[int]] = {True: [], False: []}
+        self._compile()
+
+    def _compile(self):
+        covered = {}
+        for date, plan in self._days.items():
+            if plan.slots: covered[date] = plan.slots
+        for date, slots in self._history.items():
+            if date not in covered: covered[date] = slots
+
+        prev_state = None
+        prev_end = None
+        for date in sorted(covered):
+            base = date.toordinal() * SLOTS_PER_DAY
+            if prev_end is not None and prev_end != base:
+                self._add_point(prev_end, None)
+                prev_state = None
+            for start, _end, state in slots_to_runs(covered[date]):
+                if state != prev_state:
+                    self._add_point(base + start, state)
+                    prev_state = state
+            prev_end = base + SLOTS_PER_DAY
+        if prev_end is not None:
+            self._add_point(prev_end, None)
+
+    def _add_point(self, idx: int, state: Optional[bool]):
+        self._points.append(idx)
+        self._states.append(state)
+        if state is not None:
+            self._into[bool(state)].append(idx)
+
+    # --- Slot index helpers ---
+
+    def slot_index(self, dt: datetime.datetime) -> int:
+        local = dt.astimezone(self.tz) if dt.tzinfo else dt.replace(tzinfo=self.tz)
+        return local.date().toordinal() * SLOTS_PER_DAY + local.hour * 2 + (1 if local.minute >= 30 else 0)
+
+    def slot_datetime(self, idx: int) -> datetime.datetime:
+        date = datetime.date.fromordinal(idx // SLOTS_PER_DAY)
+        rem = idx % SLOTS_PER_DAY
+        return datetime.datetime.combine(date, datetime.time(rem // 2, 30 if rem % 2 else 0), tzinfo=self.tz)
+
+    @staticmethod
+    def day_start_index(date: datetime.date) -> int:
+        return date.toordinal() * SLOTS_PER_DAY
+
+    # --- Day lookups ---
+
+    def day(self, date: datetime.date) -> Optional[DayPlan]:
+        return self._days.get(date)
+
+    def slots_for_day(self, date: datetime.date) -> Optional[list]:
+        """Live slots for the date, falling back to the archived plan from history."""
+        plan = self._days.get(date)
+        if plan and plan.slots: return list(plan.slots)
+        slots = self._history.get(date)
+        return list(slots) if slots else None
+
+    def intervals_for_day(self, date: datetime.date) -> List[Tuple[int, int, Optional[bool]]]:
+        """(start_slot, end_slot, state) runs inside the date, slot offsets 0..48."""
+        base = self.day_start_index(date)
+        end = base + SLOTS_PER_DAY
+        k = max(bisect.bisect_right(self._points, base) - 1, 0)
+        res = []
+        while k < len(self._points) and self._points[k] < end:
+            seg_start = max(self._points[k], base)
+            seg_end = min(self._points[k + 1], end) if k + 1 < len(self._points) else end
+            if seg_end > seg_start and self._states[k] is not None:
+                res.append((seg_start - base, seg_end - base, self._states[k]))
+            k += 1
+        return res
+
+    def day_summary(self, date: datetime.date) -> dict:
+        """JSON-friendly view of one date: winning source, status, slots and runs."""
+        plan = self._days.get(date)
+        slots = self.slots_for_day(date)
+        return {
+            "source": plan.source if plan else ("history" if slots else None),
+            "status": plan.status if plan else ("archived" if slots else "unknown"),
+            "slots": slots,
+            "intervals": [[start, end, state] for start, end, state in self.intervals_for_day(date)],
+        }
+
+    # --- Point queries ---
+
+    def state_at(self, idx: int) -> Optional[bool]:
+        k = bisect.bisect_right(self._points, idx) - 1
+        return self._states[k] if k >= 0 else None
+
+    def next_change(self, idx: int) -> Optional[int]:
+        """First slot after `idx` where the state differs (including the end of known data)."""
+        k = bisect.bisect_right(self._points, idx)
+        return self._points[k] if k < len(self._points) else None
+
+    def next_transition(self, idx: int, to_state: bool) -> Optional[int]:
+        """First slot after `idx` where a run of `to_state` begins."""
+        points = self._into[bool(to_state)]
+        k = bisect.bisect_right(points, idx)
+        return points[k] if k < len(points) else None
+
+    def nearest_transition(self, dt: datetime.datetime, to_state: bool, max_seconds: Optional[float] = None) -> Optional[datetime.datetime]:
+        """Wall-clock time of the transition into `to_state` closest to `dt`."""
+        points = self._into[bool(to_state)]
+        k = bisect.bisect_right(points, self.slot_index(dt))
+        best = None
+        for cand in points[max(k - 1, 0):k + 1]:
+            cand_dt = self.slot_datetime(cand)
+            if best is None or abs((dt - cand_dt).total_seconds()) < abs((dt - best).total_seconds()):
+                best = cand_dt
+        if best is not None and max_seconds is not None and abs((dt - best).total_seconds()) > max_seconds:
+            return None
+        return best
+
+
+# --- Loading & caching ---
+
+_timeline_cache: Dict[tuple, Dict[str, ScheduleTimeline]] = {}
+
+
+def _load_json(path: str, default):
+    if not os.path.exists(path): return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return default
+
+
+def _history_days(history: dict) -> Dict[datetime.date, list]:
+    hist_days = {}
+    for date_str, entry in (history or {}).items():
+        date = _parse_date(date_str)
+        if date is None: continue
+        slots = _normalize_slots(entry.get('slots') if isinstance(entry, dict) else entry)
+        if slots: hist_days[date] = slots
+    return hist_days
+
+
+def _resolve_group(grp_index: Dict[str, Dict[str, dict]], order: List[str]) -> Dict[datetime.date, DayPlan]:
+    days = {}
+    for date_str, by_source in grp_index.items():
+        if _parse_date(date_str) is None: continue
+        plan = resolve_sources(by_source, date_str, order)
+        if plan: days[plan.date] = plan
+    return days
+
+
+def build_group_timelines(data: dict, history: dict, user_priority: Optional[str], tz,
+                          history_group: Optional[str] = None) -> Dict[str, ScheduleTimeline]:
+    """
+    Timelines for every group found in any source, built from a single pass over the cache.
+    Schedule history only tracks the configured group, so it is attached to
+    `history_group` (the first group when not given).
+    """
+    order = priority_order(user_priority)
+    index = index_by_group(data, order)
+    if history_group is None:
+        history_group = next(iter(index), None)
+    hist_days = _history_days(history)
+    if history_group is not None:
+        index.setdefault(history_group, {})
+    return {
+        grp: ScheduleTimeline(_resolve_group(grp_index, order), tz, hist_days if grp == history_group else None)
+        for grp, grp_index in index.items()
+    }
+
+
+def _pick_group(timelines: Dict[str, ScheduleTimeline], group: Optional[str], tz, history: dict) -> ScheduleTimeline:
+    if group in timelines:
+        return timelines[group]
+    if timelines:
+        return next(iter(timelines.values()))
+    return ScheduleTimeline({}, tz, _history_days(history))
+
+
+def build_timeline(data: dict, history: dict, user_priority: Optional[str], tz, group: Optional[str] = None) -> ScheduleTimeline:
+    """Timeline of `group`, falling back to the first group in the data when it is missing."""
+    return _pick_group(build_group_timelines(data, history, user_priority, tz, group), group, tz, history)
+
+
+def _history_version(history):
+    return file_version(history, missing=("missing",)) if isinstance(history, str) else history.version()
+
+
+def _load_history(history) -> dict:
+    """`history` is a single JSON file path or a store with `load()` (app.schedule_history.HistoryStore)."""
+    return _load_json(history, {}) if isinstance(history, str) else history.load()
+
+
+def load_group_timelines(schedule_file: str, history, user_priority: Optional[str], tz,
+                         history_group: Optional[str] = None) -> Dict[str, ScheduleTimeline]:
+    """Group-indexed timelines for the current file versions, compiled only when they change."""
+    versions = (file_version(schedule_file, missing=("missing",)), _history_version(history))
+    history_key = history if isinstance(history, str) else history.path
+    key = (schedule_file, history_key, versions, user_priority, history_group, str(tz))
+    cacheable = None not in versions
+    if cacheable and key in _timeline_cache:
+        return _timeline_cache[key]
+
+    timelines = build_group_timelines(_load_json(schedule_file, {}), _load_history(history),
+                                      user_priority, tz, history_group)
+    if cacheable:
+        # Only the latest version per file pair is worth keeping
+        for k in [k for k in _timeline_cache if k[:2] == key[:2]]:
+            del _timeline_cache[k]
+        _timeline_cache[key] = timelines
+    return timelines
+
+
+def load_timeline(schedule_file: str, history, user_priority: Optional[str], tz, group: Optional[str] = None) -> ScheduleTimeline:
+    timelines = load_group_timelines(schedule_file, history, user_priority, tz, group)
+    if not timelines:
+        return ScheduleTimeline({}, tz, _history_days(_load_history(history)))
+    return _pick_group(timelines, group, tz, {})
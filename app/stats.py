@@ -0,0 +1,236 @@
+import os
+import fcntl
+import datetime
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cachetools
+
+from app.storage import StorageUtils, file_version
+
+GRANULARITIES = ("day", "week", "month")
+SLOT_SECONDS = 1800
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _overlap(a: List[Tuple[float, float]], b: List[Tuple[float, float]]) -> float:
+    total = 0.0
+    for a0, a1 in a:
+        for b0, b1 in b:
+            total += max(0.0, min(a1, b1) - max(a0, b0))
+    return total
+
+
+def plan_up_seconds(slots: Optional[list], day_start: float, t0: float, t1: float) -> Optional[float]:
+    """Planned light seconds inside [t0, t1) from the 48 half-hour slots of the day."""
+    if not slots:
+        return None
+    total = 0.0
+    for i, light in enumerate(slots[:48]):
+        if light:
+            s0 = day_start + i * SLOT_SECONDS
+            total += max(0.0, min(s0 + SLOT_SECONDS, t1) - max(s0, t0))
+    return total
+
+
+def bucket_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+class DailyStats:
+    """
+    Per-day power statistics persisted in stats_daily.json, so they outlive the retention
+    of the event log, schedule history and alert intervals they are computed from.
+
+    `update()` (re)aggregates the completed days the event log still fully covers, and only
+    when one of the `inputs()` file versions changed; older days are kept as stored. It
+    writes the file, so it runs in the background process only, under `<path>.lock`.
+    `query()` never writes: it sums day aggregates into day/week/month buckets (today, and
+    days not stored yet, computed live) and keeps recent results in an LRU cache, so a
+    year of stats is a dictionary walk.
+    """
+
+    def __init__(self, path: str, events, alerts, slots_for_day: Callable[[datetime.date], Optional[list]],
+                 primary_region: Callable[[], str], inputs: Callable[[], tuple], tz):
+        self.path = path
+        self.events = events
+        self.alerts = alerts
+        self.slots_for_day = slots_for_day
+        self.primary_region = primary_region
+        self.inputs = inputs
+        self.tz = tz
+        self._days: Dict[str, dict] = {}
+        self._version = None
+        self._updated_for = None
+        self._results = cachetools.LRUCache(maxsize=256)
+        # Queries come from the web threadpool
+        self._query_lock = threading.Lock()
+
+    def _day_bounds(self, day: datetime.date) -> Tuple[float, float]:
+        start = datetime.datetime.combine(day, datetime.time.min, tzinfo=self.tz)
+        end = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min, tzinfo=self.tz)
+        return start.timestamp(), end.timestamp()
+
+    def aggregate_day(self, day: datetime.date, now: float) -> dict:
+        """Fact, plan, outages and alert overlap of one day, clipped to `now`."""
+        day_start, day_end = self._day_bounds(day)
+        calc_end = min(day_end, now)
+        previous = self.events.before(day_start)
+        state = previous["event"] if previous else "unknown"
+        totals = {"up": 0.0, "down": 0.0, "unknown": 0.0}
+        down_segments = []
+        cursor = day_start
+        for event in self.events.between(day_start, calc_end) + [{"timestamp": calc_end, "event": None}]:
+            ts = event["timestamp"]
+            if ts > cursor:
+                totals[state if state in totals else "unknown"] += ts - cursor
+                if state == "down":
+                    down_segments.append((cursor, ts))
+            cursor = ts
+            state = event["event"] or state
+
+        # Outages belong to the day they started and count once they are over
+        outages = []
+        for event in self.events.between(day_start, calc_end):
+            if event.get("event") != "down": continue
+            ended = self.events.next_of("up", event["timestamp"])
+            if ended and ended["timestamp"] <= now:
+                outages.append(round(ended["timestamp"] - event["timestamp"]))
+
+        alerts = self.alerts.overlapping(self.primary_region(), day_start, calc_end, now)
+        alerts = [(max(a0, day_start), min(a1, calc_end)) for a0, a1 in alerts]
+        plan = plan_up_seconds(self.slots_for_day(day), day_start, day_start, calc_end)
+        return {
+            "up": round(totals["up"]), "down": round(totals["down"]), "unknown": round(totals["unknown"]),
+            "plan_up": round(plan) if plan is not None else None,
+            "outages": sorted(outages),
+            "alert": round(sum(a1 - a0 for a0, a1 in alerts if a1 > a0)),
+            "alert_overlap": round(_overlap(down_segments, alerts)),
+        }
+
+    def _load(self):
+        version = file_version(self.path)
+        if version != self._version:
+            data = StorageUtils.load_json_sync(self.path, default={})
+            self._days = data if isinstance(data, dict) else {}
+            self._version = version
+
+    def update(self, now: Optional[float] = None) -> int:
+        """Aggregates completed days still covered by the event log; returns how many changed."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + ".lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return self._update(now)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _update(self, now: Optional[float]) -> int:
+        now = now or datetime.datetime.now(self.tz).timestamp()
+        today = datetime.datetime.fromtimestamp(now, self.tz).date()
+        # Another process (the nightly prune) may have written the file
+        key = (self.inputs(), file_version(self.path), today)
+        if key == self._updated_for:
+            return 0
+        self._load()
+        first = self.events.first_timestamp()
+        changed = 0
+        if first is not None:
+            day = datetime.datetime.fromtimestamp(first, self.tz).date()
+            while day < today:
+                date_str = day.isoformat()
+                stored = self._days.get(date_str)
+                # The day started before the oldest event: its state at 00:00 is no longer known
+                if stored is None or self._day_bounds(day)[0] >= first:
+                    agg = self.aggregate_day(day, now)
+                    if stored and agg["plan_up"] is None:
+                        agg["plan_up"] = stored.get("plan_up")  # schedule history already pruned
+                    if agg != stored:
+                        self._days[date_str] = agg
+                        changed += 1
+                day += datetime.timedelta(days=1)
+        if changed:
+            StorageUtils.save_json_sync(self.path, dict(sorted(self._days.items())))
+            self._version = file_version(self.path)
+            self._results.clear()
+        self._updated_for = key[:1] + (self._version,) + key[2:]
+        return changed
+
+    def query(self, d_from: datetime.date, d_to: datetime.date, granularity: str = "day",
+              now: Optional[float] = None) -> dict:
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        if d_from > d_to:
+            raise ValueError("from must not be after to")
+        now = now or datetime.datetime.now(self.tz).timestamp()
+        today = datetime.datetime.fromtimestamp(now, self.tz).date()
+        with self._query_lock:
+            self._load()
+            # Days not aggregated yet are computed live, like today, until update() stores them
+            first = self.events.first_timestamp()
+            live_days = set()
+            if first is not None:
+                day = max(d_from, datetime.datetime.fromtimestamp(first, self.tz).date())
+                while day <= d_to and day < today:
+                    if day.isoformat() not in self._days:
+                        live_days.add(day)
+                    day += datetime.timedelta(days=1)
+            # Live results change with the clock and the inputs; stored ones only with the file
+            live = (int(now // 60), self.inputs()) if live_days or d_from <= today <= d_to else None
+            key = (d_from, d_to, granularity, self._version, today, live)
+            result = self._results.get(key)
+            if result is None:
+                result = self._query(d_from, d_to, granularity, today, now, live_days)
+                self._results[key] = result
+            return result
+
+    def _query(self, d_from, d_to, granularity, today, now, live_days=()) -> dict:
+        buckets: Dict[datetime.date, List[dict]] = {}
+        day = d_from
+        while day <= min(d_to, today):
+            if day == today or day in live_days:
+                agg = self.aggregate_day(day, now)
+            else:
+                agg = self._days.get(day.isoformat())
+            if agg:
+                buckets.setdefault(bucket_start(day, granularity), []).append(agg)
+            day += datetime.timedelta(days=1)
+        periods = [dict(self._summarize(aggs), period=start.isoformat()) for start, aggs in sorted(buckets.items())]
+        return {
+            "from": d_from.isoformat(), "to": d_to.isoformat(), "granularity": granularity,
+            "total": self._summarize([agg for aggs in buckets.values() for agg in aggs]),
+            "periods": periods,
+        }
+
+    @staticmethod
+    def _summarize(aggs: List[dict]) -> dict:
+        hours = lambda sec: round(sec / 3600, 2)
+        outages = sorted(d for agg in aggs for d in agg.get("outages", []))
+        planned = [agg for agg in aggs if agg.get("plan_up") is not None]
+        plan_up = sum(agg["plan_up"] for agg in planned)
+        fact_up = sum(agg["up"] for agg in planned)
+        p50, p95 = percentile(outages, 50), percentile(outages, 95)
+        return {
+            "days": len(aggs),
+            "up_hours": hours(sum(agg["up"] for agg in aggs)),
+            "down_hours": hours(sum(agg["down"] for agg in aggs)),
+            "unknown_hours": hours(sum(agg["unknown"] for agg in aggs)),
+            "plan_up_hours": hours(plan_up) if planned else None,
+            "compliance_pct": round(fact_up / plan_up * 100, 1) if plan_up else None,
+            "outages": len(outages),
+            "outage_p50_min": round(p50 / 60) if p50 is not None else None,
+            "outage_p95_min": round(p95 / 60) if p95 is not None else None,
+            "alert_hours": hours(sum(agg.get("alert", 0) for agg in aggs)),
+            "alert_overlap_hours": hours(sum(agg.get("alert_overlap", 0) for agg in aggs)),
+        }
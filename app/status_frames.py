@@ -0,0 +1,139 @@
+import struct
+import asyncio
+import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from prometheus_client import Counter, Gauge
+
+WS_CONNECTIONS = Gauge('flash_ws_status_connections', 'Active /ws/status connections')
+WS_FRAMES = Counter('flash_ws_status_frames_total', 'Binary status frames sent', ['topic'])
+
+# Frame layout, little-endian; every frame starts with <u8 FRAME_VERSION><u8 type>.
+#   POWER     <u8 status><u8 flags><u32 since>          status: 0 unknown, 1 on, 2 off
+#                                                       flags: bit0 pending admin confirmation
+#   ALERT     <u8 status><u8 flags><u32 since>          status: 0 unknown, 1 clear, 2 region, 3 city
+#                                                       flags: bit0 stale, bit1 last fetch failed
+#   SCHEDULE  <u8 days> then per day <u32 yyyymmdd><6B light mask><6B known mask>
+#             bit i of a mask is the half-hour slot starting at i*30 min (Kyiv time).
+# Timestamps are unix seconds, 0 when unknown. Frames carry no clock of their own, so an
+# unchanged state is never resent; displays keep time via NTP.
+FRAME_VERSION = 1
+POWER, ALERT, SCHEDULE = 1, 2, 3
+TOPICS = {"power": POWER, "alerts": ALERT, "schedule": SCHEDULE}
+TOPIC_NAMES = {t: name for name, t in TOPICS.items()}
+
+POWER_STATUS = {"on": 1, "off": 2}
+ALERT_STATUS = {"clear": 1, "region": 2, "active": 3}
+_HEADER = struct.Struct("<BB")
+_STATE = struct.Struct("<BBBBI")
+_DAY = struct.Struct("<I6s6s")
+# A display that takes longer to accept a frame is dropped
+SEND_TIMEOUT = 5.0
+
+
+def parse_topics(spec: Optional[str]) -> Set[int]:
+    """"power,alerts" -> frame types; empty or unknown names mean everything."""
+    names = [n.strip().lower() for n in (spec or "").split(",") if n.strip()]
+    types = {TOPICS[n] for n in names if n in TOPICS}
+    return types or set(TOPICS.values())
+
+
+def slots_to_masks(slots: Iterable) -> Tuple[int, int]:
+    """48 slots (True light, False outage, None unknown) -> (light mask, known mask)."""
+    light = known = 0
+    for i, slot in enumerate(list(slots)[:48]):
+        if slot is not None:
+            known |= 1 << i
+            if slot:
+                light |= 1 << i
+    return light, known
+
+
+def encode_power(light: Optional[str], since: float = 0, pending: bool = False) -> bytes:
+    return _STATE.pack(FRAME_VERSION, POWER, POWER_STATUS.get(light, 0), int(bool(pending)), int(since or 0))
+
+
+def encode_alert(status: Optional[str], since: float = 0, stale: bool = False, error: bool = False) -> bytes:
+    flags = (1 if stale else 0) | (2 if error else 0)
+    return _STATE.pack(FRAME_VERSION, ALERT, ALERT_STATUS.get(status, 0), flags, int(since or 0))
+
+
+def encode_schedule(days: List[Tuple[datetime.date, list]]) -> bytes:
+    parts = [_HEADER.pack(FRAME_VERSION, SCHEDULE), bytes([len(days)])]
+    for date, slots in days:
+        light, known = slots_to_masks(slots)
+        parts.append(_DAY.pack(date.year * 10000 + date.month * 100 + date.day,
+                               light.to_bytes(6, "little"), known.to_bytes(6, "little")))
+    return b"".join(parts)
+
+
+class FrameHub:
+    """
+    Per-worker fan-out of binary status frames to /ws/status clients.
+
+    `refresh()` asks `source` for the current frames ({type: bytes}) and sends only the
+    frames whose bytes changed, each encoded once and shared by every subscriber of its
+    topic. Clients are sent to concurrently; one that cannot keep up is dropped, it
+    reconnects and gets fresh frames. `request_refresh()` does the same in a background
+    task, so callers holding other locks never wait on a display.
+    """
+
+    def __init__(self, source: Callable[[], Awaitable[Dict[int, bytes]]]):
+        self.source = source
+        self.frames: Dict[int, bytes] = {}
+        self.clients: Dict[object, Set[int]] = {}
+        self._lock = asyncio.Lock()
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    def request_refresh(self):
+        """Schedules a refresh; requests made while one runs are folded into one more."""
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_requested())
+
+    async def _refresh_requested(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Status frame refresh failed: {e}")
+
+    async def refresh(self) -> List[int]:
+        async with self._lock:
+            frames = await self.source()
+            changed = [t for t, frame in frames.items() if self.frames.get(t) != frame]
+            self.frames = frames
+        for frame_type in changed:
+            await self.send(frame_type, frames[frame_type])
+        return changed
+
+    async def _send_one(self, ws, frame_type: int, frame: bytes):
+        try:
+            await asyncio.wait_for(ws.send_bytes(frame), timeout=SEND_TIMEOUT)
+            WS_FRAMES.labels(topic=TOPIC_NAMES[frame_type]).inc()
+        except Exception:
+            self.disconnect(ws)
+
+    async def send(self, frame_type: int, frame: bytes):
+        await asyncio.gather(*(self._send_one(ws, frame_type, frame)
+                               for ws, topics in list(self.clients.items()) if frame_type in topics))
+
+    async def connect(self, ws, topics: Set[int]):
+        # Without clients, refreshes are skipped, so frames may be out of date
+        await self.refresh()
+        self.clients[ws] = topics
+        WS_CONNECTIONS.set(len(self.clients))
+        await self.subscribe(ws, topics)
+
+    async def subscribe(self, ws, topics: Set[int]):
+        """Changes the topics of `ws` and sends it the current frame of each."""
+        self.clients[ws] = topics
+        for frame_type in sorted(topics):
+            if frame_type in self.frames and ws in self.clients:
+                await self._send_one(ws, frame_type, self.frames[frame_type])
+
+    def disconnect(self, ws):
+        if self.clients.pop(ws, None) is not None:
+            WS_CONNECTIONS.set(len(self.clients))
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import fcntl
+import asyncio
+import hashlib
+import secrets
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from fastapi import Response
+from prometheus_client import Counter, Gauge
+
+from app.storage import StorageUtils, file_version
+from app.compression import compress_variants, encoded_response, pick
+
+STATUS_BUILDS = Counter('flash_status_snapshot_builds_total', 'Times the /api/status snapshot was rebuilt')
+STATUS_RESPONSES = Counter('flash_status_responses_total', '/api/status responses by outcome', ['result'])
+STATUS_LEADER = Gauge('flash_status_snapshot_leader', '1 in the worker that builds the shared status snapshot', ['worker'])
+STREAM_RESUMES = Counter('flash_status_stream_resumes_total', 'SSE connects by how the client was brought up to date', ['result'])
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Also matches the per-encoding tags (`"<hash>-gzip"`) handed out for compressed variants."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    base = etag.strip('"')
+    for tag in tags:
+        tag = tag[2:] if tag.startswith("W/") else tag
+        tag = tag.strip('"')
+        if tag == base or tag.rsplit("-", 1)[0] == base:
+            return True
+    return False
+
+
+def _pointer(path: str, key) -> str:
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+
+def json_diff(old, new, path: str = "") -> list:
+    """RFC 6902 style ops turning `old` into `new`; dicts are diffed per key, anything else replaced whole."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _pointer(path, key)})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _pointer(path, key), "value": value})
+            elif old[key] != value:
+                ops.extend(json_diff(old[key], value, _pointer(path, key)))
+        return ops
+    if old == new:
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+class StatusSnapshot:
+    """
+    Pre-serialised /api/status payload with a strong ETag.
+
+    `refresh()` rebuilds it only when the `inputs()` fingerprint (file versions of state,
+    events, schedules, config, alerts) changed or a new `tick`-second period started, so
+    time-relative text stays current. `run()` keeps it fresh in the background; requests
+    then only copy bytes or answer 304. Compressed variants of the body are produced once
+    per change too, and picked by Accept-Encoding.
+
+    Every payload change bumps `version` and serialises, once, the JSON-Patch from the
+    previous version (`patch_json`) for the SSE stream, then awaits `on_change`. The last
+    `history` patches are kept so a reconnecting client can be replayed what it missed.
+    Versions are only meaningful within one `epoch`, which goes into the event IDs.
+
+    With `shared_path`, web workers share one snapshot: whoever holds the flock on
+    `<shared_path>.lock` builds and writes the document with its latest patch there; the
+    other workers only adopt it when the file changes, so a state change is computed once
+    however many workers serve clients. A follower takes over when the leader exits.
+    """
+
+    def __init__(self, build: Callable[[], Awaitable[dict]], inputs: Callable[[], tuple], tick: int = 60,
+                 history: int = 256, shared_path: Optional[str] = None):
+        self.build = build
+        self.inputs = inputs
+        self.tick = tick
+        self.data: Optional[dict] = None
+        self.body = b""
+        self.variants: dict = {}
+        self.etag = ""
+        self.running = False
+        self.version = 0
+        self.patch_json = ""
+        self.on_change: Optional[Callable[["StatusSnapshot"], Awaitable[None]]] = None
+        self.epoch = secrets.token_hex(4)
+        self._recent: deque = deque(maxlen=history)
+        self._snapshot_json: Tuple[int, str] = (-1, "")
+        self.built_at = 0.0
+        self.shared_path = shared_path
+        self._shared_version = None
+        self._leader_file = None
+        self._key = None
+        self._lock = asyncio.Lock()
+        self._changed = asyncio.Event()
+
+    def _fingerprint(self):
+        return (self.inputs(), int(time.time() // self.tick))
+
+    @property
+    def leader(self) -> bool:
+        return self._leader_file is not None
+
+    def _lead(self) -> bool:
+        """Takes the leader flock if it is free; held until the process exits."""
+        if self._leader_file is not None:
+            return True
+        lock_path = self.shared_path + ".lock"
+        os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+        f = open(lock_path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._leader_file = f
+        STATUS_LEADER.labels(worker=str(os.getpid())).set(1)
+        print(f"Status snapshot: worker {os.getpid()} now builds the shared snapshot")
+        return True
+
+    def _publish(self, patch: str):
+        StorageUtils.save_json_sync(self.shared_path, {
+            "epoch": self.epoch, "version": self.version, "etag": self.etag,
+            "built_at": self.built_at, "patch": patch, "data": self.data,
+        })
+        self._shared_version = file_version(self.shared_path)
+
+    async def _follow(self) -> bool:
+        """Adopts the leader's document when the shared file changed."""
+        version = file_version(self.shared_path)
+        if version == self._shared_version:
+            return False
+        async with self._lock:
+            if version == self._shared_version:
+                return False
+            doc = StorageUtils.load_json_sync(self.shared_path, default={})
+            self._shared_version = version
+            if not isinstance(doc, dict) or "data" not in doc or doc.get("etag") == self.etag:
+                return False
+            # A missed version or a new leader epoch: the patch does not apply to what clients hold
+            patch = doc.get("patch") or ""
+            if patch and doc.get("epoch") == self.epoch and doc.get("version") == self.version + 1:
+                self._recent.append((doc["version"], patch))
+            else:
+                patch = ""
+                self._recent.clear()
+            previous = self.data
+            self.epoch, self.version, self.etag = doc["epoch"], doc["version"], doc["etag"]
+            self.data, self.patch_json, self.built_at = doc["data"], patch, doc.get("built_at", time.time())
+            self.body = json.dumps(self.data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self.variants = compress_variants(self.body)
+            self._notify()
+            if previous is not None and self.on_change is not None:
+                await self.on_change(self)
+        return True
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Rebuilds when inputs changed; returns True when the payload itself changed."""
+        if self.shared_path and not self._lead() and file_version(self.shared_path):
+            return await self._follow()
+        key = self._fingerprint()
+        if not force and self.body and key == self._key:
+            return False
+        async with self._lock:
+            if not force and self.body and key == self._key:
+                return False
+            data = await self.build()
+            body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+            changed = etag != self.etag
+            STATUS_BUILDS.inc()
+            if not changed:
+                self._key = key
+                return False
+            previous = self.data
+            self.patch_json = ""
+            if previous is not None:
+                ops = json_diff(previous, data)
+                self.patch_json = json.dumps({"type": "patch", "version": self.version + 1, "base": self.version,
+                                              "ops": ops}, ensure_ascii=False, separators=(",", ":"))
+                self._recent.append((self.version + 1, self.patch_json))
+            self.version += 1
+            self.data, self.body, self.etag, self._key = data, body, etag, key
+            self.variants = compress_variants(body)
+            self._notify()
+            self.built_at = time.time()
+            if self.shared_path and self.leader:
+                self._publish(self.patch_json)
+            # Still under the lock, so listeners see patches strictly in version order
+            if previous is not None and self.on_change is not None:
+                await self.on_change(self)
+        return True
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """Blocks until the next payload change (True) or `timeout` (False)."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot_json(self) -> str:
+        """Full document for a new (or resyncing) stream client, serialised once per version."""
+        if self._snapshot_json[0] != self.version:
+            self._snapshot_json = (self.version, json.dumps(
+                {"type": "snapshot", "version": self.version, "data": self.data},
+                ensure_ascii=False, separators=(",", ":")))
+        return self._snapshot_json[1]
+
+    def event_id(self, version: Optional[int] = None) -> str:
+        return f"{self.epoch}.{self.version if version is None else version}"
+
+    def replay_since(self, last_event_id: Optional[str]) -> Optional[List[Tuple[int, str]]]:
+        """
+        Patches after `last_event_id` as (version, patch_json), or None when the client has to
+        start from a snapshot: no or foreign ID (another worker or a restart), or a gap older
+        than the buffer.
+        """
+        epoch, _, version = (last_event_id or "").partition(".")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        if version == self.version:
+            return []
+        if version > self.version or not self._recent or self._recent[0][0] > version + 1:
+            return None
+        return [(v, patch) for v, patch in self._recent if v > version]
+
+    async def run(self, interval: float = 1.0):
+        self.running = True
+        try:
+            while True:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    print(f"Status snapshot refresh error: {e}")
+                await asyncio.sleep(interval)
+        finally:
+            self.running = False
+
+    async def current(self) -> dict:
+        if not self.running or not self.body:
+            await self.refresh()
+        return self.data
+
+    async def response(self, if_none_match: Optional[str], accept_encoding: Optional[str] = None) -> Response:
+        if not self.running or not self.body:
+            await self.refresh()
+        encoding = pick(self.variants, accept_encoding)
+        # A strong ETag must differ between encodings of the same document
+        etag = f'{self.etag[:-1]}-{encoding}"' if encoding else self.etag
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(if_none_match, self.etag):
+            STATUS_RESPONSES.labels(result="not_modified").inc()
+            return Response(status_code=304, headers=headers)
+        STATUS_RESPONSES.labels(result="full").inc()
+        return encoded_response(self.body, self.variants, accept_encoding, "application/json", headers)
+
+
+class SnapshotView:
+    """
+    Small projection of a StatusSnapshot (e.g. /api/status/lite), serialised once per
+    snapshot version. `response(wait=...)` long-polls: when the client already holds the
+    current ETag it blocks until the projection changes or `wait` seconds pass.
+    """
+
+    def __init__(self, snapshot: StatusSnapshot, project: Callable[[dict], dict]):
+        self.snapshot = snapshot
+        self.project = project
+        self.body = b""
+        self.etag = ""
+        self._version = None
+
+    def _update(self):
+        if self._version == self.snapshot.version and self.body:
+            return
+        body = json.dumps(self.project(self.snapshot.data or {}), ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+        self._version = self.snapshot.version
+        if body != self.body:
+            self.body, self.etag = body, '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+
+    async def response(self, if_none_match: Optional[str], wait: float = 0) -> Response:
+        if not self.snapshot.running or not self.snapshot.body:
+            await self.snapshot.refresh()
+        self._update()
+        deadline = time.monotonic() + wait
+        # Most snapshot changes (AQ, text) leave the projection untouched: keep waiting
+        while etag_matches(if_none_match, self.etag) and time.monotonic() < deadline:
+            await self.snapshot.wait_changed(deadline - time.monotonic())
+            self._update()
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, self.etag):
+            STATUS_RESPONSES.labels(result="lite_not_modified").inc()
+            return Response(status_code=304, headers=headers)
+        STATUS_RESPONSES.labels(result="lite").inc()
+        return Response(content=self.body, media_type="application/json", headers=headers)
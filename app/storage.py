@@ -5,6 +5,16 @@ import aiofiles
 import fcntl
 from typing import Dict, Any
 
+def file_version(path: str, missing=None):
+    """(mtime_ns, size) of `path`, to notice rewrites; `missing` when it does not exist, None on other errors."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return missing
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 class StorageUtils:
     """Helper methods for safe file operations."""
     
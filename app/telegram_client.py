@@ -1,17 +1,32 @@
+import os
 import json
 import requests
 
+from app.circuit_breaker import breakers
+
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+
 class TelegramClient:
     def __init__(self, token, chat_id):
         self._real_token = token
         self.token = "***REDACTED***"
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{self.token}"
+        self.base_url = f"{TELEGRAM_API_BASE}/bot{self.token}"
 
     def _make_request(self, endpoint, payload, files=None, timeout=30):
-        url = f"https://api.telegram.org/bot{self._real_token}/{endpoint}"
+        url = f"{TELEGRAM_API_BASE}/bot{self._real_token}/{endpoint}"
+        cb = breakers.get("telegram")
+        if not cb.can_execute():
+            return False, f"telegram circuit breaker is {cb.state.lower()}"
         try:
-            r = requests.post(url, data=payload, json=payload if not files else None, files=files, timeout=timeout)
+            try:
+                r = requests.post(url, data=payload, json=payload if not files else None, files=files, timeout=timeout)
+            except Exception:
+                cb.record_failure()
+                raise
+            # 4xx are request problems (bad chat id, message not modified), not an outage
+            if r.status_code == 429 or r.status_code >= 500: cb.record_failure()
+            else: cb.record_success()
             if r.status_code == 200:
                 res = r.json()
                 result_data = res.get("result", {})
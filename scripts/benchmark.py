@@ -0,0 +1,178 @@
+"""
+Офлайн-бенчмарк синхронізації графіків проти scripts/replay_server.py.
+
+    python -m scripts.benchmark --rounds 5 --history 0,365,1825 > bench.json
+
+Вимірює повну синхронізацію (холодну та 304), розбір GitHub/YASNO, пікові алокації
+(tracemalloc), вартість злиття історії залежно від її розміру, запит тривог і якості повітря.
+Результат — JSON у stdout, щоб порівнювати релізи між собою.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import datetime
+import platform
+import statistics
+import shutil
+import tempfile
+import tracemalloc
+
+from scripts.replay_server import ReplayServer
+
+
+def _stats(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0] * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def _timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _stats(samples)
+
+
+def _peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def _write_config(data_dir):
+    cfg = {
+        "settings": {"groups": ["GPV1.1"], "region": "kyiv"},
+        "sources": {
+            "github": {"enabled": True},
+            "yasno": {"enabled": True, "region_id": "25", "dso_id": "902"},
+            "air_quality": {"lat": "50.45", "lon": "30.52"},
+        },
+    }
+    path = os.path.join(data_dir, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f)
+    return path, cfg
+
+
+def _seed_history(path, days):
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    start = datetime.date.today() - datetime.timedelta(days=days)
+    slots = [i % 6 != 0 for i in range(48)]
+    for i in range(days):
+        with open(os.path.join(path, f"{start + datetime.timedelta(days=i)}.json"), "w", encoding="utf-8") as f:
+            json.dump({"slots": slots}, f)
+
+
+def run(rounds, history_sizes, scenario=None):
+    server = ReplayServer(scenario=scenario).start()
+    data_dir = tempfile.mkdtemp(prefix="flash-bench-")
+    # Module-level URLs and DATA_DIR are read on import
+    os.environ.update(server.env())
+    os.environ["DATA_DIR"] = data_dir
+
+    from app import parser_service
+    from app.light_service import get_air_raid_alert
+    from app import main as web
+
+    config_path, cfg = _write_config(data_dir)
+    output_path = os.path.join(data_dir, "last_schedules.json")
+    history_path = os.path.join(data_dir, "schedule_history")
+    validators_path = os.path.join(data_dir, "http_validators.json")
+
+    def reset_cache():
+        for path in (output_path, validators_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def cold_sync():
+        reset_cache()
+        asyncio.run(parser_service.update_local_schedules(config_path, output_path))
+
+    def warm_sync():
+        asyncio.run(parser_service.update_local_schedules(config_path, output_path))
+
+    gh_doc = server.body("github")[0]
+    ys_doc = server.body("yasno")[0]
+    github = json.loads(gh_doc)
+    yasno = json.loads(ys_doc)
+
+    results = {
+        "python": platform.python_version(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "rounds": rounds,
+        "payload_bytes": {"github": len(gh_doc), "yasno": len(ys_doc)},
+    }
+
+    results["sync"] = {"cold": _timed(cold_sync, rounds)}
+    cold_sync()
+    results["sync"]["not_modified"] = _timed(warm_sync, rounds)
+    results["sync"]["cold_peak_kib"] = _peak_kib(cold_sync)
+
+    results["parse"] = {
+        "extract_github": _timed(lambda: parser_service.extract_github(github, cfg), rounds),
+        "extract_yasno": _timed(lambda: parser_service.extract_yasno(yasno, cfg), rounds),
+        "json_loads_github": _timed(lambda: json.loads(gh_doc), rounds),
+        "extract_github_peak_kib": _peak_kib(lambda: parser_service.extract_github(github, cfg)),
+    }
+
+    results["history_merge"] = {}
+    for days in history_sizes:
+        _seed_history(history_path, days)
+        results["history_merge"][str(days)] = _timed(cold_sync, rounds)
+
+    results["alerts"] = _timed(get_air_raid_alert, rounds)
+
+    def air_quality():
+        web.CACHE.clear()
+        asyncio.run(web.get_air_quality())
+    results["air_quality"] = _timed(air_quality, rounds)
+    results["requests"] = dict(server.requests)
+
+    server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark schedule sync against the offline replay server")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--history", default="0,90,365,1825", help="comma separated history sizes in days")
+    parser.add_argument("--scenario", help="replay server scenario JSON")
+    parser.add_argument("--output", help="write results here instead of stdout")
+    args = parser.parse_args()
+
+    scenario = None
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as f:
+            scenario = json.load(f)
+
+    sizes = [int(x) for x in args.history.split(",") if x.strip()]
+    # Sync functions print progress; keep stdout clean for the JSON report
+    real_stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        results = run(args.rounds, sizes, scenario)
+    finally:
+        sys.stdout = real_stdout
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
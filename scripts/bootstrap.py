@@ -12,7 +12,7 @@ DATA_DIR = os.environ.get("DATA_DIR", os.path.join(APP_DIR, "data"))
 def perform_cold_start_if_needed():
     event_file = os.path.join(DATA_DIR, "event_log.json")
     sched_file = os.path.join(DATA_DIR, "last_schedules.json")
-    history_file = os.path.join(DATA_DIR, "schedule_history.json")
+    history_dir = os.path.join(DATA_DIR, "schedule_history")
     config_file = os.path.join(DATA_DIR, "config.json")
 
     # Якщо дані вже є, це не перший старт
@@ -70,10 +70,9 @@ def perform_cold_start_if_needed():
         print("✅ event_log.json ініціалізовано.")
 
     # 3. Створюємо порожню історію графіків
-    if not os.path.exists(history_file):
-        with open(history_file, "w") as f:
-            json.dump({}, f)
-        print("✅ schedule_history.json ініціалізовано.")
+    if not os.path.exists(history_dir):
+        os.makedirs(history_dir, mode=0o700, exist_ok=True)
+        print("✅ schedule_history/ ініціалізовано.")
 
     # 4. Примусово завантажуємо планові графіки на зараз
     if not os.path.exists(sched_file):
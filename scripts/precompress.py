@@ -0,0 +1,23 @@
+"""
+Готує .br/.gz копії статичних файлів, щоб сервер віддавав їх без стиснення на кожен запит.
+
+    python -m scripts.precompress static data/static
+"""
+import sys
+import argparse
+
+from app.compression import precompress_tree, brotli
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write .br/.gz sidecars for compressible static files")
+    parser.add_argument("dirs", nargs="+")
+    args = parser.parse_args()
+    for root in args.dirs:
+        count = precompress_tree(root)
+        print(f"{root}: {count} files precompressed" + ("" if brotli else " (gzip only, brotli not installed)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Локальний замінник зовнішніх API (GitHub, YASNO, ubilling, Open-Meteo, Telegram).
+
+Віддає записані відповіді з scripts/fixtures/ і вміє імітувати затримки, 304, 429 та 5xx,
+щоб ганяти парсер і бенчмарки без інтернету.
+
+    python -m scripts.replay_server --port 8765 --scenario scenario.json
+
+Сценарій — JSON виду {"github": {"delay": 0.3, "statuses": [200, 304, 500]}, ...}:
+статуси віддаються по черзі (останній повторюється), без сценарію маршрут відповідає 200
+і 304 на If-None-Match з актуальним ETag.
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+KYIV_TZ = ZoneInfo("Europe/Kyiv")
+
+
+def _day_start(offset=0):
+    today = datetime.datetime.now(KYIV_TZ).date() + datetime.timedelta(days=offset)
+    return datetime.datetime.combine(today, datetime.time.min, tzinfo=KYIV_TZ)
+
+
+def rebase_github(doc):
+    """Переносить fact.data на сьогодні/завтра, щоб графіки були актуальні."""
+    fact = doc.get("fact", {})
+    data = fact.get("data", {})
+    fact["data"] = {str(int(_day_start(i).timestamp())): data[ts] for i, ts in enumerate(sorted(data, key=int))}
+    fact["today"] = int(_day_start().timestamp())
+    return doc
+
+
+def rebase_yasno(doc):
+    for group_data in doc.values():
+        for i, day in enumerate(("today", "tomorrow")):
+            if isinstance(group_data, dict) and isinstance(group_data.get(day), dict):
+                group_data[day]["date"] = _day_start(i).isoformat()
+    return doc
+
+
+# name -> (method, path regex, fixture, rebase)
+ROUTES = {
+    "github": ("GET", r"^/github/[\w-]+\.json$", "github_kyiv.json", rebase_github),
+    "yasno": ("GET", r"^/yasno/regions/\d+/dsos/\d+/planned-outages$", "yasno_planned_outages.json", rebase_yasno),
+    "alerts": ("GET", r"^/ubilling/aerialalerts/?$", "ubilling_alerts.json", None),
+    "air_quality": ("GET", r"^/open-meteo-aq/v1/air-quality$", "openmeteo_air_quality.json", None),
+    "forecast": ("GET", r"^/open-meteo/v1/forecast$", "openmeteo_forecast.json", None),
+    "telegram": ("POST", r"^/telegram/bot[^/]+/\w+$", None, None),
+}
+
+
+class ReplayServer:
+    def __init__(self, host="127.0.0.1", port=0, fixtures_dir=FIXTURES_DIR, scenario=None):
+        self.fixtures_dir = fixtures_dir
+        self.scenario = scenario or {}
+        self.requests = {name: 0 for name in ROUTES}
+        self._lock = threading.Lock()
+        self._message_id = 1000
+        self._bodies = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Змінні середовища, що перенаправляють застосунок на цей сервер."""
+        base = self.base_url
+        return {
+            "GITHUB_URL": f"{base}/github/{{region}}.json",
+            "YASNO_URL": f"{base}/yasno/regions/{{region_id}}/dsos/{{dso_id}}/planned-outages",
+            "ALERTS_API_URL": f"{base}/ubilling/aerialalerts/",
+            "OPEN_METEO_AQ_BASE": f"{base}/open-meteo-aq",
+            "OPEN_METEO_BASE": f"{base}/open-meteo",
+            "TELEGRAM_API_BASE": f"{base}/telegram",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def body(self, name):
+        """Тіло відповіді та ETag; дати перебазовуються раз на добу."""
+        _, _, fixture, rebase = ROUTES[name]
+        key = (name, _day_start().date())
+        if key not in self._bodies:
+            with open(os.path.join(self.fixtures_dir, fixture), "r", encoding="utf-8") as f:
+                doc = json.load(f)
+            raw = json.dumps(rebase(doc) if rebase else doc, ensure_ascii=False).encode("utf-8")
+            self._bodies[key] = (raw, '"%s"' % hashlib.sha1(raw).hexdigest()[:16])
+        return self._bodies[key]
+
+    def next_status(self, name):
+        rule = self.scenario.get(name, {})
+        statuses = rule.get("statuses")
+        with self._lock:
+            n = self.requests[name]
+            self.requests[name] += 1
+        if not statuses:
+            return None
+        return statuses[min(n, len(statuses) - 1)] if not rule.get("cycle") else statuses[n % len(statuses)]
+
+    def telegram_result(self):
+        with self._lock:
+            self._message_id += 1
+            return {"ok": True, "result": {"message_id": self._message_id}}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def _route(self, method):
+                path = self.path.split("?", 1)[0]
+                for name, (r_method, pattern, _, _) in ROUTES.items():
+                    if r_method == method and re.match(pattern, path):
+                        return name
+                return None
+
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def _handle(self, method):
+                name = self._route(method)
+                if name is None:
+                    self._send(404, b'{"error": "no such route"}', {"Content-Type": "application/json"})
+                    return
+                if method == "POST":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    if length: self.rfile.read(length)
+
+                delay = server.scenario.get(name, {}).get("delay", 0)
+                if delay: time.sleep(delay)
+
+                status = server.next_status(name)
+                if status is not None and status >= 400:
+                    headers = {"Content-Type": "application/json"}
+                    if status == 429: headers["Retry-After"] = "30"
+                    self._send(status, json.dumps({"error": status}).encode(), headers)
+                    return
+
+                if name == "telegram":
+                    self._send(200, json.dumps(server.telegram_result()).encode(), {"Content-Type": "application/json"})
+                    return
+
+                body, etag = server.body(name)
+                if status == 304 or (status is None and self.headers.get("If-None-Match") == etag):
+                    self._send(304, headers={"ETag": etag})
+                    return
+                self._send(200, body, {"Content-Type": "application/json", "ETag": etag})
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded upstream responses locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", help="JSON file with per-route delay/statuses")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    scenario = {}
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as f:
+            scenario = json.load(f)
+
+    server = ReplayServer(args.host, args.port, args.fixtures, scenario)
+    print(f"Replay server on {server.base_url}. Point the app at it with:")
+    for k, v in server.env().items():
+        print(f"  export {k}='{v}'")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
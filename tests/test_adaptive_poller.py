@@ -0,0 +1,40 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+from app.adaptive_poller import AdaptivePoller, BASE_INTERVAL
+
+TZ = ZoneInfo("Europe/Kyiv")
+
+
+def _ts(day, hour, minute=0):
+    return datetime.datetime(2026, 3, day, hour, minute, tzinfo=TZ).timestamp()
+
+
+def test_backs_off_after_unchanged_polls(tmp_path):
+    poller = AdaptivePoller(str(tmp_path / "poller.json"), TZ, 120, 1800)
+    intervals = [poller.record([], _ts(10, 12, i)) for i in range(7)]
+    assert intervals[0] == BASE_INTERVAL
+    assert intervals[3] == BASE_INTERVAL * 2
+    assert intervals[6] == 1800
+
+
+def test_learned_window_and_emergency_use_min_interval(tmp_path):
+    poller = AdaptivePoller(str(tmp_path / "poller.json"), TZ, 120, 1800)
+    poller.record(["yasno"], _ts(8, 20, 10))
+    poller.record(["github"], _ts(9, 20, 40))
+
+    assert poller.interval(_ts(10, 20, 30)) == 120
+    assert poller.interval(_ts(10, 14, 0)) == BASE_INTERVAL
+    assert poller.interval(_ts(10, 14, 0), emergency=True) == 120
+
+
+def test_night_uses_max_and_state_persists(tmp_path):
+    path = str(tmp_path / "poller.json")
+    poller = AdaptivePoller(path, TZ, 120, 1800)
+    assert poller.record([], _ts(10, 3)) == 1800
+
+    reloaded = AdaptivePoller(path, TZ, 120, 1800)
+    assert not reloaded.due(_ts(10, 3, 10))
+    # An emergency shortens the wait without waiting for the long night interval
+    assert reloaded.due(_ts(10, 3, 10), emergency=True)
+    assert reloaded.due(_ts(10, 3, 31))
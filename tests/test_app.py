@@ -41,14 +41,105 @@ def test_api_status_endpoint(mock_api_status):
     response = client.get("/api/status")
     assert response.status_code == 200
 
+def test_api_status_conditional_get():
+    first = client.get("/api/status")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    again = client.get("/api/status", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+def test_heartbeat_does_not_change_status_inputs(tmp_path, monkeypatch):
+    import json
+    state_file = tmp_path / "power_monitor_state.json"
+    monkeypatch.setattr(app.main, "STATE_FILE", str(state_file))
+    state_file.write_text(json.dumps({"status": "up", "came_up_at": 100, "last_seen": 1}))
+    before = app.main.status_inputs()
+    state_file.write_text(json.dumps({"status": "up", "came_up_at": 100, "last_seen": 2, "extra": True}))
+    assert app.main.status_inputs() == before
+    state_file.write_text(json.dumps({"status": "down", "went_down_at": 200, "last_seen": 3}))
+    assert app.main.status_inputs() != before
+    assert app.main.get_radiation() == app.main.get_radiation()
+
+def test_api_status_precompressed():
+    plain = client.get("/api/status", headers={"Accept-Encoding": "identity"})
+    packed = client.get("/api/status", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert packed.headers["content-encoding"] == "gzip"
+    assert packed.headers["etag"] != plain.headers["etag"]
+    assert packed.json() == plain.json()
+    again = client.get("/api/status", headers={"Accept-Encoding": "gzip", "If-None-Match": packed.headers["etag"]})
+    assert again.status_code == 304
+
+def test_api_status_lite():
+    response = client.get("/api/status/lite")
+    assert response.status_code == 200
+    assert set(response.json()) == {"light", "since", "next", "alert"}
+    assert len(response.content) < 100
+    again = client.get("/api/status/lite?wait=0.1", headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+
+def test_api_events_pagination():
+    first = client.get("/api/events?limit=1")
+    assert first.status_code == 200
+    assert set(first.json()) == {"events", "next_cursor"}
+    assert client.get("/api/events?cursor=bogus").status_code == 400
+
+def test_schedule_history_document_for_replicas(tmp_path, monkeypatch):
+    from app.schedule_history import HistoryStore
+    store = HistoryStore(str(tmp_path / "history"))
+    store.merge({"2026-03-09": [False, True]})
+    monkeypatch.setattr(app.main, "history_store", store)
+    response = client.get("/schedule_history.json")
+    assert response.json() == {"2026-03-09": {"slots": [False, True]}}
+    again = client.get("/schedule_history.json", headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+
+def test_api_stats_validates_range():
+    response = client.get("/api/stats?from=2026-01-01&to=2026-01-31&granularity=week")
+    assert response.status_code == 200
+    assert response.json()["granularity"] == "week"
+    assert client.get("/api/stats?granularity=year").status_code == 400
+    assert client.get("/api/stats?from=2026-02-01&to=2026-01-01").status_code == 400
+
+def test_ws_status_binary_frames():
+    with client.websocket_connect("/ws/status?topics=power") as ws:
+        frame = ws.receive_bytes()
+        assert len(frame) == 8 and frame[:2] == bytes([1, 1])
+        ws.send_text("schedule")
+        assert ws.receive_bytes()[:2] == bytes([1, 3])
+
 @patch('app.main.get_power_events_data')
 def test_root_endpoint(mock_events):
     mock_events.return_value = [{"event": "up", "timestamp": 12345}]
     response = client.get("/")
     assert response.status_code == 200
     assert "text/html" in response.headers["content-type"]
+    cached = client.get("/", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
 
 def test_metrics_endpoint():
     response = client.get("/metrics")
     assert response.status_code == 200
     assert "flash_active_sse_connections" in response.text
+
+@patch('app.main.get_configured_groups', return_value=["GPV36.1"])
+@patch('app.main.get_group_timelines')
+def test_schedule_groups_endpoint(mock_timelines, mock_groups):
+    from app.schedule_timeline import build_group_timelines
+    from app.light_service import KYIV_TZ
+    from datetime import datetime
+    today = datetime.now(KYIV_TZ).strftime("%Y-%m-%d")
+    data = {"yasno": {
+        "GPV36.1": {today: {"slots": [False] * 4 + [True] * 44, "status": "normal"}},
+        "GPV1.1": {today: {"slots": [True] * 48, "status": "normal"}},
+    }}
+    mock_timelines.return_value = build_group_timelines(data, {}, "yasno", KYIV_TZ, "GPV36.1")
+
+    response = client.get("/api/schedule/groups")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["configured"] == ["GPV36.1"]
+    assert set(body["groups"]) == {"GPV1.1", "GPV36.1"}
+    assert body["groups"]["GPV36.1"][today]["intervals"][0] == [0, 4, False]
+    assert body["groups"]["GPV1.1"][today]["source"] == "yasno"
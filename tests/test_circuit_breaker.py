@@ -0,0 +1,54 @@
+from unittest.mock import patch
+
+from app.circuit_breaker import BreakerRegistry, CLOSED, HALF_OPEN, OPEN
+
+
+def _registry(tmp_path):
+    return BreakerRegistry(str(tmp_path / "breakers.json"))
+
+
+def test_opens_after_threshold_and_rejects(tmp_path):
+    cb = _registry(tmp_path).get("github", failure_threshold=2, recovery_timeout=60)
+    cb.record_failure()
+    assert cb.state == CLOSED
+    cb.record_failure()
+    assert cb.state == OPEN
+    assert not cb.can_execute()
+
+
+def test_half_open_allows_single_probe_with_lease(tmp_path):
+    cb = _registry(tmp_path).get("yasno", failure_threshold=1, recovery_timeout=60, probe_lease=30)
+    with patch("app.circuit_breaker.time.time", return_value=1000):
+        cb.record_failure()
+    with patch("app.circuit_breaker.time.time", return_value=1061):
+        assert cb.can_execute()
+        assert cb.state == HALF_OPEN
+        assert not cb.can_execute()
+    # The probe never reported back: the lease expires and a new probe is allowed
+    with patch("app.circuit_breaker.time.time", return_value=1092):
+        assert cb.can_execute()
+    cb.record_success()
+    assert cb.state == CLOSED
+    assert cb.can_execute()
+
+
+def test_failed_probe_doubles_recovery(tmp_path):
+    cb = _registry(tmp_path).get("alerts", failure_threshold=1, recovery_timeout=60, max_recovery=100)
+    with patch("app.circuit_breaker.time.time", return_value=1000):
+        cb.record_failure()
+    with patch("app.circuit_breaker.time.time", return_value=1061):
+        assert cb.can_execute()
+        cb.record_failure()
+    with patch("app.circuit_breaker.time.time", return_value=1061 + 90):
+        assert not cb.can_execute()
+    # Capped at max_recovery
+    with patch("app.circuit_breaker.time.time", return_value=1061 + 101):
+        assert cb.can_execute()
+
+
+def test_state_is_shared_through_the_file(tmp_path):
+    worker_a = _registry(tmp_path).get("telegram", failure_threshold=1)
+    worker_b = _registry(tmp_path).get("telegram", failure_threshold=1)
+    worker_a.record_failure()
+    assert not worker_b.can_execute()
+    assert worker_b.snapshot()["state"] == OPEN
@@ -0,0 +1,50 @@
+import os
+import gzip
+
+from app import compression
+from app.compression import accepted_encodings, precompress_file, static_variant
+
+
+def test_accepted_encodings_respects_q_values():
+    br = ["br"] if compression.brotli else []
+    assert accepted_encodings("gzip, deflate, br") == br + ["gzip"]
+    assert accepted_encodings("gzip;q=0, br;q=0") == []
+    assert accepted_encodings("*") == br + ["gzip"]
+    assert accepted_encodings(None) == []
+
+
+def test_static_sidecar_built_once_and_refreshed_on_change(tmp_path):
+    path = str(tmp_path / "stats.json")
+    with open(path, "w") as f:
+        f.write('{"plan_up": "12:00"}' * 50)
+    assert "gzip" in precompress_file(path)
+    sidecar = path + ".gz"
+    assert static_variant(path, "gzip") == (sidecar, "gzip")
+
+    with open(path, "w") as f:
+        f.write('{"plan_up": "08:30"}' * 50)
+    os.utime(path, ns=(0, os.stat(sidecar).st_mtime_ns + 10**9))
+    assert static_variant(path, "gzip") == (sidecar, "gzip")
+    assert gzip.decompress(open(sidecar, "rb").read()).startswith(b'{"plan_up": "08:30"}')
+
+    png = str(tmp_path / "chart.png")
+    open(png, "wb").write(b"\x89PNG" * 100)
+    assert static_variant(png, "gzip") == (png, None)
+
+
+def test_file_without_useful_variant_is_not_recompressed(tmp_path, monkeypatch):
+    path = str(tmp_path / "noise.json")
+    with open(path, "wb") as f:
+        f.write(os.urandom(4096))
+    calls = []
+    original = compression.precompress_file
+    monkeypatch.setattr(compression, "precompress_file", lambda p: calls.append(p) or original(p))
+
+    assert static_variant(path, "gzip") == (path, None)
+    assert static_variant(path, "gzip") == (path, None)
+    assert len(calls) == 1
+
+    tiny = str(tmp_path / "tiny.json")
+    open(tiny, "w").write("{}")
+    assert static_variant(tiny, "gzip") == (tiny, None)
+    assert len(calls) == 1
@@ -0,0 +1,34 @@
+import asyncio
+import socket
+
+from app.event_bus import EventBus
+
+
+def test_publish_reaches_subscriber_and_drops_dead_sockets(tmp_path):
+    bus = EventBus(str(tmp_path / "bus"))
+
+    async def scenario():
+        received = asyncio.Queue()
+
+        async def handler(event):
+            await received.put(event)
+
+        await bus.start(handler)
+        # A socket left behind by a worker that exited
+        dead = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        dead.bind(str(tmp_path / "bus" / "sub-999999.sock"))
+        dead.close()
+
+        delivered = bus.publish({"type": "power", "status": "down"})
+        event = await asyncio.wait_for(received.get(), 1)
+        bus.stop()
+        return delivered, event
+
+    delivered, event = asyncio.run(scenario())
+    assert delivered == 1
+    assert event == {"type": "power", "status": "down"}
+    assert list((tmp_path / "bus").iterdir()) == []
+
+
+def test_publish_without_subscribers(tmp_path):
+    assert EventBus(str(tmp_path / "missing")).publish({"type": "alert"}) == 0
@@ -0,0 +1,58 @@
+import json
+
+from app.event_store import EventStore
+
+
+def make_store(tmp_path, events):
+    path = tmp_path / "event_log.json"
+    path.write_text(json.dumps(events))
+    return EventStore(str(path)), path
+
+
+def test_legacy_log_gets_durations_and_appends_store_them(tmp_path):
+    store, path = make_store(tmp_path, [
+        {"timestamp": 100.0, "event": "down"},
+        {"timestamp": 400.0, "event": "up"},
+    ])
+    assert [e["duration_prev"] for e in store.latest(5)] == [300.0, None]
+
+    store.append({"timestamp": 1000.0, "event": "down"})
+    on_disk = json.loads(path.read_text())
+    assert on_disk[-1] == {"timestamp": 1000.0, "event": "down", "duration_prev": 600.0}
+    assert store.last_of("up")["timestamp"] == 400.0
+
+    # Back-dated entry from the admin panel shortens its successor's duration
+    store.append({"timestamp": 700.0, "event": "up"})
+    assert [(e["timestamp"], e["duration_prev"]) for e in store.latest(2)] == [(1000.0, 300.0), (700.0, 300.0)]
+
+
+def test_range_query_with_cursor_pages(tmp_path):
+    store, _ = make_store(tmp_path, [{"timestamp": float(t), "event": "up" if t % 2 else "down"} for t in range(10)])
+
+    page, cursor = store.query(t_from=2, t_to=9, limit=3)
+    assert [e["timestamp"] for e in page] == [8.0, 7.0, 6.0]
+    page, cursor = store.query(t_from=2, t_to=9, limit=3, cursor=cursor)
+    assert [e["timestamp"] for e in page] == [5.0, 4.0, 3.0]
+    page, cursor = store.query(t_from=2, t_to=9, limit=3, cursor=cursor)
+    assert [e["timestamp"] for e in page] == [2.0]
+    assert cursor is None
+
+
+def test_cursor_keeps_events_sharing_a_timestamp(tmp_path):
+    events = [{"timestamp": 1.0, "event": "up"}, {"timestamp": 2.0, "event": "down"},
+              {"timestamp": 2.0, "event": "up"}, {"timestamp": 3.0, "event": "down"}]
+    store, _ = make_store(tmp_path, events)
+
+    page, cursor = store.query(limit=2)
+    assert [(e["timestamp"], e["event"]) for e in page] == [(3.0, "down"), (2.0, "up")]
+    page, cursor = store.query(limit=2, cursor=cursor)
+    assert [(e["timestamp"], e["event"]) for e in page] == [(2.0, "down"), (1.0, "up")]
+    assert cursor is None
+
+
+def test_delete_and_prune(tmp_path):
+    store, _ = make_store(tmp_path, [{"timestamp": float(t), "event": "up"} for t in (10, 20, 30, 40)])
+    assert store.delete(30.05) == 1
+    assert [(e["timestamp"], e["duration_prev"]) for e in store.latest(2)] == [(40.0, 20.0), (20.0, 10.0)]
+    assert store.prune(20.0) == 2
+    assert len(store) == 1
@@ -0,0 +1,33 @@
+import asyncio
+
+from app.http_clients import HttpClientRegistry
+
+
+def test_started_registry_reuses_clients():
+    registry = HttpClientRegistry()
+
+    async def scenario():
+        registry.start()
+        first = registry.get("alerts")
+        async with registry.session("alerts") as client:
+            assert client is first
+        assert registry.get("schedules") is not first
+        assert set(registry.stats()) == {"alerts", "schedules"}
+        await registry.aclose()
+        return first
+
+    client = asyncio.run(scenario())
+    assert client.is_closed
+
+
+def test_session_without_start_uses_throwaway_client():
+    registry = HttpClientRegistry()
+
+    async def scenario():
+        async with registry.session("alerts") as client:
+            pass
+        return client
+
+    client = asyncio.run(scenario())
+    assert client.is_closed
+    assert registry.stats() == {}
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from app.job_queue import CoalescingJobQueue
+
+
+def test_burst_collapses_into_single_run_with_latest_args():
+    queue = CoalescingJobQueue(debounce=0.05)
+    seen = []
+
+    for i in range(10):
+        queue.submit("render", seen.append, i)
+
+    assert queue.wait_idle(timeout=2)
+    assert seen == [9]
+    stats = queue.stats()["render"]
+    assert stats["runs"] == 1
+    assert stats["skips"] == 9
+    assert stats["queue_depth"] == 0
+
+
+def test_request_during_run_is_kept_as_single_pending_job():
+    queue = CoalescingJobQueue()
+    started = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def slow(value):
+        started.set()
+        release.wait(2)
+        seen.append(value)
+
+    queue.submit("render", slow, "first")
+    assert started.wait(2)
+    queue.submit("render", seen.append, "second")
+    queue.submit("render", seen.append, "third")
+    assert queue.stats()["render"]["queue_depth"] == 2
+
+    release.set()
+    assert queue.wait_idle(timeout=2)
+    assert seen == ["first", "third"]
+
+
+def test_job_types_do_not_coalesce_with_each_other():
+    queue = CoalescingJobQueue()
+    seen = []
+
+    queue.submit("daily", seen.append, "daily")
+    queue.submit("weekly", seen.append, "weekly")
+
+    assert queue.wait_idle(timeout=2)
+    assert sorted(seen) == ["daily", "weekly"]
+
+
+def test_failing_job_is_counted_and_queue_keeps_working(tmp_path):
+    queue = CoalescingJobQueue(lock_dir=str(tmp_path))
+    seen = []
+
+    def boom():
+        raise RuntimeError("render failed")
+
+    queue.submit("render", boom)
+    assert queue.wait_idle(timeout=2)
+    queue.submit("render", seen.append, "ok")
+    assert queue.wait_idle(timeout=2)
+
+    assert seen == ["ok"]
+    assert queue.stats()["render"]["failures"] == 1
+    assert (tmp_path / "render.lock").exists()
+
+
+def test_debounce_waits_for_quiet_period():
+    queue = CoalescingJobQueue(debounce=0.2)
+    ran_at = []
+
+    start = time.monotonic()
+    queue.submit("render", lambda: ran_at.append(time.monotonic()))
+    time.sleep(0.1)
+    queue.submit("render", lambda: ran_at.append(time.monotonic()))
+
+    assert queue.wait_idle(timeout=2)
+    assert len(ran_at) == 1
+    assert ran_at[0] - start >= 0.3
+
+
+def test_sticky_flag_survives_replacement():
+    queue = CoalescingJobQueue(debounce=0.05)
+    seen = []
+
+    queue.submit("text", lambda force_new=False: seen.append(force_new), force_new=True, sticky=("force_new",))
+    queue.submit("text", lambda force_new=False: seen.append(force_new), force_new=False, sticky=("force_new",))
+
+    assert queue.wait_idle(timeout=2)
+    assert seen == [True]
+
+
+def test_shared_lock_serialises_different_job_types(tmp_path):
+    queue = CoalescingJobQueue(lock_dir=str(tmp_path))
+    active = []
+    overlaps = []
+
+    def render(name):
+        active.append(name)
+        overlaps.append(len(active))
+        time.sleep(0.05)
+        active.remove(name)
+
+    queue.submit("daily", render, "daily", lock="report")
+    queue.submit("daily_final", render, "final", lock="report")
+
+    assert queue.wait_idle(timeout=2)
+    assert overlaps == [1, 1]
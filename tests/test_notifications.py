@@ -30,3 +30,60 @@ def test_short_duration_formatting():
     # Current behavior of format_duration for < 60s is "0 хв"
     assert format_duration(30) == "0 хв"
     assert format_duration(60) == "1 хв"
+
+def test_alert_snapshot_keeps_last_good_status(tmp_path):
+    from app import light_service
+    snap = str(tmp_path / "alert_snapshot.json")
+    with patch("app.light_service.ALERT_SNAPSHOT_FILE", snap):
+        assert light_service.read_alert_snapshot()["stale"] is True
+
+        light_service.publish_alert_snapshot({"status": "active", "city": True, "location": "м. Київ"}, now=1000)
+        fresh = light_service.read_alert_snapshot(now=1060)
+        assert fresh["status"] == "active" and fresh["stale"] is False
+
+        # A failed fetch keeps the last status, which goes stale with time
+        light_service.publish_alert_snapshot({"status": "unknown", "location": "Невідомо"}, now=1300)
+        stale = light_service.read_alert_snapshot(now=1300)
+        assert stale["status"] == "active" and stale["error"] is True and stale["stale"] is True
+
+def test_multi_region_alerts_from_one_document(tmp_path):
+    from app.air_alerts import parse_states, summarize, region_transitions, AlertIntervalStore, get_alert_intervals
+    regions = ["м. Київ", "Київська область", "Львівська область"]
+    doc = {"states": {"м. Київ": {"alertnow": False}, "Київська область": {"alertnow": True},
+                      "Львівська область": {"alertnow": True}}}
+    summary = summarize(parse_states(doc, regions), regions)
+    assert summary["status"] == "region" and summary["location"] == "Київська область"
+    assert summary["regions"]["Львівська область"]["alert"] is True
+
+    changes = region_transitions({"Київська область": True}, summary["regions"])
+    assert changes == {"Львівська область": True}
+
+    store = AlertIntervalStore(str(tmp_path / "air_raid_intervals.json"))
+    day = datetime.date(2026, 3, 10)
+    start = datetime.datetime(2026, 3, 10, 10, 0, tzinfo=KYIV_TZ).timestamp()
+    store.record(changes, start)
+    store.record({"Львівська область": False}, start + 3600)
+    intervals = get_alert_intervals(day, "Львівська область", store=store)
+    assert [(s.hour, e.hour) for s, e, _ in intervals] == [(10, 11)]
+    assert get_alert_intervals(day, "м. Київ", store=store) == []
+
+
+def test_alert_interval_store_index_and_migration(tmp_path):
+    import json
+    from app.air_alerts import AlertIntervalStore
+    legacy = tmp_path / "air_raid_log.json"
+    events = []
+    for i in range(100):
+        events += [{"timestamp": i * 1000, "event": "active"}, {"timestamp": i * 1000 + 500, "event": "clear"}]
+    events.append({"timestamp": 200000, "event": "active", "region": "Київська область"})
+    legacy.write_text(json.dumps(events))
+
+    store = AlertIntervalStore(str(tmp_path / "air_raid_intervals.json"), legacy_log=str(legacy))
+    assert store.overlapping("м. Київ", 10400, 12100) == [(10000, 10500), (11000, 11500), (12000, 12500)]
+    assert store.overlapping("Київська область", 0, 300000, now=250000) == [(200000, 250000)]
+    assert not legacy.exists()
+
+    assert store.prune(50000) == 50
+    reopened = AlertIntervalStore(str(tmp_path / "air_raid_intervals.json"))
+    assert reopened.overlapping("м. Київ", 0, 51000) == [(50000, 50500)]
+    assert reopened.open_since("Київська область") == 200000
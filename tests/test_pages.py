@@ -0,0 +1,39 @@
+import gzip
+
+import jinja2
+import pytest
+
+from app.pages import PageShells
+
+
+def make_shells(tmp_path, body):
+    (tmp_path / "page.html").write_text(body)
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(str(tmp_path)), auto_reload=False)
+    return PageShells(env)
+
+
+def test_shell_rendered_once_with_etag_and_variants(tmp_path):
+    shells = make_shells(tmp_path, "<html>" + "світло " * 100 + "</html>")
+    shells.warm(["page.html"])
+    shell = shells.get("page.html")
+    (tmp_path / "page.html").write_text("<html>changed</html>")
+    assert shells.get("page.html") is shell
+
+    plain = shells.response("page.html", None, None)
+    assert plain.status_code == 200 and plain.headers["etag"] == shell.etag
+    zipped = shells.response("page.html", None, "gzip")
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(zipped.body) == shell.body
+    assert zipped.headers["etag"] == shell.etag[:-1] + '-gzip"'
+
+    assert shells.response("page.html", shell.etag, None).status_code == 304
+    assert shells.response("page.html", zipped.headers["etag"], "gzip").status_code == 304
+
+    shells.clear()
+    assert shells.get("page.html").body == b"<html>changed</html>"
+
+
+def test_non_string_template_name_rejected(tmp_path):
+    shells = make_shells(tmp_path, "<html></html>")
+    with pytest.raises(TypeError):
+        shells.get({"request": None})
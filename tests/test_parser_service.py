@@ -0,0 +1,143 @@
+from app.parser_service import extract_github, extract_yasno
+
+CFG = {"settings": {"groups": ["GPV36.1"]}}
+
+
+def test_extract_github_returns_every_group():
+    day = {str(h): "yes" for h in range(1, 25)}
+    data = {"fact": {"data": {"1773093600": {
+        "GPV36.1": dict(day, **{"1": "no"}),
+        "GPV1.1": day,
+    }}}}
+    res = extract_github(data, CFG)
+    assert set(res) == {"GPV36.1", "GPV1.1"}
+    (slots_36,) = [d["slots"] for d in res["GPV36.1"].values()]
+    assert slots_36[:3] == [False, False, True]
+
+
+def test_extract_yasno_returns_every_group():
+    data = {
+        "36.1": {"today": {"date": "2026-03-10T00:00:00+02:00", "status": "ScheduleApplies",
+                           "slots": [{"start": 0, "end": 60, "type": "Definite"}]}},
+        "1.1": {"today": {"date": "2026-03-10T00:00:00+02:00", "status": "NoOutages"}},
+    }
+    res = extract_yasno(data, CFG)
+    assert set(res) == {"GPV36.1", "GPV1.1"}
+    assert res["GPV36.1"]["2026-03-10"]["slots"][:3] == [False, False, True]
+    assert res["GPV1.1"]["2026-03-10"]["slots"] == [True] * 48
+
+
+def _github_cfg():
+    return {"settings": {"groups": ["GPV36.1"], "region": "kyiv"},
+            "sources": {"github": {"enabled": True}, "yasno": {"enabled": False}}}
+
+
+def test_update_local_schedules_skips_work_on_304(tmp_path, monkeypatch):
+    import asyncio
+    import json
+    import httpx
+    from app import parser_service
+
+    day = {str(h): "yes" for h in range(1, 25)}
+    payload = {"fact": {"data": {"1773093600": {"GPV36.1": day}}}}
+    seen_headers = []
+
+    def handler(request):
+        seen_headers.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=payload, headers={"ETag": '"v1"'})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(parser_service.httpx, "AsyncClient",
+                        lambda *a, **kw: real_client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(_github_cfg()))
+    output_path = tmp_path / "last_schedules.json"
+
+    ok, _ = asyncio.run(parser_service.update_local_schedules(str(config_path), str(output_path)))
+    assert ok and output_path.exists()
+    written = output_path.stat().st_mtime_ns
+
+    ok, diff = asyncio.run(parser_service.update_local_schedules(str(config_path), str(output_path)))
+    assert ok and not diff
+    assert seen_headers == [None, '"v1"']
+    assert output_path.stat().st_mtime_ns == written
+
+    # Without the cached data the validator must not be sent again
+    output_path.unlink()
+    asyncio.run(parser_service.update_local_schedules(str(config_path), str(output_path)))
+    assert seen_headers[-1] is None
+    assert output_path.exists()
+
+
+def test_github_document_trimmed_to_used_fact_days():
+    import asyncio
+    import json
+    import httpx
+    from app import parser_service
+
+    day = {str(h): "yes" for h in range(1, 25)}
+    doc = {
+        "preset": {"data": {"GPV36.1": {str(d): day for d in range(1, 8)}}},
+        "fact": {"data": {"1773093600": {"GPV36.1": dict(day, **{"2": "first"}), "GPV1.1": day},
+                          **{str(1773093600 + 86400 * i): {"GPV36.1": day} for i in range(1, 5)}}},
+    }
+    body = json.dumps(doc).encode()
+
+    def handler(request):
+        return httpx.Response(200, stream=httpx.ByteStream(body))
+
+    cfg = {"settings": {"groups": ["GPV36.1"], "region": "kyiv"}, "sources": {"github": {"enabled": True}},
+           "advanced": {"data_sources": {"city_view": False}}}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await parser_service.fetch_github(client, cfg)
+
+    data = asyncio.run(run())
+    assert list(data) == ["fact"] and len(data["fact"]["data"]) == parser_service.GITHUB_FACT_DAYS
+    assert data["fact"]["data"]["1773093600"] == {"GPV36.1": doc["fact"]["data"]["1773093600"]["GPV36.1"]}
+    res = parser_service.extract_github(data, cfg)
+    assert list(res) == ["GPV36.1"]
+    assert list(res["GPV36.1"].values())[0]["slots"][2:4] == [False, True]
+
+
+def test_group_change_drops_validators_of_filtered_sources(tmp_path, monkeypatch):
+    import asyncio
+    import json
+    import httpx
+    from app import parser_service
+
+    day = {str(h): "yes" for h in range(1, 25)}
+    payload = {"fact": {"data": {"1773093600": {"GPV36.1": day, "GPV1.1": dict(day, **{"1": "no"})}}}}
+    seen_headers = []
+
+    def handler(request):
+        seen_headers.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=payload, headers={"ETag": '"v1"'})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(parser_service.httpx, "AsyncClient",
+                        lambda *a, **kw: real_client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    cfg = dict(_github_cfg(), advanced={"data_sources": {"city_view": False}})
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(cfg))
+    output_path = tmp_path / "last_schedules.json"
+
+    asyncio.run(parser_service.update_local_schedules(str(config_path), str(output_path)))
+    assert list(json.loads(output_path.read_text())["github"]) == ["GPV36.1"]
+
+    cfg["settings"]["groups"] = ["GPV36.1", "GPV1.1"]
+    config_path.write_text(json.dumps(cfg))
+    asyncio.run(parser_service.update_local_schedules(str(config_path), str(output_path)))
+    assert seen_headers == [None, None]
+    assert sorted(json.loads(output_path.read_text())["github"]) == ["GPV1.1", "GPV36.1"]
+
+    # Same groups again: the validator is sent and the upstream's 304 is used
+    asyncio.run(parser_service.update_local_schedules(str(config_path), str(output_path)))
+    assert seen_headers[-1] == '"v1"'
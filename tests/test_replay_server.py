@@ -0,0 +1,37 @@
+import requests
+
+from app.parser_service import extract_github, extract_yasno
+from scripts.replay_server import ReplayServer
+
+CFG = {"settings": {"groups": ["GPV1.1"]}}
+
+
+def test_replays_fixtures_with_etag_revalidation():
+    server = ReplayServer().start()
+    try:
+        url = server.env()["GITHUB_URL"].format(region="kyiv")
+        r = requests.get(url, timeout=5)
+        assert r.status_code == 200
+        assert "GPV1.1" in extract_github(r.json(), CFG)
+
+        again = requests.get(url, headers={"If-None-Match": r.headers["ETag"]}, timeout=5)
+        assert again.status_code == 304
+
+        yasno = requests.get(server.env()["YASNO_URL"].format(region_id=25, dso_id=902), timeout=5)
+        assert len(extract_yasno(yasno.json(), CFG)["GPV1.1"]) == 2
+    finally:
+        server.stop()
+
+
+def test_scenario_status_sequence():
+    server = ReplayServer(scenario={"alerts": {"statuses": [429, 503, 200]}}).start()
+    try:
+        url = server.env()["ALERTS_API_URL"]
+        codes = [requests.get(url, timeout=5).status_code for _ in range(4)]
+        assert codes == [429, 503, 200, 200]
+
+        tg = requests.post(server.env()["TELEGRAM_API_BASE"] + "/botTOKEN/sendMessage", json={"text": "x"}, timeout=5)
+        assert tg.json()["ok"] is True
+        assert server.requests["alerts"] == 4
+    finally:
+        server.stop()
@@ -0,0 +1,71 @@
+from app.schedule_diff import diff_schedules, ScheduleDiff
+from app.parser_service import has_schedule_changed, schedule_diff
+
+
+def _slots(off_ranges):
+    slots = [True] * 48
+    for start, end in off_ranges:
+        for i in range(start, end):
+            slots[i] = False
+    return slots
+
+
+def _cache(days, source="yasno", group="GPV36.1"):
+    return {source: {group: {d: {"slots": s, "status": "normal"} for d, s in days.items()}}}
+
+
+def test_shifted_and_new_intervals():
+    old = _cache({"2026-03-10": _slots([(20, 24)])})
+    new = _cache({"2026-03-10": _slots([(22, 26), (40, 42)])})
+
+    diff = diff_schedules(old, new)
+    assert len(diff.days) == 1
+    day = diff.days[0]
+    assert (day.source, day.group, day.date) == ("yasno", "GPV36.1", "2026-03-10")
+    assert day.added_outage == [24, 25, 40, 41]
+    assert day.removed_outage == [20, 21]
+    assert day.shifted == [((20, 24), (22, 26))]
+    assert day.new_outages == [(40, 42)]
+    assert diff.summary_lines() == ["10.03: 10:00–12:00 → 11:00–13:00; + відключення 20:00–21:00"]
+
+
+def test_cancelled_outage_and_unchanged_days():
+    old = _cache({"2026-03-10": _slots([(20, 24)]), "2026-03-11": _slots([(0, 2)])})
+    new = _cache({"2026-03-10": _slots([]), "2026-03-11": _slots([(0, 2)])})
+
+    diff = diff_schedules(old, new)
+    assert diff.dates() == {"2026-03-10"}
+    assert diff.days[0].cancelled_outages == [(20, 24)]
+    assert diff.affects("2026-03-10", outage_only=True)
+    assert not diff.affects("2026-03-11")
+
+
+def test_new_day_is_reported_without_summary():
+    old = _cache({"2026-03-10": _slots([])})
+    new = _cache({"2026-03-10": _slots([]), "2026-03-11": _slots([(4, 6)])})
+
+    diff = diff_schedules(old, new)
+    assert diff.days[0].is_new
+    assert diff.affects("2026-03-11", outage_only=True)
+    assert diff.summary_lines() == []
+
+
+def test_round_trip_and_group_filter():
+    old = _cache({"2026-03-10": _slots([(20, 24)])})
+    new = _cache({"2026-03-10": _slots([(20, 26)])})
+    diff = ScheduleDiff.from_dict(diff_schedules(old, new).to_dict())
+
+    assert diff.days[0].shifted == [((20, 24), (20, 26))]
+    assert diff.summary_lines(group="GPV1.1") == []
+    assert diff.summary_lines(dates=["2026-03-10"], group="GPV36.1")
+    assert not diff.for_groups(["GPV1.1"])
+    assert diff.for_groups(["GPV36.1"]).dates() == {"2026-03-10"}
+    assert diff.for_groups([]) is diff
+
+
+def test_has_schedule_changed_keeps_baseline_rules():
+    new = _cache({"2026-03-10": _slots([(0, 2)])})
+    # No previous cache or no previous data for the source: nothing to compare against
+    assert not has_schedule_changed({}, new)
+    assert not schedule_diff(_cache({"2026-03-10": _slots([])}, source="github"), new)
+    assert has_schedule_changed(_cache({"2026-03-10": _slots([])}), new)
@@ -0,0 +1,55 @@
+import json
+import os
+
+from app.schedule_history import HistoryStore, protective_merge
+
+ON, OFF = True, False
+
+
+def test_protective_merge_keeps_outages():
+    assert protective_merge([OFF, ON, ON], [ON, OFF, ON]) == [OFF, OFF, ON]
+    assert protective_merge(None, [ON, OFF]) == [ON, OFF]
+
+
+def test_merge_rewrites_only_changed_dates(tmp_path):
+    store = HistoryStore(str(tmp_path / "history"))
+    assert store.merge({"2026-03-10": [ON, OFF], "2026-03-11": [ON, ON]}) == ["2026-03-10", "2026-03-11"]
+
+    untouched = os.stat(tmp_path / "history" / "2026-03-11.json").st_mtime_ns
+    assert store.merge({"2026-03-10": [OFF, ON], "2026-03-11": [ON, ON]}) == ["2026-03-10"]
+    assert os.stat(tmp_path / "history" / "2026-03-11.json").st_mtime_ns == untouched
+    assert store.load()["2026-03-10"]["slots"] == [OFF, OFF]
+
+    assert store.prune("2026-03-11") == 1
+    assert list(store.load()) == ["2026-03-11"]
+
+
+def test_legacy_file_is_migrated(tmp_path):
+    legacy = tmp_path / "schedule_history.json"
+    legacy.write_text(json.dumps({"2026-03-09": {"slots": [OFF, ON]}, "../evil": {"slots": [ON]}}))
+    store = HistoryStore(str(tmp_path / "history"), legacy_file=str(legacy))
+
+    assert store.version() is None
+    assert store.load() == {"2026-03-09": {"slots": [OFF, ON]}}
+    assert not legacy.exists()
+    assert store.version() is not None
+
+
+def test_replace_all_mirrors_document(tmp_path):
+    store = HistoryStore(str(tmp_path / "history"))
+    store.merge({"2026-03-09": [OFF], "2026-03-10": [OFF]})
+    assert sorted(store.replace_all({"2026-03-10": {"slots": [ON]}})) == ["2026-03-09", "2026-03-10"]
+    assert store.load() == {"2026-03-10": {"slots": [ON]}}
+
+
+
+def test_document_for_replicas_built_once_per_version(tmp_path):
+    store = HistoryStore(str(tmp_path / "history"))
+    store.merge({"2026-03-09": [OFF, ON]})
+    body, etag = store.document()
+    assert json.loads(body) == {"2026-03-09": {"slots": [OFF, ON]}}
+    assert store.document()[0] is body
+
+    store.merge({"2026-03-10": [ON]})
+    body2, etag2 = store.document()
+    assert etag2 != etag and list(json.loads(body2)) == ["2026-03-09", "2026-03-10"]
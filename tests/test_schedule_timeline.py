@@ -0,0 +1,123 @@
+import datetime
+import json
+from zoneinfo import ZoneInfo
+
+from app.schedule_timeline import build_timeline, load_timeline, slots_to_runs, priority_order
+
+TZ = ZoneInfo("Europe/Kyiv")
+TODAY = datetime.date(2026, 3, 10)
+TOMORROW = TODAY + datetime.timedelta(days=1)
+
+
+def _slots(off_ranges):
+    slots = [True] * 48
+    for start, end in off_ranges:
+        for i in range(start, end):
+            slots[i] = False
+    return slots
+
+
+def _data(yasno=None, github=None):
+    data = {}
+    if yasno is not None:
+        data["yasno"] = {"GPV36.1": yasno}
+    if github is not None:
+        data["github"] = {"GPV36.1": github}
+    return data
+
+
+def _dt(date, hour, minute=0):
+    return datetime.datetime.combine(date, datetime.time(hour, minute), tzinfo=TZ)
+
+
+def test_slots_to_runs():
+    assert slots_to_runs([True, True, False, True]) == [(0, 2, True), (2, 3, False), (3, 4, True)]
+    assert slots_to_runs([]) == []
+
+
+def test_priority_order():
+    assert priority_order("github") == ["github", "yasno"]
+    assert priority_order("custom") == ["custom", "yasno", "github"]
+    assert priority_order(None) == ["yasno", "github"]
+
+
+def test_priority_source_wins_and_falls_back_per_day():
+    data = _data(
+        yasno={TODAY.isoformat(): {"slots": _slots([(10, 14)]), "status": "normal"}},
+        github={TODAY.isoformat(): {"slots": _slots([(20, 22)]), "status": "normal"},
+                TOMORROW.isoformat(): {"slots": _slots([(0, 4)]), "status": "normal"}},
+    )
+    tl = build_timeline(data, {}, "yasno", TZ)
+    assert tl.day(TODAY).source == "yasno"
+    assert tl.day(TOMORROW).source == "github"
+    assert tl.intervals_for_day(TODAY) == [(0, 10, True), (10, 14, False), (14, 48, True)]
+
+
+def test_state_and_transitions_cross_midnight():
+    data = _data(yasno={
+        TODAY.isoformat(): {"slots": _slots([(44, 48)]), "status": "normal"},
+        TOMORROW.isoformat(): {"slots": _slots([(0, 4)]), "status": "normal"},
+    })
+    tl = build_timeline(data, {}, "yasno", TZ)
+    now = tl.slot_index(_dt(TODAY, 23, 10))
+    assert tl.state_at(now) is False
+    on_idx = tl.next_transition(now, True)
+    assert tl.slot_datetime(on_idx) == _dt(TOMORROW, 2)
+    # Past the last known day the state is unknown
+    assert tl.state_at(tl.day_start_index(TOMORROW) + 48) is None
+
+
+def test_nearest_transition_respects_limit():
+    data = _data(yasno={TODAY.isoformat(): {"slots": _slots([(20, 24)]), "status": "normal"}})
+    tl = build_timeline(data, {}, "yasno", TZ)
+    assert tl.nearest_transition(_dt(TODAY, 10, 20), False) == _dt(TODAY, 10)
+    assert tl.nearest_transition(_dt(TODAY, 12, 10), True) == _dt(TODAY, 12)
+    assert tl.nearest_transition(_dt(TODAY, 18), False, max_seconds=3600) is None
+
+
+def test_emergency_day_without_slots():
+    data = _data(yasno={TODAY.isoformat(): {"slots": [], "status": "emergency"}})
+    plan = build_timeline(data, {}, "yasno", TZ).day(TODAY)
+    assert plan.is_emergency
+    assert plan.slots is None
+    assert plan.emergency_sources == ["YASNO"]
+
+
+def test_history_fills_missing_days():
+    history = {TODAY.isoformat(): {"slots": _slots([(0, 2)])}}
+    tl = build_timeline({}, history, "yasno", TZ)
+    assert tl.day(TODAY) is None
+    assert tl.slots_for_day(TODAY)[:3] == [False, False, True]
+
+
+def test_load_timeline_recompiles_only_on_file_change(tmp_path):
+    sched = tmp_path / "last_schedules.json"
+    hist = tmp_path / "schedule_history.json"
+    sched.write_text(json.dumps(_data(yasno={TODAY.isoformat(): {"slots": _slots([(0, 2)]), "status": "normal"}})))
+
+    first = load_timeline(str(sched), str(hist), "yasno", TZ)
+    assert load_timeline(str(sched), str(hist), "yasno", TZ) is first
+
+    sched.write_text(json.dumps(_data(yasno={TODAY.isoformat(): {"slots": _slots([(0, 6)]), "status": "normal"}})))
+    second = load_timeline(str(sched), str(hist), "yasno", TZ)
+    assert second is not first
+    assert second.intervals_for_day(TODAY)[0] == (0, 6, False)
+
+
+def test_group_timelines_from_single_cache():
+    from app.schedule_timeline import build_group_timelines
+    data = {
+        "yasno": {"GPV1.1": {TODAY.isoformat(): {"slots": _slots([(0, 4)]), "status": "normal"}}},
+        "github": {"GPV1.1": {TODAY.isoformat(): {"slots": _slots([(8, 10)]), "status": "normal"}},
+                   "GPV2.1": {TODAY.isoformat(): {"slots": _slots([(10, 12)]), "status": "normal"}}},
+    }
+    history = {TOMORROW.isoformat(): {"slots": _slots([(2, 4)])}}
+    timelines = build_group_timelines(data, history, "yasno", TZ, history_group="GPV2.1")
+
+    assert set(timelines) == {"GPV1.1", "GPV2.1"}
+    assert timelines["GPV1.1"].day(TODAY).source == "yasno"
+    assert timelines["GPV2.1"].day(TODAY).source == "github"
+    # History belongs to the configured group only
+    assert timelines["GPV2.1"].slots_for_day(TOMORROW) is not None
+    assert timelines["GPV1.1"].slots_for_day(TOMORROW) is None
+    assert build_timeline(data, history, "yasno", TZ, group="GPV2.1").day(TODAY).source == "github"
@@ -0,0 +1,63 @@
+import json
+import datetime
+from zoneinfo import ZoneInfo
+
+from app.event_store import EventStore
+from app.air_alerts import AlertIntervalStore
+from app.stats import DailyStats, percentile
+
+TZ = ZoneInfo("Europe/Kyiv")
+
+
+def ts(day, hour, minute=0):
+    return datetime.datetime(2026, 3, day, hour, minute, tzinfo=TZ).timestamp()
+
+
+def make_stats(tmp_path, events, alerts=None):
+    log = tmp_path / "event_log.json"
+    log.write_text(json.dumps(events))
+    alert_store = AlertIntervalStore(str(tmp_path / "air_raid_intervals.json"))
+    for start, end in alerts or []:
+        alert_store.record({"м. Київ": True}, start)
+        alert_store.record({"м. Київ": False}, end)
+    slots = [i < 36 for i in range(48)]  # light planned until 18:00
+    return DailyStats(str(tmp_path / "stats_daily.json"), EventStore(str(log)), alert_store,
+                      slots_for_day=lambda day: slots, primary_region=lambda: "м. Київ",
+                      inputs=lambda: (log.stat().st_mtime_ns,), tz=TZ)
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([10], 95) == 10
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_daily_aggregates_and_buckets(tmp_path):
+    events = [
+        {"timestamp": ts(1, 0), "event": "up"},
+        {"timestamp": ts(1, 18), "event": "down"},
+        {"timestamp": ts(1, 22), "event": "up"},
+        {"timestamp": ts(2, 10), "event": "down"},
+        {"timestamp": ts(2, 11), "event": "up"},
+    ]
+    stats = make_stats(tmp_path, events, alerts=[(ts(1, 21), ts(1, 23))])
+    result = stats.query(datetime.date(2026, 3, 1), datetime.date(2026, 3, 2), "day", now=ts(4, 12))
+
+    day1, day2 = result["periods"]
+    assert (day1["up_hours"], day1["down_hours"], day1["outages"]) == (20.0, 4.0, 1)
+    assert day1["alert_overlap_hours"] == 1.0 and day1["alert_hours"] == 2.0
+    assert day1["compliance_pct"] == round(20 / 18 * 100, 1)
+    assert (day2["outages"], day2["outage_p50_min"]) == (1, 60)
+
+    week = stats.query(datetime.date(2026, 3, 1), datetime.date(2026, 3, 2), "week", now=ts(4, 12))
+    assert [p["period"] for p in week["periods"]] == ["2026-02-23", "2026-03-02"]
+    assert week["total"]["outages"] == 2 and week["total"]["outage_p95_min"] == 240
+
+    # Queries never write; the background update persists the aggregates, which then
+    # survive the event log being pruned
+    assert not (tmp_path / "stats_daily.json").exists()
+    assert stats.update(ts(4, 12)) == 3
+    stats.events.prune(ts(3, 0))
+    again = make_stats(tmp_path, [])
+    assert again.query(datetime.date(2026, 3, 1), datetime.date(2026, 3, 2), "day", now=ts(4, 12))["total"] == result["total"]
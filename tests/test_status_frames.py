@@ -0,0 +1,83 @@
+import struct
+import asyncio
+import datetime
+
+from app import status_frames
+from app.status_frames import FrameHub, encode_power, encode_schedule, parse_topics, slots_to_masks
+
+
+def test_schedule_frame_is_two_masks_per_day():
+    slots = [True] * 48
+    slots[0:4] = [False] * 4
+    slots[47] = None
+    frame = encode_schedule([(datetime.date(2026, 3, 1), slots)])
+    assert len(frame) == 3 + 16
+    version, kind, days, date, light, known = struct.unpack("<BBBI6s6s", frame)
+    assert (version, kind, days, date) == (1, status_frames.SCHEDULE, 1, 20260301)
+    assert int.from_bytes(light, "little") == slots_to_masks(slots)[0] == ((1 << 47) - 1) & ~0b1111
+    assert int.from_bytes(known, "little") == (1 << 47) - 1
+
+
+def test_power_frame_and_topics():
+    assert encode_power("off", 1700000000.5, pending=True) == struct.pack("<BBBBI", 1, 1, 2, 1, 1700000000)
+    assert parse_topics("power, alerts") == {status_frames.POWER, status_frames.ALERT}
+    assert parse_topics("bogus") == parse_topics(None) == set(status_frames.TOPICS.values())
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def test_hub_sends_only_changed_frames_to_subscribers():
+    light = {"value": "on"}
+
+    async def source():
+        return {status_frames.POWER: encode_power(light["value"]), status_frames.SCHEDULE: b"\x01\x03\x00"}
+
+    hub = FrameHub(source)
+    power_only, everything = FakeSocket(), FakeSocket()
+
+    async def scenario():
+        await hub.connect(power_only, parse_topics("power"))
+        await hub.connect(everything, parse_topics(None))
+        assert await hub.refresh() == []
+        light["value"] = "off"
+        assert await hub.refresh() == [status_frames.POWER]
+
+    asyncio.run(scenario())
+    assert power_only.sent == [encode_power("on"), encode_power("off")]
+    assert everything.sent == [encode_power("on"), b"\x01\x03\x00", encode_power("off")]
+
+
+def test_slow_display_does_not_hold_up_the_others(monkeypatch):
+    monkeypatch.setattr(status_frames, "SEND_TIMEOUT", 0.2)
+    light = {"value": "on"}
+
+    async def source():
+        return {status_frames.POWER: encode_power(light["value"])}
+
+    class StuckSocket(FakeSocket):
+        async def send_bytes(self, data):
+            if self.sent:
+                await asyncio.sleep(10)
+            self.sent.append(data)
+
+    hub = FrameHub(source)
+    stuck, fast = StuckSocket(), FakeSocket()
+
+    async def scenario():
+        await hub.connect(stuck, parse_topics("power"))
+        await hub.connect(fast, parse_topics("power"))
+        light["value"] = "off"
+        hub.request_refresh()
+        hub.request_refresh()
+        await asyncio.sleep(0.05)
+        assert fast.sent == [encode_power("on"), encode_power("off")]
+        await hub._task
+        assert stuck not in hub.clients and fast in hub.clients
+
+    asyncio.run(scenario())
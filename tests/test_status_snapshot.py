@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+from app.status_snapshot import SnapshotView, StatusSnapshot, json_diff
+
+
+def test_json_diff_only_changed_fields():
+    old = {"light": "on", "aqi": {"pm25": 10, "history_hourly": [1, 2]}, "gone": 1, "a/b": 0}
+    new = {"light": "off", "aqi": {"pm25": 10, "history_hourly": [1, 2, 3]}, "added": True, "a/b": 1}
+    assert json_diff(old, new) == [
+        {"op": "remove", "path": "/gone"},
+        {"op": "replace", "path": "/light", "value": "off"},
+        {"op": "replace", "path": "/aqi/history_hourly", "value": [1, 2, 3]},
+        {"op": "add", "path": "/added", "value": True},
+        {"op": "replace", "path": "/a~1b", "value": 1},
+    ]
+
+
+def test_snapshot_versions_and_patches():
+    doc = {"light": "on", "events": [1]}
+    seen = []
+
+    async def build():
+        return dict(doc)
+
+    async def on_change(snap):
+        seen.append(json.loads(snap.patch_json))
+
+    snapshot = StatusSnapshot(build, lambda: (doc["light"],))
+    snapshot.on_change = on_change
+
+    async def scenario():
+        await snapshot.refresh()
+        first_etag = snapshot.etag
+        assert await snapshot.refresh() is False
+        doc["light"] = "off"
+        assert await snapshot.refresh() is True
+        return first_etag
+
+    first_etag = asyncio.run(scenario())
+    assert snapshot.etag != first_etag
+    assert json.loads(snapshot.snapshot_json())["version"] == 2
+    assert seen == [{"type": "patch", "version": 2, "base": 1, "ops": [{"op": "replace", "path": "/light", "value": "off"}]}]
+
+
+def test_replay_since_last_event_id():
+    doc = {"n": 0}
+
+    async def build():
+        return dict(doc)
+
+    snapshot = StatusSnapshot(build, lambda: (doc["n"],), history=2)
+
+    async def scenario():
+        for n in range(4):
+            doc["n"] = n
+            await snapshot.refresh()
+
+    asyncio.run(scenario())
+    assert snapshot.version == 4
+    assert [v for v, _ in snapshot.replay_since(snapshot.event_id(2))] == [3, 4]
+    assert snapshot.replay_since(snapshot.event_id(4)) == []
+    # Older than the buffer, from another worker, or missing: start from a snapshot
+    assert snapshot.replay_since(snapshot.event_id(1)) is None
+    assert snapshot.replay_since("deadbeef.3") is None
+    assert snapshot.replay_since(None) is None
+
+
+def test_shared_snapshot_built_once_and_adopted(tmp_path):
+    doc = {"light": "on"}
+    builds = []
+    follower_patches = []
+
+    async def build():
+        builds.append(1)
+        return dict(doc)
+
+    async def on_change(snap):
+        follower_patches.append(snap.patch_json)
+
+    shared = str(tmp_path / "status_snapshot.json")
+    leader = StatusSnapshot(build, lambda: (doc["light"],), shared_path=shared)
+    follower = StatusSnapshot(build, lambda: (doc["light"],), shared_path=shared)
+    follower.on_change = on_change
+
+    async def scenario():
+        await leader.refresh()
+        await follower.refresh()
+        doc["light"] = "off"
+        await leader.refresh()
+        await follower.refresh()
+
+    asyncio.run(scenario())
+    assert leader.leader and not follower.leader
+    assert len(builds) == 2
+    assert (follower.epoch, follower.version, follower.etag, follower.body) == \
+        (leader.epoch, leader.version, leader.etag, leader.body)
+    assert follower_patches == [leader.patch_json]
+    # Event IDs are shared, so a client can resume on either worker
+    assert [v for v, _ in follower.replay_since(leader.event_id(1))] == [2]
+
+
+def test_view_long_poll_wakes_on_projection_change():
+    doc = {"light": "on", "aqi": 10}
+
+    async def build():
+        return dict(doc)
+
+    snapshot = StatusSnapshot(build, lambda: (doc["light"], doc["aqi"]))
+    view = SnapshotView(snapshot, lambda d: {"light": d.get("light")})
+
+    async def scenario():
+        first = await view.response(None)
+        etag = first.headers["etag"]
+
+        async def change():
+            await asyncio.sleep(0.05)
+            doc["aqi"] = 20  # not part of the view: the poll keeps waiting
+            await snapshot.refresh()
+            await asyncio.sleep(0.05)
+            doc["light"] = "off"
+            await snapshot.refresh()
+
+        changer = asyncio.create_task(change())
+        started = asyncio.get_running_loop().time()
+        woken = await view.response(etag, wait=5)
+        elapsed = asyncio.get_running_loop().time() - started
+        await changer
+        timed_out = await view.response(woken.headers["etag"], wait=0.05)
+        return first, woken, elapsed, timed_out
+
+    first, woken, elapsed, timed_out = asyncio.run(scenario())
+    assert json.loads(first.body) == {"light": "on"}
+    assert json.loads(woken.body) == {"light": "off"}
+    assert 0.09 < elapsed < 2
+    assert timed_out.status_code == 304